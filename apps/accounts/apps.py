@@ -1,7 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.accounts'
     verbose_name = 'User Accounts'
+
+    def ready(self):
+        from . import authentication
+        user = self.get_model('User')
+        post_save.connect(authentication.user_saved, sender=user, dispatch_uid='accounts_user_saved')
+        post_delete.connect(authentication.user_deleted, sender=user, dispatch_uid='accounts_user_deleted')
@@ -0,0 +1,144 @@
+"""
+Stateless JWT authentication.
+
+Tokens issued at login carry the claims permission checks need - role,
+branch, is_staff, is_superuser - so ClaimsJWTAuthentication builds
+request.user from the token (a ClaimsUser) instead of loading the users row
+on every admin request.
+
+Revocation uses two stamps, HMACs of user state, embedded in the token:
+
+  * auth: role, branch, staff/superuser/active flags and password. Checked
+    on every request against a cached copy; a mismatch means the user
+    changed since the token was issued and the token is rejected (401), so
+    the client refreshes.
+  * pwd: password only. Checked when refreshing; after a password change
+    the refresh token is refused too and the user has to log in again.
+    Refreshing otherwise issues tokens with up-to-date claims.
+
+Stamps are cached for USER_CACHE_SECONDS in the default cache and updated
+when a user is saved. With Redis that's immediate for every worker; with
+the local-memory cache other workers notice within USER_CACHE_SECONDS.
+
+Views that need the full model (profile, password change) call
+full_user(request.user), served from a short-lived per-process cache.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.crypto import salted_hmac
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+INVALID = '-'  # Stamp for deleted or inactive users; matches no token
+
+# user id -> (expires_at, stamp, user); per process
+_users = {}
+
+
+def _hmac(purpose, value):
+    return salted_hmac(f'apps.accounts.authentication.{purpose}', value).hexdigest()[:16]
+
+
+def password_stamp(user):
+    return _hmac('pwd', user.password)
+
+
+def auth_stamp(user):
+    if user is None or not user.is_active:
+        return INVALID
+    state = (password_stamp(user), user.role, user.branch_id, user.is_staff, user.is_superuser)
+    return _hmac('auth', '|'.join(map(str, state)))
+
+
+def token_claims(user):
+    return {
+        'username': user.username,
+        'role': 'admin' if user.is_superuser else user.role,
+        'branch': user.branch_id,
+        'is_staff': user.is_staff,
+        'is_superuser': user.is_superuser,
+        'auth': auth_stamp(user),
+        'pwd': password_stamp(user),
+    }
+
+
+def add_claims(token, user):
+    for claim, value in token_claims(user).items():
+        token[claim] = value
+    return token
+
+
+def _stamp_key(user_id):
+    return f'auth_stamp:{user_id}'
+
+
+def _load(user_id):
+    """Fetch from the database and refresh both caches"""
+    user = get_user_model()._default_manager.filter(pk=user_id).first()
+    stamp = auth_stamp(user)
+    cache.set(_stamp_key(user_id), stamp, settings.USER_CACHE_SECONDS)
+    if user is None:
+        _users.pop(user_id, None)
+    else:
+        _users[user_id] = (time.monotonic() + settings.USER_CACHE_SECONDS, stamp, user)
+    return user, stamp
+
+
+def current_stamp(user_id, claimed):
+    stamp = cache.get(_stamp_key(user_id))
+    if stamp != claimed:
+        # Cold or stale cache entry: confirm against the database before deciding
+        _, stamp = _load(user_id)
+    return stamp
+
+
+def user_saved(sender, instance, **kwargs):
+    """post_save receiver: publish the new stamp and drop the cached row"""
+    _users.pop(instance.pk, None)
+    cache.set(_stamp_key(instance.pk), auth_stamp(instance), settings.USER_CACHE_SECONDS)
+
+
+def user_deleted(sender, instance, **kwargs):
+    _users.pop(instance.pk, None)
+    cache.set(_stamp_key(instance.pk), INVALID, settings.USER_CACHE_SECONDS)
+
+
+class ClaimsUser(TokenUser):
+    """request.user built from token claims (see TokenUser for the rest)"""
+
+    @property
+    def branch_id(self):
+        return self.token.get('branch')
+
+    def get_user(self, fresh=False):
+        """The User row, from the local cache unless fresh=True"""
+        entry = _users.get(self.id)
+        if not fresh and entry and entry[0] > time.monotonic() and entry[1] == self.token['auth']:
+            return entry[2]
+        user, stamp = _load(self.id)
+        if user is None or stamp != self.token['auth']:
+            raise AuthenticationFailed('User not found or changed; log in again.', code='user_not_found')
+        return user
+
+
+def full_user(user, fresh=False):
+    """The model instance behind request.user, whichever authentication ran"""
+    return user.get_user(fresh=fresh) if isinstance(user, ClaimsUser) else user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication without the per-request user query"""
+
+    def get_user(self, validated_token):
+        if 'auth' not in validated_token:
+            # Issued before claims were added
+            return super().get_user(validated_token)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        if current_stamp(user_id, validated_token['auth']) != validated_token['auth']:
+            raise AuthenticationFailed('Token is no longer valid; refresh it.', code='token_not_valid')
+        return ClaimsUser(validated_token)
@@ -20,15 +20,12 @@ class EmailBackend(ModelBackend):
             return None
         
         try:
-            # Try to find user by email (case-insensitive)
-            user = User.objects.get(email__iexact=email)
+            # Emails are unique ignoring case, so this is one index seek
+            user = User._default_manager.with_email(email).get()
         except User.DoesNotExist:
             # Run the default password hasher once to reduce timing attacks
             User().set_password(password)
             return None
-        except User.MultipleObjectsReturned:
-            # If multiple users have same email, get the first one
-            user = User.objects.filter(email__iexact=email).first()
         
         if user and user.check_password(password) and self.user_can_authenticate(user):
             return user
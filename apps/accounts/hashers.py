@@ -0,0 +1,84 @@
+"""
+Password hashing cost controls.
+
+The hashers below are Django's Argon2 and scrypt hashers with their cost
+parameters read from settings (ARGON2_*, SCRYPT_*); PASSWORD_HASHER picks
+which one hashes new passwords. Changing either is safe at any time: Django
+still verifies hashes made with another hasher or older parameters, and
+rehashes the password with the current ones at the user's next login.
+
+hashing_slot() caps how many hashes a worker process computes at once
+(LOGIN_HASH_CONCURRENCY), so a burst of logins at a shift change queues
+behind a few slots instead of taking every thread (and CPU) from bookings.
+A login that can't get a slot within LOGIN_HASH_WAIT_SECONDS gets a 503.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.SCRYPT_WORK_FACTOR
+
+    @property
+    def block_size(self):
+        return settings.SCRYPT_BLOCK_SIZE
+
+    @property
+    def parallelism(self):
+        return settings.SCRYPT_PARALLELISM
+
+
+class LoginBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-ins in progress. Try again in a moment.'
+    default_code = 'login_busy'
+    wait = 1  # Sent as Retry-After
+
+
+# limit -> semaphore; per process
+_slots = {}
+_slots_lock = threading.Lock()
+
+
+def _semaphore(limit):
+    with _slots_lock:
+        if limit not in _slots:
+            _slots[limit] = threading.BoundedSemaphore(limit)
+        return _slots[limit]
+
+
+@contextmanager
+def hashing_slot():
+    """Hold one of the process's password hashing slots (raises LoginBusy)"""
+    limit = settings.LOGIN_HASH_CONCURRENCY
+    if limit <= 0:
+        yield
+        return
+    semaphore = _semaphore(limit)
+    if not semaphore.acquire(timeout=settings.LOGIN_HASH_WAIT_SECONDS):
+        raise LoginBusy()
+    try:
+        yield
+    finally:
+        semaphore.release()
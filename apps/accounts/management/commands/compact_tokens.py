@@ -0,0 +1,43 @@
+"""
+Delete expired refresh tokens from the token blacklist tables.
+
+Every login and refresh adds an outstanding token (and every refresh and
+logout a blacklisted one), so run this daily, e.g. from cron:
+
+    python manage.py compact_tokens [--batch-size 1000] [--pause 0.1]
+
+Rows go in primary-key batches, each its own short transaction, so the
+tables aren't locked for the duration on a large backlog. An expired token
+fails signature validation anyway, so dropping its blacklist entry is safe.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted JWT refresh tokens in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now()
+        deleted = 0
+        while True:
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=cutoff)
+                .order_by('expires_at').values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                deleted += OutstandingToken.objects.filter(pk__in=ids).delete()[0]
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired token(s)'))
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Index outstanding tokens by expiry for compact_tokens. The table belongs
+    to simplejwt's token_blacklist app, hence raw SQL.
+    """
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS outstanding_token_expires_idx '
+            'ON token_blacklist_outstandingtoken (expires_at)',
+            reverse_sql='DROP INDEX IF EXISTS outstanding_token_expires_idx',
+        ),
+    ]
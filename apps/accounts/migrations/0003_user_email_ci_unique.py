@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:53
+
+import apps.accounts.models
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def report_duplicate_emails(apps, schema_editor):
+    """Refuse to add the constraint over duplicates, listing them so they can be fixed"""
+    User = apps.get_model('accounts', 'User')
+    users = User.objects.using(schema_editor.connection.alias).exclude(email='').annotate(email_key=Lower('email'))
+    duplicates = users.values('email_key').annotate(count=Count('id')).filter(count__gt=1).values_list('email_key', flat=True)
+    if not duplicates:
+        return
+    lines = []
+    for email_key in duplicates:
+        accounts = users.filter(email_key=email_key).order_by('id').values_list('id', 'username')
+        lines.append(f'  {email_key}: ' + ', '.join(f'{username} (id {pk})' for pk, username in accounts))
+    raise RuntimeError(
+        'Emails must be unique (ignoring case) before this migration can run. '
+        'Change or clear the email on all but one of these users:\n' + '\n'.join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_outstanding_token_expiry_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(report_duplicate_emails, migrations.RunPython.noop),
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', apps.accounts.models.UserManager()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='users_email_ci_unique', violation_error_message='A user with this email already exists.'),
+        ),
+    ]
@@ -1,7 +1,18 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
 from django.db import models
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
 from django.core.validators import RegexValidator
 
+
+class UserManager(BaseUserManager):
+    def with_email(self, email):
+        """
+        Users whose email matches case-insensitively. Compares LOWER(email), so
+        the lookup is a seek on the users_email_ci_unique index (iexact can't use it).
+        """
+        return self.alias(email_key=Lower('email')).filter(email_key=Lower(Value(email))).exclude(email='')
+
 class User(AbstractUser):
     """
     Custom User model with role-based permissions
@@ -29,10 +40,21 @@ class User(AbstractUser):
         )]
     )
     
+    objects = UserManager()
+    
     class Meta:
         db_table = 'users'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        constraints = [
+            # One account per email regardless of case; several users may have none
+            models.UniqueConstraint(
+                Lower('email'),
+                name='users_email_ci_unique',
+                condition=~Q(email=''),
+                violation_error_message='A user with this email already exists.',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
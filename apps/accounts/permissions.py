@@ -0,0 +1,71 @@
+"""
+Branch scoping for admin endpoints.
+
+Admins (superusers and role 'admin') see every branch, as do staff accounts
+that have no branch assigned. Branch managers, and staff assigned to a
+branch, only see their own: BranchScopedMixin filters the view's queryset
+by branch in SQL and refuses writes aimed at another branch.
+
+Everything here reads role/branch_id/is_staff from request.user, which
+ClaimsJWTAuthentication builds from the token, so scoping adds no query.
+"""
+from rest_framework import permissions
+from rest_framework.exceptions import PermissionDenied
+
+
+def sees_all_branches(user):
+    if user.is_superuser or user.role == 'admin':
+        return True
+    # Staff accounts that predate branch assignment keep their access
+    return user.is_staff and user.role != 'branch_manager' and user.branch_id is None
+
+
+def scope_queryset(queryset, user, field='branch'):
+    """Limit `queryset` to the user's branch; `field` is the lookup to Branch"""
+    if not user.is_authenticated or sees_all_branches(user):
+        return queryset
+    if user.branch_id is None:
+        return queryset.none()
+    return queryset.filter(**{field: user.branch_id})
+
+
+class IsBranchStaff(permissions.BasePermission):
+    """Admin users, plus branch managers (limited to their branch by BranchScopedMixin)"""
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        return bool(user.is_staff or (user.role == 'branch_manager' and user.branch_id is not None))
+
+
+class BranchScopedMixin:
+    """
+    For viewsets over branch-owned models. Set branch_field to the lookup
+    from the model to its Branch; list actions that anyone may call in
+    public_actions (those get AllowAny, everything else IsBranchStaff).
+    """
+    branch_field = 'branch'
+    public_actions = ()
+
+    def get_permissions(self):
+        if self.action in self.public_actions:
+            return [permissions.AllowAny()]
+        return [IsBranchStaff()]
+
+    def get_queryset(self):
+        return scope_queryset(super().get_queryset(), self.request.user, self.branch_field)
+
+    def check_branch(self, serializer):
+        user = self.request.user
+        branch = serializer.validated_data.get(self.branch_field)
+        if branch is not None and not sees_all_branches(user) and branch.pk != user.branch_id:
+            raise PermissionDenied('You can only manage your own branch.')
+
+    def perform_create(self, serializer):
+        self.check_branch(serializer)
+        super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        self.check_branch(serializer)
+        super().perform_update(serializer)
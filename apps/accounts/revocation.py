@@ -0,0 +1,141 @@
+"""
+Refresh token revocation.
+
+Refresh tokens are rotated, and the old one blacklisted, on every refresh,
+and blacklisted on logout. simplejwt checks each refresh against the
+blacklist table. RevocableRefreshToken fronts that lookup with a per-process
+Bloom filter of revoked jtis: a jti the filter has never seen is certainly
+not revoked, so only the rare filter hit (a reused token, or a ~1% false
+positive) goes to the database.
+
+Workers keep their filters in step through a generation counter in the
+shared cache, bumped after each revocation; a worker that sees a new
+generation loads the rows added since its last sync (a primary key range
+scan). The filter is rebuilt from unexpired rows every
+TOKEN_REVOCATION_REBUILD_SECONDS so expired jtis drop out.
+
+A per-process cache can't carry the counter between workers, so the filter
+is only used when TOKEN_REVOCATION_FILTER is on (default: with REDIS_URL);
+otherwise every check queries the table as before.
+
+`manage.py compact_tokens` deletes expired rows in chunks.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+GENERATION_KEY = 'token_revocations:generation'
+# Rows re-read on each sync: ids are allocated before commit, so a concurrent
+# revocation can commit with an id below one already seen
+RESYNC_OVERLAP = 100
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], 'little')
+        b = int.from_bytes(digest[8:], 'little') | 1
+        return [(a + i * b) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def is_blacklisted(jti):
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def bump_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        # Missing (first revocation or evicted): start somewhere no worker has seen
+        cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+class RevocationSet:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.seen_id = 0
+        self.loaded = set()  # Row ids added since the last rebuild
+        self.generation = None
+        self.built_at = 0
+
+    def rebuild(self):
+        # Read the high-water mark first: anything added later is picked up by the next sync
+        seen_id = BlacklistedToken.objects.aggregate(latest=Max('id'))['latest'] or 0
+        revoked = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+        jtis = list(revoked.values_list('token__jti', flat=True))
+        bloom = BloomFilter(max(2 * len(jtis), settings.TOKEN_REVOCATION_CAPACITY))
+        for jti in jtis:
+            bloom.add(jti)
+        self.bloom, self.seen_id, self.loaded, self.built_at = bloom, seen_id, set(), time.monotonic()
+
+    def sync(self):
+        generation = cache.get(GENERATION_KEY)
+        expired = time.monotonic() - self.built_at > settings.TOKEN_REVOCATION_REBUILD_SECONDS
+        if self.bloom is None or expired or self.bloom.count > self.bloom.capacity:
+            self.rebuild()
+        elif generation is None or generation != self.generation:
+            recent = BlacklistedToken.objects.filter(id__gt=self.seen_id - RESYNC_OVERLAP)
+            for row_id, jti in recent.values_list('id', 'token__jti'):
+                if row_id not in self.loaded:
+                    self.bloom.add(jti)
+                    self.loaded.add(row_id)
+                    self.seen_id = max(self.seen_id, row_id)
+        self.generation = generation
+
+    def __contains__(self, jti):
+        if not settings.TOKEN_REVOCATION_FILTER:
+            return is_blacklisted(jti)
+        with self.lock:
+            self.sync()
+            maybe = jti in self.bloom
+        return maybe and is_blacklisted(jti)
+
+    def added(self, jti):
+        """Call after a revocation is committed"""
+        bump_generation()
+        with self.lock:
+            if self.bloom is not None:
+                self.bloom.add(jti)
+
+
+revocations = RevocationSet()
+
+
+class RevocableRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist check goes through the revocation filter"""
+
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in revocations:
+            raise TokenError('Token is blacklisted')
+
+    def blacklist(self):
+        result = super().blacklist()
+        revocations.added(self.payload[api_settings.JTI_CLAIM])
+        return result
@@ -1,7 +1,12 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import authenticate
+from .authentication import add_claims, full_user, password_stamp
+from .hashers import hashing_slot
 from .models import User
+from .revocation import RevocableRefreshToken
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -24,8 +29,14 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         model = User
         fields = ('username', 'email', 'password', 'first_name', 'last_name', 'role', 'branch', 'phone')
     
+    def validate_email(self, value):
+        if value and User.objects.with_email(value).exists():
+            raise serializers.ValidationError("This email is already in use.")
+        return value
+    
     def create(self, validated_data):
-        user = User.objects.create_user(**validated_data)
+        with hashing_slot():
+            user = User.objects.create_user(**validated_data)
         return user
 
 
@@ -37,7 +48,7 @@ class UserUpdateSerializer(serializers.ModelSerializer):
     
     def validate_email(self, value):
         user = self.context['request'].user
-        if User.objects.exclude(pk=user.pk).filter(email=value).exists():
+        if value and User.objects.with_email(value).exclude(pk=user.pk).exists():
             raise serializers.ValidationError("This email is already in use.")
         return value
 
@@ -49,8 +60,10 @@ class PasswordChangeSerializer(serializers.Serializer):
     confirm_password = serializers.CharField(required=True, write_only=True)
     
     def validate_current_password(self, value):
-        user = self.context['request'].user
-        if not user.check_password(value):
+        user = full_user(self.context['request'].user, fresh=True)
+        with hashing_slot():
+            valid = user.check_password(value)
+        if not valid:
             raise serializers.ValidationError("Current password is incorrect.")
         return value
     
@@ -62,8 +75,9 @@ class PasswordChangeSerializer(serializers.Serializer):
         return data
     
     def save(self):
-        user = self.context['request'].user
-        user.set_password(self.validated_data['new_password'])
+        user = full_user(self.context['request'].user, fresh=True)
+        with hashing_slot():
+            user.set_password(self.validated_data['new_password'])
         user.save()
         return user
 
@@ -73,6 +87,12 @@ class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
     Custom JWT serializer that accepts email instead of username.
     """
     username_field = 'email'
+    token_class = RevocableRefreshToken
+    
+    @classmethod
+    def get_token(cls, user):
+        # Claims let ClaimsJWTAuthentication authorize without loading the user
+        return add_claims(super().get_token(user), user)
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -85,12 +105,13 @@ class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
         password = attrs.get('password')
         
         if email and password:
-            # Authenticate using email
-            user = authenticate(
-                request=self.context.get('request'),
-                username=email,  # Our backend treats this as email
-                password=password
-            )
+            # Authenticate using email; hashing waits for a free slot (503 if none)
+            with hashing_slot():
+                user = authenticate(
+                    request=self.context.get('request'),
+                    username=email,  # Our backend treats this as email
+                    password=password
+                )
             
             if not user:
                 raise serializers.ValidationError(
@@ -126,3 +147,37 @@ class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
         }
 
 
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh that re-reads the user: refused after a password change,
+    otherwise issues tokens with current role/branch claims.
+    """
+    token_class = RevocableRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}).first()
+        if (
+            user is None
+            or not api_settings.USER_AUTHENTICATION_RULE(user)
+            or refresh.get('pwd', password_stamp(user)) != password_stamp(user)
+        ):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        add_claims(refresh, user)
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # Blacklist app not installed
+                    pass
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+        return data
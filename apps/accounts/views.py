@@ -1,9 +1,10 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
+from .authentication import full_user
 from .models import User
+from .revocation import RevocableRefreshToken
 from .serializers import (
     UserSerializer, 
     UserRegistrationSerializer,
@@ -35,7 +36,8 @@ class CurrentUserView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
-        return self.request.user
+        # Updates start from the current row, not the cached copy
+        return full_user(self.request.user, fresh=self.request.method not in permissions.SAFE_METHODS)
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -54,9 +56,15 @@ class PasswordChangeView(APIView):
         )
         
         if serializer.is_valid():
-            serializer.save()
+            user = serializer.save()
+            # Tokens issued before the change stop working; hand this client new ones
+            refresh = EmailTokenObtainPairSerializer.get_token(user)
             return Response(
-                {"detail": "Password changed successfully."},
+                {
+                    "detail": "Password changed successfully.",
+                    "refresh": str(refresh),
+                    "access": str(refresh.access_token),
+                },
                 status=status.HTTP_200_OK
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -73,7 +81,7 @@ class LogoutView(APIView):
                     {"detail": "Refresh token is required."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            token = RefreshToken(refresh_token)
+            token = RevocableRefreshToken(refresh_token)
             token.blacklist()
             return Response(
                 {"detail": "Successfully logged out."},
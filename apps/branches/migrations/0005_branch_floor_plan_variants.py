@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branches', '0004_alter_branch_hours'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='branch',
+            name='floor_plan_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -1,8 +1,9 @@
 from django.db import models
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 from datetime import time, date
+from apps.core.images import ResponsiveImagesMixin
 
-class Branch(models.Model):
+class Branch(ResponsiveImagesMixin, models.Model):
     """
     Restaurant Branch model
     """
@@ -43,10 +44,13 @@ class Branch(models.Model):
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     has_floor_plan = models.BooleanField(default=False)
     floor_plan = models.ImageField(upload_to='floor_plans/', null=True, blank=True)
+    floor_plan_variants = models.JSONField(default=dict, blank=True, editable=False)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    responsive_images = {'floor_plan': 'floor_plan_variants'}
+    
     class Meta:
         db_table = 'branches'
         ordering = ['name']
@@ -66,39 +70,58 @@ class Branch(models.Model):
         # 1. Check for special date override
         special = self.special_dates.filter(date=target_date).first()
         if special:
-            if special.is_closed:
-                return {
-                    'is_open': False,
-                    'opening_time': None,
-                    'closing_time': None,
-                    'note': special.note or 'Closed'
-                }
-            return {
-                'is_open': True,
-                'opening_time': special.opening_time,
-                'closing_time': special.closing_time,
-                'note': special.note
-            }
+            return self._special_hours(special)
         
         # 2. Check for day-specific hours
         day_of_week = target_date.weekday()  # Monday = 0, Sunday = 6
         day_hours = self.operating_hours.filter(day_of_week=day_of_week).first()
         if day_hours:
-            if day_hours.is_closed:
-                return {
-                    'is_open': False,
-                    'opening_time': None,
-                    'closing_time': None,
-                    'note': 'Closed on this day'
-                }
-            return {
-                'is_open': True,
-                'opening_time': day_hours.opening_time,
-                'closing_time': day_hours.closing_time,
-                'note': None
-            }
+            return self._day_hours(day_hours)
         
         # 3. Fallback to default branch hours
+        return self._default_hours()
+    
+    async def aget_hours_for_date(self, target_date: date) -> dict:
+        """Async version of get_hours_for_date()"""
+        special = await self.special_dates.filter(date=target_date).afirst()
+        if special:
+            return self._special_hours(special)
+        day_hours = await self.operating_hours.filter(day_of_week=target_date.weekday()).afirst()
+        if day_hours:
+            return self._day_hours(day_hours)
+        return self._default_hours()
+    
+    def _special_hours(self, special):
+        if special.is_closed:
+            return {
+                'is_open': False,
+                'opening_time': None,
+                'closing_time': None,
+                'note': special.note or 'Closed'
+            }
+        return {
+            'is_open': True,
+            'opening_time': special.opening_time,
+            'closing_time': special.closing_time,
+            'note': special.note
+        }
+    
+    def _day_hours(self, day_hours):
+        if day_hours.is_closed:
+            return {
+                'is_open': False,
+                'opening_time': None,
+                'closing_time': None,
+                'note': 'Closed on this day'
+            }
+        return {
+            'is_open': True,
+            'opening_time': day_hours.opening_time,
+            'closing_time': day_hours.closing_time,
+            'note': None
+        }
+    
+    def _default_hours(self):
         return {
             'is_open': True,
             'opening_time': self.opening_time,
@@ -1,8 +1,12 @@
 from rest_framework import serializers
+from apps.core.serializers import ImageVariantsField, UploadedImageField
 from .models import Branch, OperatingHours, SpecialDate
 
 
 class BranchSerializer(serializers.ModelSerializer):
+    floor_plan = UploadedImageField(required=False, allow_null=True)
+    floor_plan_variants = ImageVariantsField()
+    
     class Meta:
         model = Branch
         fields = '__all__'
@@ -43,6 +47,7 @@ class BranchHoursSerializer(serializers.Serializer):
 class BranchDetailSerializer(serializers.ModelSerializer):
     """Extended branch serializer with hours info"""
     operating_hours = OperatingHoursSerializer(many=True, read_only=True)
+    floor_plan_variants = ImageVariantsField()
     upcoming_special_dates = serializers.SerializerMethodField()
     
     class Meta:
@@ -2,6 +2,7 @@ from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from datetime import datetime, date
+from apps.accounts.permissions import BranchScopedMixin
 from .models import Branch, OperatingHours, SpecialDate
 from .serializers import (
     BranchSerializer, 
@@ -77,23 +78,18 @@ class BranchViewSet(viewsets.ModelViewSet):
         })
 
 
-class OperatingHoursViewSet(viewsets.ModelViewSet):
-    """Viewset for managing weekly operating hours - public read, admin write"""
+class OperatingHoursViewSet(BranchScopedMixin, viewsets.ModelViewSet):
+    """Viewset for managing weekly operating hours - public read, admin/branch manager write"""
     queryset = OperatingHours.objects.all()
     serializer_class = OperatingHoursSerializer
     filterset_fields = ['branch', 'day_of_week', 'is_closed']
-    
-    def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
-            return [permissions.AllowAny()]
-        return [permissions.IsAdminUser()]
+    public_actions = ['list', 'retrieve']
 
 
-class SpecialDateViewSet(viewsets.ModelViewSet):
-    """Admin-only viewset for managing special dates"""
+class SpecialDateViewSet(BranchScopedMixin, viewsets.ModelViewSet):
+    """Admin/branch manager viewset for managing special dates"""
     queryset = SpecialDate.objects.all()
     serializer_class = SpecialDateSerializer
-    permission_classes = [permissions.IsAdminUser]
     filterset_fields = ['branch', 'type', 'is_closed']
     
     def get_queryset(self):
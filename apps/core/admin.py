@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import ImageJob
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ('model_label', 'object_id', 'image_field', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status', 'model_label')
+    search_fields = ('source',)
+    readonly_fields = ('created_at', 'updated_at', 'locked_at')
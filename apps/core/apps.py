@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.core'
+    verbose_name = 'Core'
+
+    def ready(self):
+        from . import dbhooks, serialization, sqlite
+        serialization.install()
+        connection_created.connect(dbhooks.install, dispatch_uid='core_dbhooks')
+        connection_created.connect(sqlite.configure, dispatch_uid='core_sqlite')
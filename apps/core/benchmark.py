@@ -0,0 +1,450 @@
+"""
+Endpoint benchmark: synthetic dataset seeding and per-endpoint measurements.
+
+Driven by `python manage.py benchmark` and `python manage.py
+connection_benchmark`; see those commands for usage.
+"""
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.branches.models import Branch, OperatingHours
+from apps.deals.models import Deal
+from apps.gallery.models import GalleryImage
+from apps.inquiries.models import Inquiry
+from apps.menu.models import Category, MenuItem
+from apps.reservations.models import Customer, Reservation
+from apps.tables.models import Table
+
+from . import dbhooks
+from .middleware import QueryTimer
+
+BATCH_SIZE = 5000
+
+# (name, method, path, body, requires admin). Paths are formatted with the
+# context returned by seed_dataset().
+ENDPOINTS = [
+    # Public
+    ('branches.list', 'get', '/api/branches/', None, False),
+    ('branches.detail', 'get', '/api/branches/{branch_id}/', None, False),
+    ('branches.hours', 'get', '/api/branches/{branch_id}/hours/', None, False),
+    ('branches.hours_for_date', 'get', '/api/branches/{branch_id}/hours/{date}/', None, False),
+    ('tables.list', 'get', '/api/tables/?branch={branch_id}', None, False),
+    ('tables.availability', 'get', '/api/tables/availability/?branch={branch_id}&date={date}&time=19:00&guests=2', None, False),
+    ('tables.available_slots', 'get', '/api/tables/available_slots/?branch={branch_id}&date={date}&guests=2', None, False),
+    ('menu.list', 'get', '/api/menu/', None, False),
+    ('menu.featured', 'get', '/api/menu/featured/', None, False),
+    ('menu.categories', 'get', '/api/menu/categories/', None, False),
+    ('deals.list', 'get', '/api/deals/', None, False),
+    ('deals.validate', 'post', '/api/deals/validate/', {'code': '{deal_code}'}, False),
+    ('menu.quote', 'post', '/api/menu/quote/', {
+        'items': [{'id': '{menu_item_id}', 'quantity': 2}, {'id': '{other_menu_item_id}', 'quantity': 1}],
+        'code': '{deal_code}',
+    }, False),
+    ('gallery.list', 'get', '/api/gallery/', None, False),
+    ('reservations.by_confirmation', 'get', '/api/reservations/by_confirmation/?confirmation_id={confirmation_id}', None, False),
+    ('reservations.my_reservations', 'get', '/api/reservations/my_reservations/?phone={phone}', None, False),
+    ('reservations.create', 'post', '/api/reservations/', {
+        'branch': '{branch_id}', 'customer_name': 'Bench Guest', 'phone': '{phone}',
+        'date': '{date}', 'time': '19:00', 'guests': 2,
+    }, False),
+    ('inquiries.create', 'post', '/api/inquiries/', {
+        'name': 'Bench', 'email': 'bench@example.com', 'subject': 'Hi', 'message': 'Hello',
+    }, False),
+    # Admin
+    ('auth.me', 'get', '/api/auth/me/', None, True),
+    ('reservations.list', 'get', '/api/reservations/', None, True),
+    ('reservations.search', 'get', '/api/reservations/?search={phone}', None, True),
+    ('reservations.filter', 'get', '/api/reservations/?branch={branch_id}&date={date}', None, True),
+    ('reservations.today', 'get', '/api/reservations/today/?branch={branch_id}', None, True),
+    ('reservations.stats', 'get', '/api/reservations/stats/?branch={branch_id}', None, True),
+    ('inquiries.list', 'get', '/api/inquiries/', None, True),
+    ('dashboard.stats', 'get', '/api/dashboard/stats/', None, True),
+    ('dashboard.reservation_trends', 'get', '/api/dashboard/stats/reservation-trends/', None, True),
+    ('dashboard.branch_performance', 'get', '/api/dashboard/stats/branch-performance/', None, True),
+    ('dashboard.menu_analytics', 'get', '/api/dashboard/stats/menu-analytics/', None, True),
+]
+
+
+def seed_dataset(branches=5, tables_per_branch=20, reservations=100_000, menu_items=300, seed=42, log=None):
+    """
+    Bulk-insert a deterministic synthetic dataset (bypasses model save()).
+    Returns the context used to fill endpoint paths.
+    """
+    rng = random.Random(seed)
+    log = log or (lambda msg: None)
+    today = date.today()
+
+    branch_objs = Branch.objects.bulk_create([
+        Branch(
+            name=f'Bench Branch {i}', address=f'{i} Bench Street', phone='9876543210',
+            opening_time=dt_time(11, 0), closing_time=dt_time(23, 0),
+        )
+        for i in range(branches)
+    ])
+    OperatingHours.objects.bulk_create([
+        OperatingHours(branch=branch, day_of_week=day, opening_time=dt_time(11, 0), closing_time=dt_time(23, 0))
+        for branch in branch_objs
+        for day in range(7)
+    ])
+    table_objs = Table.objects.bulk_create([
+        Table(table_id=f'T{n}', name=f'Table {n}', seats=rng.choice([2, 4, 4, 6, 8]), branch=branch)
+        for branch in branch_objs
+        for n in range(1, tables_per_branch + 1)
+    ])
+    tables_by_branch = {}
+    for table in table_objs:
+        tables_by_branch.setdefault(table.branch_id, []).append(table)
+    log(f'Seeded {branches} branches, {len(table_objs)} tables')
+
+    categories = Category.objects.bulk_create([
+        Category(name=f'Category {i}', slug=f'category-{i}') for i in range(12)
+    ])
+    menu_objs = MenuItem.objects.bulk_create([
+        MenuItem(
+            name=f'Dish {i}', description='Synthetic benchmark dish',
+            category=categories[i % len(categories)], category_text=categories[i % len(categories)].name,
+            price=Decimal(rng.randint(80, 900)), is_veg=rng.random() < 0.4,
+            is_featured=i < 12, featured_order=i,
+        )
+        for i in range(menu_items)
+    ], batch_size=BATCH_SIZE)
+    Deal.objects.bulk_create([
+        Deal(
+            title=f'Deal {i}', description='Synthetic deal', code=f'BENCH{i}',
+            discount_type='percentage', discount_value=Decimal(10),
+            valid_from=today - timedelta(days=10), valid_until=today + timedelta(days=20), tag='Bench',
+        )
+        for i in range(20)
+    ])
+    GalleryImage.objects.bulk_create([
+        GalleryImage(category='ambience', caption=f'Photo {i}') for i in range(30)
+    ])
+    Inquiry.objects.bulk_create([
+        Inquiry(name=f'Guest {i}', email=f'guest{i}@example.com', subject='Question', message='Hello')
+        for i in range(200)
+    ])
+    log(f'Seeded {menu_items} menu items, deals, gallery and inquiries')
+
+    customers = Customer.objects.bulk_create([
+        Customer(
+            name=f'Guest {i}', phone=f'9{i:09d}', email=f'guest{i}@example.com',
+            phone_key=f'9{i:09d}', email_key=f'guest{i}@example.com',
+        )
+        for i in range(max(1, reservations // 4))
+    ], batch_size=BATCH_SIZE)
+
+    slots = [dt_time(hour, minute) for hour in range(11, 21) for minute in (0, 30)]
+    visits = Counter()
+    last_visit = {}
+    batch = []
+    for i in range(reservations):
+        branch = rng.choice(branch_objs)
+        table = rng.choice(tables_by_branch[branch.id])
+        customer = rng.choice(customers)
+        day = today + timedelta(days=rng.randint(-90, 30))
+        start = rng.choice(slots)
+        guests = rng.randint(1, table.seats)
+        duration = Reservation.calculate_duration_from_guests(guests)
+        if day < today:
+            state = rng.choices(['completed', 'cancelled', 'no_show'], [85, 10, 5])[0]
+        else:
+            state = rng.choices(['pending', 'confirmed', 'cancelled'], [40, 50, 10])[0]
+        batch.append(Reservation(
+            confirmation_id=f'CI{i:012X}', branch=branch, table=table, customer=customer,
+            customer_name=customer.name, phone=customer.phone, email=customer.email,
+            date=day, time=start, duration_minutes=duration,
+            end_time=(datetime.combine(day, start) + timedelta(minutes=duration)).time(),
+            guests=guests, status=state,
+        ))
+        visits[customer.pk] += 1
+        last_visit[customer.pk] = max(day, last_visit.get(customer.pk, day))
+        if len(batch) == BATCH_SIZE:
+            Reservation.objects.bulk_create(batch)
+            batch = []
+            log(f'Seeded {i + 1} reservations')
+    Reservation.objects.bulk_create(batch)
+
+    for customer in customers:
+        customer.visit_count = visits[customer.pk]
+        customer.last_visit = last_visit.get(customer.pk)
+    Customer.objects.bulk_update(customers, ['visit_count', 'last_visit'], batch_size=BATCH_SIZE)
+
+    admin = get_user_model().objects.create_superuser(
+        'bench-admin', email='bench-admin@example.com', password='bench-admin-pass'
+    )
+    log(f'Seeded {reservations} reservations for {len(customers)} customers')
+
+    sample = Reservation.objects.order_by('pk').first()
+    return {
+        'admin_id': admin.pk,
+        'branch_id': branch_objs[0].pk,
+        'date': (today + timedelta(days=1)).isoformat(),
+        'deal_code': 'BENCH0',
+        'menu_item_id': menu_objs[0].pk,
+        'other_menu_item_id': menu_objs[-1].pk,
+        'confirmation_id': sample.confirmation_id if sample else '',
+        'phone': sample.phone if sample else '',
+        'sizes': {
+            'branches': branches,
+            'tables': len(table_objs),
+            'reservations': reservations,
+            'customers': len(customers),
+            'menu_items': menu_items,
+        },
+    }
+
+
+def _fill(value, context):
+    if isinstance(value, dict):
+        return {key: _fill(item, context) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill(item, context) for item in value]
+    if isinstance(value, str):
+        return value.format(**context)
+    return value
+
+
+def _percentiles(samples):
+    ms = sorted(sample * 1000 for sample in samples)
+    cuts = statistics.quantiles(ms, n=100, method='inclusive') if len(ms) > 1 else ms * 99
+    return {
+        'min': round(ms[0], 3),
+        'p50': round(cuts[49], 3),
+        'p90': round(cuts[89], 3),
+        'p95': round(cuts[94], 3),
+        'p99': round(cuts[98], 3),
+        'max': round(ms[-1], 3),
+        'mean': round(statistics.fmean(ms), 3),
+    }
+
+
+def measure(call, iterations, warmup):
+    """Latency percentiles and per-request query count, plus one traced call for allocations"""
+    for _ in range(warmup):
+        call()
+
+    latencies = []
+    queries = []
+    for _ in range(iterations):
+        timer = QueryTimer()
+        with dbhooks.hook(timer):
+            start = time.perf_counter()
+            response = call()
+            latencies.append(time.perf_counter() - start)
+        queries.append(timer.count)
+
+    # Allocation pass is separate: tracemalloc slows everything down
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'latency_ms': _percentiles(latencies),
+        'queries': max(queries),
+        'alloc_peak_kib': round((peak - baseline) / 1024, 1),
+        'response_bytes': len(response.content),
+    }
+
+
+def _benchmark_settings():
+    return override_settings(
+        DEBUG=False,
+        NPLUSONE_MODE='off',
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}},
+    )
+
+
+def _endpoint_calls(context, only=None):
+    """Yield (name, url, call) for each selected endpoint"""
+    public = APIClient()
+    admin = APIClient()
+    admin_user = get_user_model().objects.get(pk=context['admin_id'])
+    admin.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin_user).access_token}')
+
+    for name, method, path, body, needs_admin in ENDPOINTS:
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        client = admin if needs_admin else public
+        url = _fill(path, context)
+        data = _fill(body, context)
+
+        def call(client=client, method=method, url=url, data=data):
+            return getattr(client, method)(url, data, format='json') if data else getattr(client, method)(url)
+
+        yield name, method, url, call
+
+
+def run_benchmarks(context, iterations=50, warmup=5, only=None, log=None):
+    """Hit every endpoint through the test client and return {name: measurements}"""
+    log = log or (lambda msg: None)
+    results = {}
+    with _benchmark_settings():
+        for name, method, url, call in _endpoint_calls(context, only):
+            results[name] = {'method': method.upper(), 'path': url, **measure(call, iterations, warmup)}
+            log(f"{name:36} p50={results[name]['latency_ms']['p50']:8.2f}ms  queries={results[name]['queries']}")
+    return results
+
+
+# Connection lifetime strategies compared by run_connection_benchmarks()
+CONNECTION_MODES = {
+    'per-request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'pool': {'min_size': 1, 'max_size': 2}},
+}
+
+
+def pool_supported():
+    """Django's native pool needs PostgreSQL through psycopg 3 with psycopg_pool"""
+    if connection.vendor != 'postgresql':
+        return False
+    try:
+        import psycopg_pool  # noqa: F401
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    except ImportError:
+        return False
+    return is_psycopg3
+
+
+@contextmanager
+def connection_mode(mode):
+    """Temporarily switch the default connection to one of CONNECTION_MODES"""
+    options = CONNECTION_MODES[mode]
+    settings_dict = connection.settings_dict
+    saved = {key: settings_dict.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+    saved_options = dict(settings_dict.get('OPTIONS', {}))
+
+    connection.close()
+    settings_dict['CONN_MAX_AGE'] = options['CONN_MAX_AGE']
+    settings_dict['CONN_HEALTH_CHECKS'] = options['CONN_HEALTH_CHECKS']
+    if 'pool' in options:
+        settings_dict['OPTIONS'] = {**saved_options, 'pool': options['pool']}
+    try:
+        yield
+    finally:
+        connection.close()
+        if 'pool' in options:
+            connection.close_pool()
+        settings_dict.update(saved)
+        settings_dict['OPTIONS'] = saved_options
+
+
+def run_connection_benchmarks(context, modes, iterations=200, warmup=10, only=None, log=None):
+    """
+    Per-request latency of each endpoint under each connection strategy.
+
+    The test client disconnects close_old_connections() from the request
+    signals, so each call runs it before and after the request the way the
+    real handlers do; with CONN_MAX_AGE=0 that closes the connection after
+    every request.
+    """
+    log = log or (lambda msg: None)
+    connects = []
+
+    def count_connect(sender, connection, **kwargs):
+        connects.append(connection.alias)
+
+    results = {}
+    connection_created.connect(count_connect)
+    try:
+        with _benchmark_settings():
+            for mode in modes:
+                if mode == 'pool' and not pool_supported():
+                    log('pool: skipped (needs PostgreSQL with psycopg 3 and psycopg_pool)')
+                    continue
+                results[mode] = {}
+                with connection_mode(mode):
+                    for name, method, url, call in _endpoint_calls(context, only):
+                        def request(call=call):
+                            close_old_connections()
+                            try:
+                                return call()
+                            finally:
+                                close_old_connections()
+
+                        del connects[:]
+                        measured = measure(request, iterations, warmup)
+                        total = iterations + warmup + 1
+                        results[mode][name] = {
+                            'latency_ms': measured['latency_ms'],
+                            'queries': measured['queries'],
+                            'connects_per_request': round(len(connects) / total, 2),
+                        }
+                        log(f"{mode:12} {name:36} p50={measured['latency_ms']['p50']:8.2f}ms  "
+                            f"connects/req={results[mode][name]['connects_per_request']}")
+    finally:
+        connection_created.disconnect(count_connect)
+    return results
+
+
+def run_parallel_bookings(branch_id, writers=8, bookings_per_writer=25):
+    """
+    Book from `writers` threads at once, each booking a check-then-insert
+    transaction like the availability check before a reservation. Every
+    booking gets its own table/date so only lock contention can fail it.
+    """
+    tables = list(Table.objects.filter(branch_id=branch_id).values_list('id', flat=True))
+    first_date = date.today() + timedelta(days=400)  # Clear of any seeded reservations
+    barrier = threading.Barrier(writers)
+    booked = []
+    errors = Counter()
+
+    def writer(n):
+        try:
+            barrier.wait()
+            for k in range(bookings_per_writer):
+                i = n * bookings_per_writer + k
+                table_id = tables[i % len(tables)]
+                booking_date = first_date + timedelta(days=i // len(tables))
+                try:
+                    with transaction.atomic():
+                        if Reservation.objects.filter(
+                            table_id=table_id, date=booking_date, status__in=['pending', 'confirmed']
+                        ).exists():
+                            continue
+                        Reservation.objects.create(
+                            branch_id=branch_id, table_id=table_id, customer_name=f'Writer {n}',
+                            phone=f'8{i:09d}', date=booking_date, time=dt_time(19, 0), guests=2,
+                        )
+                    booked.append(i)
+                except OperationalError as e:
+                    errors[str(e)] += 1
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'writers': writers,
+        'attempted': writers * bookings_per_writer,
+        'booked': len(booked),
+        'errors': dict(errors),
+        'elapsed_s': round(elapsed, 3),
+        'bookings_per_s': round(len(booked) / elapsed, 1),
+    }
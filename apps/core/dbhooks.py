@@ -0,0 +1,36 @@
+"""
+Request-scoped SQL hooks that also see queries run in other threads.
+
+connection.execute_wrapper() only applies to the calling thread's connection,
+but under ASGI the ORM runs in sync_to_async worker threads. Instead, one
+dispatcher is installed on every connection (via connection_created) and
+calls whatever hooks are active in the current context; contextvars are
+copied into sync_to_async threads, so hooks follow the request.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+_hooks = ContextVar('db_hooks', default=())
+
+
+def dispatch(execute, sql, params, many, context):
+    for hook in reversed(_hooks.get()):
+        execute = partial(hook, execute)
+    return execute(sql, params, many, context)
+
+
+def install(sender, connection, **kwargs):
+    """connection_created receiver"""
+    if dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.append(dispatch)
+
+
+@contextmanager
+def hook(wrapper):
+    """Activate an execute_wrapper-style callable for the current context"""
+    token = _hooks.set(_hooks.get() + (wrapper,))
+    try:
+        yield wrapper
+    finally:
+        _hooks.reset(token)
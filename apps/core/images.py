@@ -0,0 +1,228 @@
+"""
+Responsive image variants.
+
+Uploaded photos (often 5-10 MB from a phone) are re-encoded into WebP and
+JPEG at several widths, with EXIF dropped and orientation applied. The
+result is stored as a JSON map on the model:
+
+    {"source": "menu/abc.jpg", "width": 4032, "height": 3024,
+     "webp": {"320": "menu/variants/abc-320w.webp", ...},
+     "jpeg": {"320": "menu/variants/abc-320w.jpg", ...}}
+
+and rendered by apps.core.serializers.ImageVariantsField as URLs plus
+ready-made srcset strings. The uploaded original is kept as-is.
+
+Saving a model with ResponsiveImagesMixin queues the work (apps/core/jobs.py,
+run by `manage.py image_worker`) unless IMAGE_VARIANTS_INLINE is set.
+"""
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+ORIENTATION_TAG = 0x0112
+
+# What render_variants() raises for files Pillow can't decode; retrying won't help
+RENDER_ERRORS = (OSError, ValueError, SyntaxError, Image.DecompressionBombError)
+
+FORMATS = {
+    # name: (Pillow format, extension, save options)
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def target_widths(width, widths):
+    """Widths narrower than the original, plus the original if it's below the largest"""
+    targets = [w for w in widths if w < width]
+    if width <= max(widths):
+        targets.append(width)
+    return sorted(set(targets))
+
+
+def variant_name(source, width, extension):
+    directory, filename = posixpath.split(source)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'variants', f'{stem}-{width}w.{extension}')
+
+
+def _flatten(image):
+    """RGB copy for JPEG; transparent areas become white"""
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def render_variants(data, widths):
+    """
+    Encode every variant of an image given as bytes. Pure CPU work that
+    touches neither settings nor storage, so it can run in a worker process.
+
+    Returns (width, height, {format: {width: bytes}}) where width/height are
+    the original's, after EXIF orientation.
+    """
+    with Image.open(BytesIO(data)) as image:
+        width, height = image.size
+        if image.getexif().get(ORIENTATION_TAG, 1) in (5, 6, 7, 8):
+            width, height = height, width
+
+        # Let the JPEG decoder downscale while decoding (much faster for big photos)
+        largest = max(widths)
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        rendered = {name: {} for name in FORMATS}
+        for target in target_widths(width, widths):
+            size = (target, max(1, round(height * target / width)))
+            resized = image if image.size == size else image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+            for name, (pil_format, _, options) in FORMATS.items():
+                out = BytesIO()
+                # No exif= argument: metadata is not copied into the variant
+                (_flatten(resized) if pil_format == 'JPEG' else resized).save(out, pil_format, **options)
+                rendered[name][target] = out.getvalue()
+    return width, height, rendered
+
+
+def save_variants(source, width, height, rendered, storage=default_storage):
+    """Write rendered variants next to the source and return the variant map"""
+    variants = {'source': source, 'width': width, 'height': height}
+    for name, by_width in rendered.items():
+        extension = FORMATS[name][1]
+        variants[name] = {}
+        for target, content in by_width.items():
+            path = variant_name(source, target, extension)
+            # Regenerating (e.g. a retry) replaces the file instead of adding a suffix
+            if storage.exists(path):
+                storage.delete(path)
+            variants[name][str(target)] = storage.save(path, ContentFile(content))
+    return variants
+
+
+def variant_paths(variants):
+    return {path for name in FORMATS for path in (variants or {}).get(name, {}).values()}
+
+
+def delete_variants(variants, keep=None, storage=default_storage):
+    """Delete a map's variant files, except any also listed in `keep`"""
+    if getattr(storage, 'shares_files', False):
+        # Content-addressed files may be used elsewhere; gc_media cleans up
+        return
+    for path in variant_paths(variants) - variant_paths(keep):
+        storage.delete(path)
+
+
+def is_complete(variants, storage=default_storage):
+    """True if a map has every configured width and all its files exist"""
+    if not variants or 'webp' not in variants:
+        return False
+    widths = {str(w) for w in target_widths(variants['width'], settings.IMAGE_VARIANT_WIDTHS)}
+    return (
+        all(set(variants.get(name, {})) == widths for name in FORMATS)
+        and all(storage.exists(path) for path in variant_paths(variants))
+    )
+
+
+def shared_variants(source, storage=default_storage):
+    """
+    With content-addressed storage, another object using the same file may
+    already have its variants; return that map so they aren't rebuilt.
+    """
+    from django.apps import apps
+
+    if not getattr(storage, 'shares_files', False):
+        return None
+    for model in apps.get_models():
+        if not issubclass(model, ResponsiveImagesMixin):
+            continue
+        for image_field, variants_field in model.responsive_images.items():
+            maps = model._base_manager.filter(**{image_field: source}).values_list(variants_field, flat=True)
+            for variants in maps:
+                if (variants or {}).get('source') == source and is_complete(variants, storage):
+                    return variants
+    return None
+
+
+def build_variants(field_file):
+    """Read an image field's file, render and store its variants; returns the variant map"""
+    with field_file.open('rb') as f:
+        data = f.read()
+    try:
+        width, height, rendered = render_variants(data, settings.IMAGE_VARIANT_WIDTHS)
+    except RENDER_ERRORS as e:
+        logger.warning('Could not build image variants for %s: %s', field_file.name, e)
+        # Remember the failure so the same file isn't retried on every save
+        return {'source': field_file.name, 'error': str(e)}
+    return save_variants(field_file.name, width, height, rendered, storage=field_file.storage)
+
+
+def is_stale(instance, image_field, variants_field):
+    field_file = getattr(instance, image_field)
+    variants = getattr(instance, variants_field) or {}
+    return (field_file.name or None) != variants.get('source')
+
+
+def apply_variants(model, pk, image_field, source, variants):
+    """
+    Store a variant map built from `source`, unless the object's image has
+    changed since (then the map is discarded). Returns True if stored.
+    """
+    variants_field = model.responsive_images[image_field]
+    storage = model._meta.get_field(image_field).storage
+    current = model._base_manager.filter(pk=pk).values_list(variants_field, flat=True).first()
+    with transaction.atomic():
+        # Queryset update: no save() recursion, no auto_now bump
+        updated = model._base_manager.filter(pk=pk, **{image_field: source or ''}).update(
+            **{variants_field: variants}, **model.variants_update_fields()
+        )
+    if not updated:
+        delete_variants(variants, keep=current, storage=storage)
+        return False
+    delete_variants(current, keep=variants, storage=storage)
+    return True
+
+
+def refresh_variants(instance, image_field, variants_field):
+    """Rebuild the variant map now if the image changed since it was built"""
+    if not is_stale(instance, image_field, variants_field):
+        return
+    field_file = getattr(instance, image_field)
+    variants = build_variants(field_file) if field_file else {}
+    if apply_variants(type(instance), instance.pk, image_field, field_file.name, variants):
+        setattr(instance, variants_field, variants)
+
+
+class ResponsiveImagesMixin:
+    """
+    Keeps variant maps in sync with image fields on save. Declare
+    responsive_images = {'image_field': 'variants_json_field'} on the model.
+    """
+    responsive_images = {}
+
+    @classmethod
+    def variants_update_fields(cls):
+        """Extra {field: value} to store along with a new variant map"""
+        return {}
+
+    def save(self, *args, **kwargs):
+        from . import jobs
+
+        super().save(*args, **kwargs)
+        for image_field, variants_field in self.responsive_images.items():
+            if not is_stale(self, image_field, variants_field):
+                continue
+            if settings.IMAGE_VARIANTS_INLINE or not getattr(self, image_field):
+                refresh_variants(self, image_field, variants_field)
+            else:
+                jobs.enqueue(self, image_field)
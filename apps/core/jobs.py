@@ -0,0 +1,242 @@
+"""
+Background queue for responsive image variants (apps/core/images.py).
+
+Saving a model with a new image adds an ImageJob row instead of encoding
+10 variants inside the request. `manage.py image_worker` claims due jobs,
+reads each source file and hands the bytes to a process pool for
+render_variants(); the main process writes the results to storage and
+stores the variant map.
+
+Jobs are idempotent:
+  * one row per (object, image field, source file), so saving twice or
+    running the backfill again doesn't queue duplicate work;
+  * a rerun writes the same variant files again (overwritten in place, or
+    deduplicated by content-addressed storage);
+  * a file already processed for another object (content-addressed storage
+    makes re-uploads the same file) reuses that object's variants;
+  * the map is only stored if the object still has that source file, so a
+    job for a replaced image ends as 'superseded' instead of clobbering the
+    newer one.
+
+Files Pillow can't decode fail immediately (the error is stored in the map
+so saves don't requeue them). Anything else - storage hiccups, a killed pool
+process - is retried with exponential backoff up to IMAGE_JOB_MAX_ATTEMPTS.
+A job left running by a crashed worker is picked up again after
+IMAGE_JOB_LOCK_SECONDS.
+"""
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import images
+from .models import ImageJob
+
+logger = logging.getLogger(__name__)
+
+SUPERSEDED = 'superseded'
+
+
+def enqueue(instance, image_field):
+    """Queue variant generation for the instance's current file"""
+    label = instance._meta.label
+    source = getattr(instance, image_field).name
+    job, created = ImageJob.objects.get_or_create(
+        model_label=label, object_id=instance.pk, image_field=image_field, source=source
+    )
+    if not created and job.status in (ImageJob.DONE, ImageJob.FAILED):
+        # Finished but the map doesn't match (e.g. retries ran out): run it again
+        reset(ImageJob.objects.filter(pk=job.pk))
+    # Earlier uploads that haven't been processed yet no longer matter
+    ImageJob.objects.filter(
+        model_label=label, object_id=instance.pk, image_field=image_field, status=ImageJob.PENDING
+    ).exclude(source=source).update(status=ImageJob.DONE, last_error=SUPERSEDED, updated_at=timezone.now())
+    return job
+
+
+def enqueue_many(model, image_field, rows):
+    """Queue (pk, source) pairs in bulk, rerunning any finished jobs for them"""
+    label = model._meta.label
+    ImageJob.objects.bulk_create(
+        [ImageJob(model_label=label, object_id=pk, image_field=image_field, source=source) for pk, source in rows],
+        ignore_conflicts=True,
+    )
+    return reset(ImageJob.objects.filter(
+        model_label=label,
+        image_field=image_field,
+        object_id__in=[pk for pk, _ in rows],
+        source__in=[source for _, source in rows],
+        status__in=[ImageJob.DONE, ImageJob.FAILED],
+    ))
+
+
+def reset(jobs):
+    return jobs.update(
+        status=ImageJob.PENDING, attempts=0, last_error='', run_after=timezone.now(),
+        locked_at=None, updated_at=timezone.now(),
+    )
+
+
+def due_jobs(now=None):
+    now = now or timezone.now()
+    stale = now - timedelta(seconds=settings.IMAGE_JOB_LOCK_SECONDS)
+    return ImageJob.objects.filter(
+        Q(status=ImageJob.PENDING, run_after__lte=now) | Q(status=ImageJob.RUNNING, locked_at__lt=stale)
+    )
+
+
+def claim(limit):
+    """Lock up to `limit` due jobs for this worker"""
+    now = timezone.now()
+    claimed = []
+    for job in due_jobs(now)[:limit]:
+        # Conditional update: if another worker got there first, nothing matches
+        won = ImageJob.objects.filter(pk=job.pk, status=job.status, attempts=job.attempts).update(
+            status=ImageJob.RUNNING, locked_at=now, attempts=F('attempts') + 1, updated_at=now
+        )
+        if won:
+            job.status, job.locked_at, job.attempts = ImageJob.RUNNING, now, job.attempts + 1
+            claimed.append(job)
+    return claimed
+
+
+def finish(job, status, error=''):
+    # Matching locked_at means a worker that took over a stale lock isn't overwritten
+    ImageJob.objects.filter(pk=job.pk, locked_at=job.locked_at).update(
+        status=status, last_error=error, locked_at=None, updated_at=timezone.now()
+    )
+
+
+def retry_or_fail(job, error):
+    logger.warning('Image job %s failed (attempt %d): %s', job.pk, job.attempts, error)
+    if job.attempts >= settings.IMAGE_JOB_MAX_ATTEMPTS:
+        finish(job, ImageJob.FAILED, str(error))
+        return
+    delay = settings.IMAGE_JOB_RETRY_SECONDS * 2 ** (job.attempts - 1)
+    ImageJob.objects.filter(pk=job.pk, locked_at=job.locked_at).update(
+        status=ImageJob.PENDING, last_error=str(error), locked_at=None,
+        run_after=timezone.now() + timedelta(seconds=delay), updated_at=timezone.now(),
+    )
+
+
+def read_source(job):
+    """The source file's bytes, or None if the job no longer applies"""
+    model = apps.get_model(job.model_label)
+    instance = model._base_manager.filter(pk=job.object_id).only(job.image_field).first()
+    field_file = getattr(instance, job.image_field, None)
+    if field_file is None or field_file.name != job.source:
+        finish(job, ImageJob.DONE, SUPERSEDED)
+        return None
+    shared = images.shared_variants(job.source, field_file.storage)
+    if shared:
+        stored = images.apply_variants(model, job.object_id, job.image_field, job.source, shared)
+        finish(job, ImageJob.DONE, '' if stored else SUPERSEDED)
+        return None
+    try:
+        with field_file.open('rb') as f:
+            return f.read()
+    except OSError as e:
+        retry_or_fail(job, e)
+        return None
+
+
+def complete(job, result):
+    """Store the variants from `result()` (the render output) and close the job"""
+    model = apps.get_model(job.model_label)
+    try:
+        width, height, rendered = result()
+    except images.RENDER_ERRORS as e:
+        # Remember the failure so the same file isn't requeued on every save
+        images.apply_variants(model, job.object_id, job.image_field, job.source, {'source': job.source, 'error': str(e)})
+        finish(job, ImageJob.FAILED, str(e))
+        return
+    except Exception as e:
+        retry_or_fail(job, e)
+        return
+    storage = model._meta.get_field(job.image_field).storage
+    try:
+        variants = images.save_variants(job.source, width, height, rendered, storage=storage)
+        stored = images.apply_variants(model, job.object_id, job.image_field, job.source, variants)
+    except Exception as e:
+        retry_or_fail(job, e)
+        return
+    finish(job, ImageJob.DONE, '' if stored else SUPERSEDED)
+
+
+def process_batch(jobs, executor=None):
+    """Render claimed jobs, in `executor` if given. Returns False if the pool broke."""
+    widths = list(settings.IMAGE_VARIANT_WIDTHS)
+    futures = {}
+    healthy = True
+    for job in jobs:
+        data = read_source(job)
+        if data is None:
+            continue
+        if executor is None:
+            complete(job, lambda: images.render_variants(data, widths))
+            continue
+        try:
+            futures[executor.submit(images.render_variants, data, widths)] = job
+        except BrokenProcessPool as e:
+            healthy = False
+            retry_or_fail(job, e)
+    for future in as_completed(futures):
+        if isinstance(future.exception(), BrokenProcessPool):
+            healthy = False
+        complete(futures[future], future.result)
+    return healthy
+
+
+def make_executor(processes):
+    if not processes:
+        return None
+    # spawn: no forked copies of Django's DB connections; render_variants needs no setup
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context('spawn'),
+        max_tasks_per_child=100,
+    )
+
+
+def run_worker(processes=None, batch_size=8, once=False, poll_interval=2.0, log=None):
+    """
+    Process jobs until interrupted (or, with once=True, until none are due).
+    processes=0 renders in this process. Returns the number of jobs handled.
+    """
+    processes = os.cpu_count() if processes is None else processes
+    executor = make_executor(processes)
+    handled = 0
+    try:
+        while True:
+            close_old_connections()
+            batch = claim(batch_size)
+            if not batch:
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+            if not process_batch(batch, executor):
+                # A pool process died (e.g. OOM-killed); start a fresh pool
+                executor.shutdown(cancel_futures=True)
+                executor = make_executor(processes)
+            handled += len(batch)
+            if log:
+                log(f'Processed {len(batch)} image job(s)')
+    finally:
+        if executor:
+            executor.shutdown()
+    return handled
+
+
+def run_pending():
+    """Process every due job in this process (tests, scripts)"""
+    return run_worker(processes=0, once=True)
@@ -0,0 +1,266 @@
+"""
+Iftar-hour load simulation.
+
+Virtual users arrive with increasing density towards the end of the run
+(the rush before sunset) and walk through the booking funnel:
+
+    browse menu -> check slots -> check tables -> book -> look up by confirmation
+
+Requests go either to the in-process ASGI application (config/asgi.py) or
+to a running server (e.g. gunicorn) over plain HTTP/1.1. Only the standard
+library is used for the HTTP client.
+
+Driven by `python manage.py loadtest`.
+"""
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+
+class ASGITransport:
+    """Call an ASGI application directly, without a socket"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method, path, body=None, headers=None):
+        path, _, query = path.partition('?')
+        payload = json.dumps(body).encode() if body is not None else b''
+        raw_headers = [(b'host', b'localhost'), (b'content-type', b'application/json')]
+        raw_headers += [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]
+        raw_headers.append((b'content-length', str(len(payload)).encode()))
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'headers': raw_headers,
+            'client': ('127.0.0.1', 0),
+            'server': ('localhost', 80),
+        }
+        finished = asyncio.Event()
+        request_sent = False
+        status = None
+        chunks = []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': payload, 'more_body': False}
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                if not message.get('more_body'):
+                    finished.set()
+
+        await self.app(scope, receive, send)
+        finished.set()
+        return status, b''.join(chunks)
+
+    async def close(self):
+        pass
+
+
+class HTTPTransport:
+    """Minimal HTTP/1.1 client on asyncio streams (one connection per request)"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+
+    async def request(self, method, path, body=None, headers=None):
+        payload = json.dumps(body).encode() if body is not None else b''
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Connection: close',
+            'Content-Type: application/json',
+            f'Content-Length: {len(payload)}',
+        ]
+        lines += [f'{key}: {value}' for key, value in (headers or {}).items()]
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + payload)
+            await writer.drain()
+            raw = await reader.read()
+        finally:
+            writer.close()
+        head, _, content = raw.partition(b'\r\n\r\n')
+        status = int(head.split(b' ', 2)[1])
+        return status, content
+
+    async def close(self):
+        pass
+
+
+class LoadTest:
+    """Runs the scenario and collects per-step timings and bookings"""
+
+    def __init__(self, transport, branch_id, date, users, duration, concurrency,
+                 book_ratio=0.7, hot_slots=3, seed=1):
+        self.transport = transport
+        self.branch_id = branch_id
+        self.date = date
+        self.users = users
+        self.duration = duration
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.book_ratio = book_ratio
+        self.hot_slots = hot_slots
+        self.rng = random.Random(seed)
+        self.samples = defaultdict(list)  # step -> [(status, seconds)]
+        self.bookings = []                # (table_id, date, time, guests)
+
+    async def call(self, step, method, path, body=None, headers=None):
+        start = time.perf_counter()
+        try:
+            status, content = await self.transport.request(method, path, body, headers)
+        except (OSError, asyncio.IncompleteReadError):
+            status, content = 0, b''
+        self.samples[step].append((status, time.perf_counter() - start))
+        try:
+            return status, json.loads(content) if content else None
+        except ValueError:
+            return status, None
+
+    async def user(self, n, delay):
+        await asyncio.sleep(delay)
+        async with self.semaphore:
+            # Each virtual user looks like a distinct client to the throttles, as
+            # long as the server trusts one proxy (NUM_PROXIES=1)
+            headers = {'X-Forwarded-For': f'10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}'}
+            guests = self.rng.choice([2, 2, 4, 4, 6])
+
+            await self.call('menu', 'GET', '/api/menu/', headers=headers)
+            status, slots = await self.call(
+                'slots', 'GET',
+                f'/api/tables/available_slots/?branch={self.branch_id}&date={self.date}&guests={guests}',
+                headers=headers,
+            )
+            if status != 200 or self.rng.random() > self.book_ratio:
+                return
+
+            # Everyone wants a table just before sunset
+            dinner = [slot['time'] for slot in slots['slots']['dinner'] if slot['time'] >= '18:00']
+            candidates = dinner[:self.hot_slots] or [
+                slot['time'] for period in slots['slots'].values() for slot in period
+            ]
+            if not candidates:
+                return
+            slot = self.rng.choice(candidates)
+
+            status, availability = await self.call(
+                'availability', 'GET',
+                f'/api/tables/availability/?branch={self.branch_id}&date={self.date}&time={slot}&guests={guests}',
+                headers=headers,
+            )
+            if status != 200 or not availability['tables']:
+                return
+            table = self.rng.choice(availability['tables'])['id']
+
+            status, booking = await self.call('book', 'POST', '/api/reservations/', {
+                'branch': self.branch_id,
+                'table': table,
+                'customer_name': f'Load User {n}',
+                'phone': f'7{n:09d}',
+                'date': self.date,
+                'time': slot,
+                'guests': guests,
+            }, headers=headers)
+            if status != 201:
+                return
+            self.bookings.append((table, self.date, slot, guests))
+
+            await self.call(
+                'lookup', 'GET',
+                f'/api/reservations/by_confirmation/?confirmation_id={booking["confirmation_id"]}',
+                headers=headers,
+            )
+
+    async def run(self):
+        # Triangular arrivals: sparse at first, peaking at the end of the window
+        delays = sorted(self.rng.triangular(0, self.duration, self.duration) for _ in range(self.users))
+        start = time.perf_counter()
+        await asyncio.gather(*(self.user(n, delay) for n, delay in enumerate(delays)))
+        elapsed = time.perf_counter() - start
+        await self.transport.close()
+        return self.report(elapsed)
+
+    def report(self, elapsed):
+        steps = {}
+        total = errors = throttled = 0
+        for step, samples in self.samples.items():
+            statuses = Counter(status for status, _ in samples)
+            step_errors = sum(count for status, count in statuses.items() if status == 0 or status >= 500)
+            total += len(samples)
+            errors += step_errors
+            throttled += statuses[429]
+            steps[step] = {
+                'requests': len(samples),
+                'error_rate': round(step_errors / len(samples), 4),
+                'throttled_rate': round(statuses[429] / len(samples), 4),
+                'statuses': {str(status): count for status, count in sorted(statuses.items())},
+                'latency_ms': latency_summary([seconds for _, seconds in samples]),
+            }
+        return {
+            'elapsed_s': round(elapsed, 2),
+            'users': self.users,
+            'requests': total,
+            'throughput_rps': round(total / elapsed, 1) if elapsed else 0,
+            'error_rate': round(errors / total, 4) if total else 0,
+            # 429s: the run measured the throttles, not the app (see NUM_PROXIES)
+            'throttled_rate': round(throttled / total, 4) if total else 0,
+            'bookings': len(self.bookings),
+            'double_bookings': count_double_bookings(self.bookings),
+            'steps': steps,
+        }
+
+
+def latency_summary(samples):
+    ms = sorted(sample * 1000 for sample in samples)
+    if len(ms) < 2:
+        ms = ms * 2 or [0.0, 0.0]
+    cuts = statistics.quantiles(ms, n=100, method='inclusive')
+    return {
+        'p50': round(cuts[49], 2),
+        'p90': round(cuts[89], 2),
+        'p99': round(cuts[98], 2),
+        'max': round(ms[-1], 2),
+    }
+
+
+def count_double_bookings(bookings):
+    """Number of successful bookings that overlap an earlier one on the same table"""
+    from apps.reservations.models import Reservation
+
+    by_table = defaultdict(list)
+    for table, date, slot, guests in bookings:
+        start = datetime.strptime(f'{date} {slot[:5]}', '%Y-%m-%d %H:%M')
+        end = start + timedelta(minutes=Reservation.calculate_duration_from_guests(guests))
+        by_table[table].append((start, end))
+
+    doubles = 0
+    for intervals in by_table.values():
+        intervals.sort()
+        latest_end = None
+        for start, end in intervals:
+            if latest_end is not None and start < latest_end:
+                doubles += 1
+            latest_end = max(end, latest_end) if latest_end else end
+    return doubles
@@ -0,0 +1,70 @@
+"""
+Queues variant generation for images uploaded before variants existed, or
+whose variants are out of date. Run `image_worker` to process the queue.
+
+    python manage.py backfill_image_variants
+    python manage.py backfill_image_variants --model menu.MenuItem --verify
+    python manage.py backfill_image_variants --force   # e.g. after changing IMAGE_VARIANT_WIDTHS
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.images import ResponsiveImagesMixin, variant_paths
+from apps.core.jobs import enqueue_many
+
+
+def responsive_models(labels=None):
+    models = [model for model in apps.get_models() if issubclass(model, ResponsiveImagesMixin)]
+    if labels:
+        unknown = set(labels) - {model._meta.label for model in models}
+        if unknown:
+            raise CommandError(f'Not a model with responsive images: {", ".join(sorted(unknown))}')
+        models = [model for model in models if model._meta.label in labels]
+    return models
+
+
+class Command(BaseCommand):
+    help = 'Queue responsive variant generation for existing images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', dest='models', help='app_label.Model (repeatable)')
+        parser.add_argument('--force', action='store_true', help='Rebuild even if the variants look current')
+        parser.add_argument('--verify', action='store_true', help='Also requeue images whose variant files are missing')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in responsive_models(options['models']):
+            for image_field, variants_field in model.responsive_images.items():
+                queued = self.backfill(model, image_field, variants_field, options)
+                total += queued
+                self.stdout.write(f'{model._meta.label}.{image_field}: {queued} queued')
+        self.stdout.write(self.style.SUCCESS(f'{total} image(s) queued'))
+
+    def backfill(self, model, image_field, variants_field, options):
+        storage = model._meta.get_field(image_field).storage
+        rows = (
+            model._base_manager.exclude(**{image_field: ''})
+            .exclude(**{f'{image_field}__isnull': True})
+            .order_by('pk')
+            .values_list('pk', image_field, variants_field)
+            .iterator(chunk_size=options['chunk_size'])
+        )
+        queued = 0
+        chunk = []
+        for pk, source, variants in rows:
+            variants = variants or {}
+            if (
+                options['force']
+                or variants.get('source') != source
+                or (options['verify'] and any(not storage.exists(path) for path in variant_paths(variants)))
+            ):
+                chunk.append((pk, source))
+            if len(chunk) >= options['chunk_size']:
+                enqueue_many(model, image_field, chunk)
+                queued += len(chunk)
+                chunk = []
+        if chunk:
+            enqueue_many(model, image_field, chunk)
+            queued += len(chunk)
+        return queued
@@ -0,0 +1,112 @@
+"""
+Reproducible endpoint benchmark against a seeded synthetic dataset.
+
+Creates a throwaway test database (never touches the configured one), seeds
+it, then measures latency percentiles, query counts and allocations for each
+public and admin endpoint through the Django test client.
+
+Usage:
+    python manage.py benchmark --reservations 100000 --output bench.json
+    python manage.py benchmark --compare bench.json   # diff against a previous run
+"""
+import json
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from apps.core.benchmark import run_benchmarks, seed_dataset
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic dataset and benchmark every API endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branches', type=int, default=5)
+        parser.add_argument('--tables-per-branch', type=int, default=20)
+        parser.add_argument('--reservations', type=int, default=100_000)
+        parser.add_argument('--menu-items', type=int, default=300)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--only', nargs='*', help='Endpoint name prefixes, e.g. tables. dashboard.stats')
+        parser.add_argument('--output', help='Write JSON results to this file (default: stdout)')
+        parser.add_argument('--compare', help='Previous JSON results to compare p50/queries against')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database between runs')
+
+    def handle(self, *args, **options):
+        log = self.stderr.write
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            log(f'Benchmark database: {connection.settings_dict["NAME"]}')
+            context = seed_dataset(
+                branches=options['branches'],
+                tables_per_branch=options['tables_per_branch'],
+                reservations=options['reservations'],
+                menu_items=options['menu_items'],
+                seed=options['seed'],
+                log=log,
+            )
+            results = run_benchmarks(
+                context,
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                only=options['only'],
+                log=log,
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        report = {
+            'meta': {
+                'commit': self._git_commit(),
+                'timestamp': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'iterations': options['iterations'],
+                'dataset': context['sizes'],
+            },
+            'endpoints': results,
+        }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            log(self.style.SUCCESS(f'Results written to {options["output"]}'))
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self._compare(options['compare'], results)
+
+    def _git_commit(self):
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL
+            ).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _compare(self, path, results):
+        with open(path) as f:
+            previous = json.load(f)
+        self.stderr.write(f'\nCompared with {previous["meta"].get("commit")} ({path}):')
+        self.stderr.write(f'{"endpoint":36} {"p50 before":>11} {"p50 after":>10} {"change":>8} {"queries":>10}')
+        for name, current in results.items():
+            before = previous['endpoints'].get(name)
+            if not before:
+                continue
+            old_p50 = before['latency_ms']['p50']
+            new_p50 = current['latency_ms']['p50']
+            change = (new_p50 - old_p50) / old_p50 * 100 if old_p50 else 0
+            line = (
+                f'{name:36} {old_p50:10.2f}ms {new_p50:8.2f}ms {change:+7.1f}% '
+                f'{before["queries"]:>4} -> {current["queries"]:<4}'
+            )
+            self.stderr.write(self.style.ERROR(line) if change > 10 else line)
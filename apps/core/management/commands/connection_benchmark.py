@@ -0,0 +1,63 @@
+"""
+Per-request latency with and without connection reuse.
+
+Compares reconnecting on every request (CONN_MAX_AGE=0), persistent
+connections with health checks, and Django's psycopg 3 pool (PostgreSQL
+only) on a throwaway database seeded like `benchmark`.
+
+Against local Postgres (closest to production):
+
+    DATABASE_URL=postgres://localhost/cafe python manage.py connection_benchmark
+
+Without DATABASE_URL a file-backed SQLite database stands in; connecting is
+much cheaper there than a TLS handshake to Postgres, so treat the gap as a
+lower bound.
+"""
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.core.benchmark import CONNECTION_MODES, run_connection_benchmarks, seed_dataset
+
+DEFAULT_ENDPOINTS = ['branches.list', 'menu.list', 'tables.available_slots', 'reservations.by_confirmation']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-request latency with per-request, persistent and pooled database connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=list(CONNECTION_MODES), default=list(CONNECTION_MODES))
+        parser.add_argument('--only', nargs='*', default=DEFAULT_ENDPOINTS, help='Endpoint name prefixes')
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--reservations', type=int, default=5000)
+        parser.add_argument('--output', help='Write JSON results to this file (default: stdout)')
+
+    def handle(self, *args, **options):
+        log = self.stderr.write
+        if connection.vendor == 'sqlite':
+            # In-memory test databases ignore close(), which would hide the reconnect cost
+            connection.settings_dict['TEST']['NAME'] = str(settings.BASE_DIR / 'connbench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            context = seed_dataset(branches=2, tables_per_branch=20, reservations=options['reservations'], log=log)
+            results = run_connection_benchmarks(
+                context,
+                modes=options['modes'],
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                only=options['only'],
+                log=log,
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {'database': connection.vendor, 'iterations': options['iterations'], 'modes': results}
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
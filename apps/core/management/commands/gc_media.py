@@ -0,0 +1,78 @@
+"""
+Deletes media files that no database row refers to: images replaced or
+deleted since upload, and their variants. Content-addressed storage never
+deletes files itself because several objects can share one.
+
+    python manage.py gc_media --dry-run
+    python manage.py gc_media --grace-hours 24
+
+Files newer than the grace period are kept, since an upload is written
+to storage before its row (or variant map) is saved.
+"""
+import posixpath
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.utils import timezone
+
+from apps.core.images import ResponsiveImagesMixin, variant_paths
+
+
+def referenced_names():
+    """Every file name stored in a FileField or a variant map"""
+    names = set()
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField) and field.storage is default_storage:
+                names.update(
+                    model._base_manager.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+                    .values_list(field.name, flat=True).iterator()
+                )
+        if issubclass(model, ResponsiveImagesMixin):
+            for variants_field in model.responsive_images.values():
+                for variants in model._base_manager.values_list(variants_field, flat=True).iterator():
+                    names.update(variant_paths(variants))
+    return names
+
+
+def stored_names(storage, directory=''):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for name in directories:
+        yield from stored_names(storage, posixpath.join(directory, name))
+
+
+class Command(BaseCommand):
+    help = 'Delete media files no longer referenced by any model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='List what would be deleted')
+        parser.add_argument('--grace-hours', type=float, default=24, help='Keep files younger than this')
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        if not storage.exists(''):
+            self.stdout.write('No media directory')
+            return
+        # Read references before listing files, so anything uploaded meanwhile is too new to delete
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        referenced = referenced_names()
+
+        deleted = freed = 0
+        for name in stored_names(storage):
+            if name in referenced or storage.get_modified_time(name) > cutoff:
+                continue
+            size = storage.size(name)
+            if options['dry_run']:
+                self.stdout.write(f'Would delete {name} ({size} bytes)')
+            else:
+                storage.delete(name)
+            deleted += 1
+            freed += size
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {deleted} file(s), {freed / (1024 * 1024):.1f} MB'))
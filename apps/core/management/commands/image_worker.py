@@ -0,0 +1,33 @@
+"""
+Builds responsive image variants queued by uploads (apps/core/jobs.py).
+
+    python manage.py image_worker                 # run until stopped
+    python manage.py image_worker --once          # drain due jobs and exit
+    python manage.py image_worker --processes 2   # cap CPU use on a shared box
+"""
+from django.core.management.base import BaseCommand
+
+from apps.core.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = 'Process queued image variant jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, help='Encoder processes (default: CPU count, 0 = in-process)')
+        parser.add_argument('--batch-size', type=int, default=8, help='Jobs claimed at a time')
+        parser.add_argument('--once', action='store_true', help='Exit when no jobs are due')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds between polls when idle')
+
+    def handle(self, *args, **options):
+        try:
+            handled = run_worker(
+                processes=options['processes'],
+                batch_size=options['batch_size'],
+                once=options['once'],
+                poll_interval=options['sleep'],
+                log=self.stderr.write if options['verbosity'] > 1 else None,
+            )
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(f'Processed {handled} image job(s)')
@@ -0,0 +1,105 @@
+"""
+Simulate the Iftar-hour booking spike.
+
+In-process (default): creates a throwaway database, seeds it and drives the
+ASGI application from config/asgi.py.
+
+    python manage.py loadtest --users 2000 --duration 60 --concurrency 200
+
+Against a running server (uses whatever database that server is configured with).
+Virtual users are told apart by X-Forwarded-For, so start it trusting one proxy:
+
+    NUM_PROXIES=1 gunicorn config.wsgi:application --bind 127.0.0.1:8001 --workers 4 &
+    python manage.py loadtest --url http://127.0.0.1:8001 --users 2000
+"""
+import asyncio
+import json
+import tempfile
+from datetime import date, timedelta
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from apps.core.benchmark import seed_dataset
+from apps.core.loadtest import ASGITransport, HTTPTransport, LoadTest
+
+
+class Command(BaseCommand):
+    help = 'Simulate an Iftar-hour booking spike and report throughput, errors and double bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Base URL of a running server; omit to drive the ASGI app in-process')
+        parser.add_argument('--branch', type=int, help='Branch id to book (default: first branch)')
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--duration', type=float, default=30, help='Seconds over which users arrive')
+        parser.add_argument('--concurrency', type=int, default=100, help='Max users in flight')
+        parser.add_argument('--book-ratio', type=float, default=0.7, help='Share of users who try to book')
+        parser.add_argument('--hot-slots', type=int, default=3, help='Number of pre-sunset slots users compete for')
+        parser.add_argument('--reservations', type=int, default=5000, help='Existing reservations to seed (in-process only)')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        target_date = (date.today() + timedelta(days=1)).isoformat()
+
+        if options['url']:
+            branch_id = options['branch'] or self._first_branch(options['url'])
+            report = self._run(HTTPTransport(options['url']), branch_id, target_date, options)
+        else:
+            # WAL leaves -wal/-shm files next to a SQLite database; the directory takes them along
+            with tempfile.TemporaryDirectory() as tmp:
+                report = self._run_in_process(tmp, target_date, options)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        self.stdout.write(output)
+
+        if report['double_bookings']:
+            self.stderr.write(self.style.ERROR(f'{report["double_bookings"]} double bookings detected'))
+
+    def _run_in_process(self, tmp, target_date, options):
+        if connection.vendor == 'sqlite':
+            # A file, not shared-cache memory, so concurrent writers behave like production
+            connection.settings_dict['TEST']['NAME'] = f'{tmp}/loadtest.sqlite3'
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            context = seed_dataset(
+                branches=1, tables_per_branch=20, reservations=options['reservations'], menu_items=150
+            )
+            from config.asgi import application
+
+            with override_settings(
+                NPLUSONE_MODE='off',
+                # The harness plays the proxy that sets X-Forwarded-For
+                REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1},
+                EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+            ):
+                report = self._run(ASGITransport(application), context['branch_id'], target_date, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        return report
+
+    def _run(self, transport, branch_id, target_date, options):
+        load = LoadTest(
+            transport,
+            branch_id=branch_id,
+            date=target_date,
+            users=options['users'],
+            duration=options['duration'],
+            concurrency=options['concurrency'],
+            book_ratio=options['book_ratio'],
+            hot_slots=options['hot_slots'],
+            seed=options['seed'],
+        )
+        return asyncio.run(load.run())
+
+    def _first_branch(self, base_url):
+        with urlopen(f'{base_url.rstrip("/")}/api/branches/') as response:
+            data = json.load(response)
+        results = data['results'] if isinstance(data, dict) else data
+        return results[0]['id']
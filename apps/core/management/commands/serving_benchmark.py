@@ -0,0 +1,206 @@
+"""
+Compare WSGI (gunicorn.conf.py's gthread workers) against ASGI (uvicorn
+workers with ASYNC_VIEWS=True) under the Iftar-rush load test. Worker
+counts come from the command line; everything else from gunicorn.conf.py.
+
+Seeds a throwaway SQLite database, starts each server in turn on a local
+port, drives it with the load test over HTTP and samples the resident memory
+of the whole server process tree. Reports throughput, latency and
+throughput per 100 MB so the two modes can be compared at equal memory.
+
+    python manage.py serving_benchmark --sync-workers 4 --async-workers 2 --users 1000
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.loadtest import HTTPTransport, LoadTest, latency_summary
+
+SEED_SCRIPT = (
+    'from apps.core.benchmark import seed_dataset; '
+    'print(seed_dataset(branches=1, tables_per_branch=20, reservations={reservations}, menu_items=150)["branch_id"])'
+)
+
+
+def process_tree_rss(root_pid):
+    """Resident memory (bytes) of a process and all its descendants, from /proc"""
+    parents = {}
+    for entry in Path('/proc').iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / 'stat').read_text()
+        except OSError:
+            continue
+        # The command name may contain spaces; ppid is the second field after it
+        parents[int(entry.name)] = int(stat.rsplit(')', 1)[1].split()[1])
+
+    tree = {root_pid}
+    changed = True
+    while changed:
+        children = {pid for pid, ppid in parents.items() if ppid in tree} - tree
+        tree |= children
+        changed = bool(children)
+
+    total = 0
+    for pid in tree:
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+class MemorySampler(threading.Thread):
+    def __init__(self, pid, interval=0.25):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.samples.append(process_tree_rss(self.pid))
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return {
+            'peak_mb': round(max(self.samples, default=0) / 2**20, 1),
+            'mean_mb': round(sum(self.samples) / max(len(self.samples), 1) / 2**20, 1),
+        }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark sync (WSGI) vs async (ASGI) serving under the Iftar-rush load test'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=['sync', 'async'], default=['sync', 'async'])
+        parser.add_argument('--sync-workers', type=int, default=4)
+        parser.add_argument('--async-workers', type=int, default=2)
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--duration', type=float, default=20)
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument('--reservations', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATABASE_URL=f'sqlite:///{tmp}/serving.sqlite3',
+                DEBUG='False',
+                NPLUSONE_MODE='off',
+                # Virtual users are told apart by X-Forwarded-For
+                NUM_PROXIES='1',
+                EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+            )
+            branch_id = self._seed(env, options)
+
+            report = {}
+            for mode in options['modes']:
+                self.stderr.write(f'Running {mode} ...')
+                report[mode] = self._run_mode(mode, env, branch_id, options)
+                self.stderr.write(
+                    f'  {report[mode]["throughput_rps"]} req/s, '
+                    f'p99 {report[mode]["latency_ms"]["p99"]} ms, '
+                    f'peak {report[mode]["memory"]["peak_mb"]} MB, '
+                    f'{report[mode]["error_rate"]:.1%} errors, {report[mode]["throttled_rate"]:.1%} throttled'
+                )
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def _manage(self, env, *args):
+        return subprocess.run(
+            [sys.executable, 'manage.py', *args],
+            cwd=settings.BASE_DIR, env=env, check=True, capture_output=True, text=True,
+        ).stdout
+
+    def _seed(self, env, options):
+        self.stderr.write('Seeding benchmark database ...')
+        self._manage(env, 'migrate', '--noinput')
+        output = self._manage(env, 'shell', '-c', SEED_SCRIPT.format(reservations=options['reservations']))
+        return int(output.strip().splitlines()[-1])
+
+    def _server_command(self, mode, options):
+        bind = f'127.0.0.1:{options["port"]}'
+        if mode == 'sync':
+            return [sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+                    '--bind', bind, '--workers', str(options['sync_workers'])]
+        return [sys.executable, '-m', 'gunicorn', 'config.asgi:application',
+                '--bind', bind, '--workers', str(options['async_workers']),
+                '-k', 'uvicorn_worker.UvicornWorker']
+
+    def _run_mode(self, mode, env, branch_id, options):
+        env = dict(env, ASYNC_VIEWS=str(mode == 'async'))
+        base_url = f'http://127.0.0.1:{options["port"]}'
+        server = subprocess.Popen(
+            self._server_command(mode, options), cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            self._wait_until_up(server, base_url)
+            sampler = MemorySampler(server.pid)
+            sampler.start()
+            load = LoadTest(
+                HTTPTransport(base_url),
+                branch_id=branch_id,
+                date=(date.today() + timedelta(days=1)).isoformat(),
+                users=options['users'],
+                duration=options['duration'],
+                concurrency=options['concurrency'],
+                seed=options['seed'],
+            )
+            result = asyncio.run(load.run())
+            memory = sampler.stop()
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        seconds = [sample for samples in load.samples.values() for _, sample in samples]
+        return {
+            'workers': options[f'{mode}_workers'],
+            'throughput_rps': result['throughput_rps'],
+            'rps_per_100mb': round(result['throughput_rps'] / memory['peak_mb'] * 100, 1) if memory['peak_mb'] else None,
+            'error_rate': result['error_rate'],
+            'throttled_rate': result['throttled_rate'],
+            'latency_ms': latency_summary(seconds),
+            'memory': memory,
+            'steps': result['steps'],
+        }
+
+    def _wait_until_up(self, server, base_url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'Server exited with code {server.returncode}')
+            try:
+                with urlopen(f'{base_url}/health/', timeout=1):
+                    return
+            except (URLError, OSError):
+                time.sleep(0.2)
+        raise CommandError(f'Server did not answer {base_url}/health/ within {timeout}s')
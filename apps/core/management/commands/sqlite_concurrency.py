@@ -0,0 +1,64 @@
+"""
+Booking throughput on SQLite under parallel writers, with and without the
+SQLITE_TUNING connection settings (apps/core/sqlite.py).
+
+Each mode gets a fresh file database (WAL is stored in the file, so modes
+can't share one):
+
+    python manage.py sqlite_concurrency --writers 16 --bookings 25
+"""
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from apps.core.benchmark import run_parallel_bookings, seed_dataset
+
+
+class Command(BaseCommand):
+    help = 'Measure booking throughput and lock errors on SQLite with parallel writers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--bookings', type=int, default=25, help='Bookings per writer')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite')
+
+        # WAL leaves -wal/-shm files next to the database; the directory takes them along
+        with tempfile.TemporaryDirectory() as tmp:
+            report = self._compare(tmp, options)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def _compare(self, tmp, options):
+        connection.settings_dict['TEST']['NAME'] = f'{tmp}/concurrency.sqlite3'
+        db_options = connection.settings_dict.setdefault('OPTIONS', {})
+        configured_mode = db_options.get('transaction_mode')
+        report = {}
+        for mode, tuned in (('untuned', False), ('tuned', True)):
+            # Connections opened from here on (one per writer thread) read OPTIONS
+            db_options['transaction_mode'] = (configured_mode or 'IMMEDIATE') if tuned else None
+            with override_settings(SQLITE_TUNING=tuned):
+                old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+                try:
+                    context = seed_dataset(branches=1, tables_per_branch=20, reservations=100, menu_items=10)
+                    report[mode] = run_parallel_bookings(
+                        context['branch_id'], writers=options['writers'], bookings_per_writer=options['bookings']
+                    )
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+            self.stderr.write(
+                f'{mode:8} {report[mode]["booked"]}/{report[mode]["attempted"]} booked, '
+                f'{report[mode]["bookings_per_s"]} bookings/s, '
+                f'{sum(report[mode]["errors"].values())} errors'
+            )
+        return report
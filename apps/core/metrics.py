@@ -0,0 +1,89 @@
+"""
+In-process per-route request metrics, exposed in Prometheus text format.
+
+Each worker process keeps its own registry; with several gunicorn workers
+every scrape sees the worker that served it, so scrape often or aggregate
+with `sum by (route)` over restarts.
+"""
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+METRICS = (
+    # (name, help, buckets)
+    ('cafe_request_duration_seconds', 'Total time spent handling the request', LATENCY_BUCKETS),
+    ('cafe_request_db_duration_seconds', 'Time spent executing SQL', LATENCY_BUCKETS),
+    ('cafe_request_db_queries', 'Number of SQL queries executed', QUERY_BUCKETS),
+    ('cafe_request_serialize_duration_seconds', 'Time spent in serializer .data (including lazy queries)', LATENCY_BUCKETS),
+    ('cafe_request_render_duration_seconds', 'Time spent rendering (JSON-encoding) the response', LATENCY_BUCKETS),
+    ('cafe_response_size_bytes', 'Response body size', SIZE_BUCKETS),
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram (non-cumulative counts; made cumulative on export)"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestMetrics:
+    """Registry of histograms keyed by (route, method)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, route, method, status_code, values):
+        """values maps metric name -> observed value"""
+        key = (route, method, str(status_code)[0] + 'xx')
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    name: Histogram(buckets) for name, _, buckets in METRICS
+                }
+            for name, value in values.items():
+                series[name].observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            series = sorted(self._series.items())
+            for name, help_text, buckets in METRICS:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (route, method, status_class), histograms in series:
+                    hist = histograms[name]
+                    labels = (
+                        f'route="{_escape(route)}",method="{method}",status="{status_class}"'
+                    )
+                    cumulative = 0
+                    for bound, count in zip(buckets + ('+Inf',), hist.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{{labels}}} {hist.sum}')
+                    lines.append(f'{name}_count{{{labels}}} {hist.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = RequestMetrics()
@@ -0,0 +1,162 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import dbhooks, querycheck, routers, serialization
+from .metrics import registry
+
+
+class QueryTimer:
+    """execute_wrapper-style hook counting queries and their total time"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class HybridMiddleware:
+    """Base for middleware that runs natively under both WSGI and ASGI"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+class RequestMetricsMiddleware(HybridMiddleware):
+    """
+    Records DB query count/time, serialization time (serializer .data, see
+    apps/core/serialization.py), render time (JSON encoding), total time and
+    response size for every request. Adds them as a Server-Timing header and
+    feeds the per-route histograms scraped from /api/metrics/. Serialization
+    time includes the queries that lazy querysets run while serializing.
+    """
+
+    def handle(self, request):
+        start = time.perf_counter()
+        with dbhooks.hook(QueryTimer()) as timer, serialization.timing() as serialize:
+            response = self.get_response(request)
+        return self.record(request, response, timer, serialize, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with dbhooks.hook(QueryTimer()) as timer, serialization.timing() as serialize:
+            response = await self.get_response(request)
+        return self.record(request, response, timer, serialize, time.perf_counter() - start)
+
+    def record(self, request, response, timer, serialize, total):
+        render = getattr(request, '_metrics_render_time', 0.0)
+        size = 0 if response.streaming else len(response.content)
+
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={timer.duration * 1000:.1f};desc="{timer.count} queries"',
+            f'serialize;dur={serialize.duration * 1000:.1f}',
+            f'render;dur={render * 1000:.1f}',
+            f'size;desc="{size} bytes"',
+        ])
+
+        match = request.resolver_match
+        registry.observe(
+            match.view_name if match else 'unmatched',
+            request.method,
+            response.status_code,
+            {
+                'cafe_request_duration_seconds': total,
+                'cafe_request_db_duration_seconds': timer.duration,
+                'cafe_request_db_queries': timer.count,
+                'cafe_request_serialize_duration_seconds': serialize.duration,
+                'cafe_request_render_duration_seconds': render,
+                'cafe_response_size_bytes': size,
+            },
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered (JSON-encoded) right after this hook; time that
+        started = time.perf_counter()
+
+        def rendered(response):
+            request._metrics_render_time = time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class NPlusOneMiddleware(HybridMiddleware):
+    """
+    Flags repeated query templates per request (see apps/core/querycheck.py).
+    NPLUSONE_MODE: 'log' (warning), 'raise' (NPlusOneError) or 'off'.
+    """
+
+    def __init__(self, get_response):
+        self.mode = settings.NPLUSONE_MODE
+        if self.mode not in ('log', 'raise'):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        with querycheck.detect() as tracker:
+            response = self.get_response(request)
+        return self.check(request, response, tracker)
+
+    async def __acall__(self, request):
+        with querycheck.detect() as tracker:
+            response = await self.get_response(request)
+        return self.check(request, response, tracker)
+
+    def check(self, request, response, tracker):
+        if tracker.offenders:
+            report = tracker.report(f'{request.method} {request.path}')
+            if self.mode == 'raise':
+                raise querycheck.NPlusOneError(report)
+            querycheck.logger.warning(report)
+        return response
+
+
+class ReplicaRoutingMiddleware(HybridMiddleware):
+    """
+    Sends safe reads on REPLICA_READ_PREFIXES to the read replica unless the
+    client wrote recently (see apps/core/routers.py).
+    """
+
+    def handle(self, request):
+        use_replica = routers.is_eligible(request) and not cache.get(routers.pin_key(request))
+        with routers.routing(use_replica) as state:
+            response = self.get_response(request)
+        if state.wrote and settings.REPLICA_ROUTING:
+            cache.set(routers.pin_key(request), True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        use_replica = routers.is_eligible(request) and not await cache.aget(routers.pin_key(request))
+        with routers.routing(use_replica) as state:
+            response = await self.get_response(request)
+        if state.wrote and settings.REPLICA_ROUTING:
+            await cache.aset(routers.pin_key(request), True, settings.REPLICA_PIN_SECONDS)
+        return response
@@ -0,0 +1,47 @@
+from django.db import models
+from django.utils import timezone
+
+
+class ImageJob(models.Model):
+    """
+    Queued generation of responsive variants for one image file
+    (see apps/core/jobs.py). One row per (object, field, source file), so
+    enqueueing the same file twice is a no-op.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    model_label = models.CharField(max_length=100)  # e.g. 'menu.MenuItem'
+    object_id = models.PositiveBigIntegerField()
+    image_field = models.CharField(max_length=50)
+    source = models.CharField(max_length=255)  # File name the variants are built from
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'image_jobs'
+        ordering = ['run_after']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['model_label', 'object_id', 'image_field', 'source'], name='unique_image_job'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='image_jobs_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.model_label}#{self.object_id}.{self.image_field} ({self.status})'
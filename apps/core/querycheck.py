@@ -0,0 +1,118 @@
+"""
+N+1 query detection.
+
+SQL executed inside a `detect()` block is grouped by normalized template
+(literals and IN-lists stripped). Any template executed more than
+`threshold` times is reported together with the project stack frames that
+issued it - almost always a loop touching a relation that was not
+select_related()/prefetch_related().
+
+Used by NPlusOneMiddleware (settings.NPLUSONE_MODE) and NPlusOneTestMixin.
+"""
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import dbhooks
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACE = re.compile(r'\s+')
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def normalize_sql(sql):
+    """Reduce a statement to its template so repeated lookups compare equal"""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _project_stack():
+    """
+    Stack frames from this project's code, plus the innermost library frame
+    outside django.db (e.g. the DRF field that dereferenced the relation).
+    """
+    base_dir = str(settings.BASE_DIR)
+    core_dir = str(settings.BASE_DIR / 'apps' / 'core')
+    frames = traceback.extract_stack()[:-2]
+    stack = [
+        f'{frame.filename}:{frame.lineno} in {frame.name}'
+        for frame in frames
+        if frame.filename.startswith(base_dir)
+        and not frame.filename.startswith(core_dir)
+        and 'site-packages' not in frame.filename
+    ]
+    for frame in reversed(frames):
+        if 'site-packages' in frame.filename and '/django/db/' not in frame.filename:
+            stack.append(f'{frame.filename}:{frame.lineno} in {frame.name}')
+            break
+    return stack
+
+
+class QueryTracker:
+    """execute_wrapper hook grouping statements by template"""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.stacks = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        template = normalize_sql(sql)
+        self.counts[template] += 1
+        # Only pay for a stack walk once a template crosses the threshold
+        if self.counts[template] == self.threshold + 1:
+            self.stacks[template] = _project_stack()
+        return execute(sql, params, many, context)
+
+    @property
+    def offenders(self):
+        """[(template, count, stack)] for templates repeated beyond the threshold"""
+        return [
+            (template, count, self.stacks.get(template, []))
+            for template, count in self.counts.most_common()
+            if count > self.threshold
+        ]
+
+    def report(self, label=''):
+        lines = [f'Possible N+1 queries{" in " + label if label else ""}:']
+        for template, count, stack in self.offenders:
+            lines.append(f'  {count}x {template}')
+            lines.extend(f'      {frame}' for frame in stack)
+        return '\n'.join(lines)
+
+
+@contextmanager
+def detect(threshold=None):
+    """Track queries on every connection for the duration of the block"""
+    if threshold is None:
+        threshold = settings.NPLUSONE_THRESHOLD
+    with dbhooks.hook(QueryTracker(threshold)) as tracker:
+        yield tracker
+
+
+class NPlusOneTestMixin:
+    """
+    TestCase mixin:
+
+        self.assertNoNPlusOne(lambda: self.client.get('/api/reservations/'))
+    """
+
+    def assertNoNPlusOne(self, func, threshold=None):
+        with detect(threshold) as tracker:
+            result = func()
+        if tracker.offenders:
+            self.fail(tracker.report())
+        return result
@@ -0,0 +1,74 @@
+"""
+Read-replica routing.
+
+ReplicaRoutingMiddleware marks safe (GET/HEAD) requests under
+REPLICA_READ_PREFIXES as replica-eligible; ReplicaRouter then sends their
+reads to the 'replica' alias. Everything else uses the primary.
+
+Stale reads are avoided by pinning to the primary:
+  * within a request, as soon as anything is written;
+  * across requests, for REPLICA_PIN_SECONDS after a client's write (keyed
+    on the client IP in the cache, so use a shared cache with several workers).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA = 'replica'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+def is_eligible(request):
+    return (
+        settings.REPLICA_ROUTING
+        and REPLICA in settings.DATABASES
+        and request.method in SAFE_METHODS
+        and request.path.startswith(tuple(settings.REPLICA_READ_PREFIXES))
+    )
+
+
+def pin_key(request):
+    from rest_framework.throttling import BaseThrottle
+    return f'replica_pin:{BaseThrottle().get_ident(request)}'
+
+
+@contextmanager
+def routing(use_replica):
+    """Route the reads in this block according to use_replica (and later writes)"""
+    state = RoutingState(use_replica)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state and state.use_replica:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state:
+            # Read-your-writes for the rest of this request
+            state.use_replica = False
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        if {obj1._state.db, obj2._state.db} <= {'default', REPLICA}:
+            return True
+        return None
@@ -0,0 +1,58 @@
+"""
+Request-scoped timing of DRF serialization.
+
+Serializers do their work (to_representation, including evaluating lazy
+querysets) when a view reads serializer.data, i.e. inside the view and
+before the response is rendered. install() wraps BaseSerializer.data, which
+Serializer.data and ListSerializer.data both go through, so the outermost
+.data call adds its time to the timer active in the current context (see
+RequestMetricsMiddleware). Like dbhooks, the timer is a contextvar, so it
+follows the request into sync_to_async threads.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from rest_framework.serializers import BaseSerializer
+
+_timer = ContextVar('serialize_timer', default=None)
+
+
+class SerializeTimer:
+    def __init__(self):
+        self.duration = 0.0
+        self.depth = 0  # Nested .data calls are already inside the outer one's time
+
+
+def timed(fget):
+    @wraps(fget)
+    def data(serializer):
+        timer = _timer.get()
+        if timer is None or timer.depth:
+            return fget(serializer)
+        timer.depth += 1
+        start = time.perf_counter()
+        try:
+            return fget(serializer)
+        finally:
+            timer.duration += time.perf_counter() - start
+            timer.depth -= 1
+    data.timed = True
+    return data
+
+
+def install():
+    if not getattr(BaseSerializer.data.fget, 'timed', False):
+        BaseSerializer.data = property(timed(BaseSerializer.data.fget))
+
+
+@contextmanager
+def timing():
+    """Time serializer .data calls in this block"""
+    timer = SerializeTimer()
+    token = _timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _timer.reset(token)
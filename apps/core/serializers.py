@@ -0,0 +1,64 @@
+from django.core.files.storage import default_storage
+from PIL import Image
+from rest_framework import serializers
+
+from . import uploads
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Renders a variant map (see apps/core/images.py) as absolute URLs per
+    format and width, plus srcset strings. None until variants exist for
+    the current image (they're built in the background after an upload).
+    """
+
+    def get_attribute(self, instance):
+        value = super().get_attribute(instance)
+        image_fields = [image for image, variants in getattr(instance, 'responsive_images', {}).items()
+                        if variants == self.source]
+        if value and image_fields and value.get('source') != getattr(instance, image_fields[0]).name:
+            # Map still describes the previous upload
+            return None
+        return value
+
+    def to_representation(self, value):
+        if not value or not value.get('webp'):
+            return None
+        request = self.context.get('request')
+
+        def url(path):
+            url = default_storage.url(path)
+            return request.build_absolute_uri(url) if request else url
+
+        data = {'width': value['width'], 'height': value['height'], 'srcset': {}}
+        for name in ('webp', 'jpeg'):
+            urls = {width: url(path) for width, path in sorted(value[name].items(), key=lambda item: int(item[0]))}
+            data[name] = urls
+            data['srcset'][name] = ', '.join(f'{link} {width}w' for width, link in urls.items())
+        return data
+
+
+class UploadedImageField(serializers.ImageField):
+    """
+    Image field for multipart uploads, also accepting base64 data URIs from
+    older clients. Validated from the header only (see apps/core/uploads.py).
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith('data:image'):
+            try:
+                data = uploads.decode_data_uri(data)
+            except ValueError:
+                self.fail('invalid_image')
+        # FileField's checks, skipping ImageField's full decode
+        file = serializers.FileField.to_internal_value(self, data)
+        try:
+            image_format, _, _ = uploads.inspect_image(file)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        # Multi-picture JPEGs from some phone cameras open as MPO
+        file.content_type = 'image/jpeg' if image_format == 'MPO' else Image.MIME[image_format]
+        # The stored name (and so the served content type) follows the detected
+        # format, never the client's filename
+        file.name = f'image{uploads.EXTENSIONS[image_format]}'
+        return file
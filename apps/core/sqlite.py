@@ -0,0 +1,42 @@
+"""
+SQLite tuning for deployments that run on db.sqlite3.
+
+While SQLITE_TUNING is on, settings give every SQLite database
+OPTIONS['transaction_mode'] = 'IMMEDIATE' (unless one is configured), and
+configure() applies the PRAGMAs to every new connection through
+connection_created:
+
+  * journal_mode=WAL     readers and the writer no longer block each other
+  * synchronous=NORMAL   fsync at checkpoints only; safe with WAL (a power cut
+                         can lose the last commits but never corrupts the file)
+  * busy_timeout         wait for the write lock instead of failing with
+                         "database is locked"
+  * mmap_size            read pages through a memory map
+  * BEGIN IMMEDIATE      (the transaction_mode) atomic() blocks take the
+                         write lock up front. A deferred transaction that
+                         reads and then writes can deadlock on the lock
+                         upgrade, which SQLite reports as "database is
+                         locked" immediately, busy_timeout or not.
+"""
+from django.conf import settings
+
+
+def pragmas():
+    return {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': settings.SQLITE_BUSY_TIMEOUT,
+        'mmap_size': settings.SQLITE_MMAP_SIZE,
+    }
+
+
+def apply_pragmas(raw_connection):
+    """Apply the tuning PRAGMAs to a DB-API sqlite3 connection"""
+    for name, value in pragmas().items():
+        raw_connection.execute(f'PRAGMA {name} = {value}')
+
+
+def configure(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.SQLITE_TUNING:
+        return
+    apply_pragmas(connection.connection)
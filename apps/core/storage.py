@@ -0,0 +1,80 @@
+"""
+Content-addressed media storage.
+
+Every uploaded file (and every image variant) is stored once under the
+SHA-256 of its bytes:
+
+    content/3f/3fa2...e9.jpg
+
+whatever model or upload_to directory it came from. Uploading the same dish
+photo for five menu items and a deal stores one file, and its URL never
+changes meaning, so it can be cached forever (see apps.core.views.serve_media).
+
+Because files can be shared between objects, nothing deletes them when an
+image is replaced; `manage.py gc_media` removes files no row refers to. It
+spares recent files, so saving bytes that are already stored touches the
+file's mtime.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+
+PREFIX = 'content'
+# Extensions a stored name may keep; served with a long cache, so anything
+# else (.html, .svg, ...) is dropped rather than served under its type
+EXTENSIONS = {'.jpg': '.jpg', '.jpeg': '.jpg', '.png': '.png', '.webp': '.webp', '.gif': '.gif'}
+HASHED_NAME = re.compile(rf'^{PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{64}}(\.\w+)?$')
+
+
+def is_content_addressed(name):
+    return bool(HASHED_NAME.match(name))
+
+
+def file_digest(content):
+    sha = hashlib.sha256()
+    for chunk in content.chunks():
+        sha.update(chunk)
+    content.seek(0)
+    return sha.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    # Files may back several objects: callers leave deletion to gc_media
+    shares_files = True
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = file_digest(content)
+        extension = EXTENSIONS.get(posixpath.splitext(name)[1].lower(), '')
+        name = f'{PREFIX}/{digest[:2]}/{digest}{extension}'
+        try:
+            # Already stored: same bytes, so nothing to write. Refresh the mtime so
+            # a running gc_media counts it as new rather than orphaned.
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return super().save(name, content, max_length=max_length)
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        if is_content_addressed(name):
+            # The name is the content: never suffix it (_save replaces in place)
+            return name
+        return super().get_available_name(name, max_length=max_length)
+
+    def _save(self, name, content):
+        if not is_content_addressed(name):
+            return super()._save(name, content)
+        # Write to a unique temporary name and rename it into place. A concurrent
+        # upload of the same bytes may create `name` meanwhile; replacing it with
+        # identical bytes is harmless, and readers never see a partial file.
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
@@ -0,0 +1,143 @@
+"""
+Token bucket throttles for public (AllowAny) endpoints.
+
+Buckets live in the Django cache so all workers share them when a shared
+cache (Redis) is configured. Each bucket is a single integer - the
+"theoretical arrival time" of the GCRA formulation of a token bucket - which
+is advanced with atomic cache.incr() instead of a read-modify-write.
+
+Budgets are configured per scope in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+as 'N/period': a bucket of N tokens that refills at N per period.
+"""
+import math
+import time
+from collections.abc import Mapping
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache as default_cache
+from django.http import JsonResponse
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base token bucket throttle. Subclasses return the keys to charge from
+    get_idents(); a request is allowed only if every key has a token left.
+    """
+    cache = default_cache
+    cache_prefix = 'throttle'
+    timer = time.time
+
+    PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.wait_ms = 0
+
+    def get_idents(self, request, view):
+        raise NotImplementedError('.get_idents() must be overridden')
+
+    def parse_rate(self, rate):
+        """'20/hour' -> (capacity 20, period 3600s)"""
+        num, period = rate.split('/')
+        return int(num), self.PERIODS[period[0]]
+
+    def allow_request(self, request, view):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        user = getattr(request, 'user', None)
+        if rate is None or (user is not None and user.is_staff):
+            return True
+
+        capacity, period = self.parse_rate(rate)
+        burst_ms = period * 1000
+        interval_ms = burst_ms // capacity  # Refill time for one token
+        now_ms = int(self.timer() * 1000)
+
+        charged = []
+        for ident in self.get_idents(request, view):
+            key = f'{self.cache_prefix}:{self.scope}:{ident}'
+            wait_ms = self._consume(key, now_ms, interval_ms, burst_ms, period)
+            if wait_ms:
+                # Refund tokens already taken from the other keys
+                for charged_key in charged:
+                    self.cache.decr(charged_key, interval_ms)
+                self.wait_ms = wait_ms
+                return False
+            charged.append(key)
+        return True
+
+    def _consume(self, key, now_ms, interval_ms, burst_ms, period):
+        """Take one token from the bucket; return 0 if allowed, else ms until a token frees up"""
+        timeout = period * 2
+        try:
+            tat = self.cache.incr(key, interval_ms)
+        except ValueError:
+            if self.cache.add(key, now_ms + interval_ms, timeout):
+                return 0
+            tat = self.cache.incr(key, interval_ms)
+
+        if tat - interval_ms < now_ms:
+            # Bucket had fully refilled while idle: restart the schedule from now
+            self.cache.set(key, now_ms + interval_ms, timeout)
+            return 0
+
+        if tat - now_ms > burst_ms:
+            # Out of tokens: undo the charge and keep the bucket alive while it's being hammered
+            self.cache.decr(key, interval_ms)
+            self.cache.touch(key, timeout)
+            return tat - now_ms - burst_ms
+        return 0
+
+    def wait(self):
+        return self.wait_ms / 1000
+
+
+class IPThrottle(TokenBucketThrottle):
+    """Per-client-IP bucket: REMOTE_ADDR, or X-Forwarded-For behind NUM_PROXIES proxies"""
+
+    def get_idents(self, request, view):
+        return [f'ip:{self.get_ident(request)}']
+
+
+class ContactThrottle(TokenBucketThrottle):
+    """Per-phone and per-email buckets, keyed on the normalized contact details"""
+
+    def get_idents(self, request, view):
+        from apps.reservations.models import Customer
+
+        params = request.data if request.method == 'POST' else request.query_params
+        if not isinstance(params, Mapping):
+            # e.g. a JSON list: no contact details; the serializer rejects it
+            return []
+        idents = []
+        phone = Customer.normalize_phone(self.text(params.get('phone')))
+        if phone:
+            idents.append(f'phone:{phone}')
+        email = Customer.normalize_email(self.text(params.get('email')))
+        if email:
+            idents.append(f'email:{email}')
+        return idents
+
+    @staticmethod
+    def text(value):
+        # JSON bodies can carry numbers (or anything else) where strings belong
+        return None if value is None else str(value)
+
+
+async def athrottle(request, throttles):
+    """
+    Throttle check for plain async Django views (DRF views call
+    allow_request() themselves). Returns a 429 response or None.
+    """
+    for throttle in throttles:
+        # Cache and session-user lookups are sync; run them off the event loop
+        if not await sync_to_async(throttle.allow_request)(request, None):
+            wait = math.ceil(throttle.wait())
+            unit = 'second' if wait == 1 else 'seconds'
+            response = JsonResponse(
+                {'detail': f'Request was throttled. Expected available in {wait} {unit}.'}, status=429
+            )
+            response['Retry-After'] = str(wait)
+            return response
+    return None
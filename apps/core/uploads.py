@@ -0,0 +1,105 @@
+"""
+Image uploads.
+
+Admin clients should send images as multipart/form-data. Django reads the
+body in 64 KB chunks: files up to FILE_UPLOAD_MAX_MEMORY_SIZE stay in
+memory, larger ones are spooled to a temp file, so a worker holds about one
+chunk of an upload whatever its size. FileSystemStorage then moves the temp
+file into MEDIA_ROOT instead of copying it.
+
+Uploads are checked from the image header only (format and dimensions);
+pixels are decoded later by the variant worker (apps/core/jobs.py).
+
+The older "data:image/png;base64,..." JSON strings are still accepted, but
+the whole string has to be in memory first; large ones are decoded in
+chunks into a temp file rather than a second in-memory buffer.
+"""
+import base64
+import binascii
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.base import ContentFile, File
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+# Stored file extension per detected format (multi-picture JPEGs open as MPO)
+EXTENSIONS = {'JPEG': '.jpg', 'MPO': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif'}
+BASE64_CHUNK = 64 * 1024  # Multiple of 4, so each slice decodes on its own
+
+
+class UploadSizeLimitHandler(FileUploadHandler):
+    """
+    Rejects a file as soon as it passes IMAGE_UPLOAD_MAX_BYTES, before the
+    rest of it is read. Goes first in FILE_UPLOAD_HANDLERS and passes the
+    data on to the memory/temp-file handlers.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.IMAGE_UPLOAD_MAX_BYTES:
+            raise RequestDataTooBig(f'Upload exceeds {settings.IMAGE_UPLOAD_MAX_BYTES} bytes')
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def decode_data_uri(data):
+    """File for a "data:image/...;base64," string; ValueError if it isn't one"""
+    header, _, payload = data.partition(';base64,')
+    if not payload:
+        raise ValueError('Not a base64 data URI')
+    name = f'{uuid.uuid4()}.{header.split("/")[-1]}'
+    if len(payload) <= settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+        return ContentFile(_b64decode(payload), name=name)
+
+    # Anonymous temp file: nothing to clean up whether or not the upload is saved
+    upload = File(tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR), name=name)
+    try:
+        for start in range(0, len(payload), BASE64_CHUNK):
+            upload.write(base64.b64decode(payload[start:start + BASE64_CHUNK], validate=True))
+    except binascii.Error:
+        # Line breaks or other padding: fall back to decoding in one go
+        upload.seek(0)
+        upload.truncate()
+        upload.write(_b64decode(payload))
+    upload.size = upload.tell()
+    upload.seek(0)
+    return upload
+
+
+def _b64decode(payload):
+    try:
+        return base64.b64decode(payload)
+    except binascii.Error as e:
+        raise ValueError(str(e))
+
+
+def inspect_image(file):
+    """
+    (format, width, height) read from the file's header, without decoding
+    pixels. Raises ValueError for unsupported, oversized or unreadable files.
+    """
+    if file.size > settings.IMAGE_UPLOAD_MAX_BYTES:
+        raise ValueError(f'Image files are limited to {settings.IMAGE_UPLOAD_MAX_BYTES // (1024 * 1024)} MB.')
+    source = file.temporary_file_path() if hasattr(file, 'temporary_file_path') else file
+    try:
+        file.seek(0)
+        with Image.open(source, formats=ALLOWED_FORMATS) as image:
+            details = image.format, image.width, image.height
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValueError('Upload a valid JPEG, PNG, WebP or GIF image.')
+    finally:
+        file.seek(0)
+    _, width, height = details
+    if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+        raise ValueError(f'Image is {width}x{height}; the limit is {settings.IMAGE_UPLOAD_MAX_PIXELS} pixels.')
+    return details
@@ -0,0 +1,39 @@
+"""
+Version counters in the default cache, for per-process caches of database
+rows (promo codes, menu prices).
+
+A process stamps what it loaded with current(key) and reloads when the
+stamp no longer matches. changed(key) returns a post_save/post_delete
+receiver that bumps the counter. With Redis every process sees a bump at
+once; with the local-memory cache only the process that made the change
+does, so callers also expire their caches after a while.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def current(key):
+    version = cache.get(key)
+    if version is None:
+        # Missing (first use or evicted): start somewhere no process has seen
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def changed(key):
+    def receiver(sender, instance, **kwargs):
+        # Now, so this process sees its own change; and after commit, so no process
+        # keeps what it loaded before the change was visible
+        bump(key)
+        transaction.on_commit(lambda: bump(key))
+    return receiver
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.static import serve
+from rest_framework import permissions
+from rest_framework.views import APIView
+
+from .metrics import registry
+from .storage import is_content_addressed
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class MetricsView(APIView):
+    """
+    Per-route request histograms in Prometheus text format (admin only)
+    GET /api/metrics/
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render_prometheus(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+
+def serve_media(request, path):
+    """
+    Media files from MEDIA_ROOT. Content-addressed names never change
+    meaning, so those are cacheable forever by browsers and the CDN.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if is_content_addressed(path):
+        response['Cache-Control'] = IMMUTABLE
+    else:
+        response['Cache-Control'] = f'public, max-age={settings.MEDIA_CACHE_SECONDS}'
+    return response
@@ -10,20 +10,23 @@ from django.db.models.functions import TruncDate, TruncMonth
 from django.utils import timezone
 from datetime import timedelta
 
+from apps.accounts.permissions import IsBranchStaff, scope_queryset
 from apps.reservations.models import Reservation
 from apps.menu.models import MenuItem, Category
 from apps.branches.models import Branch
 from apps.tables.models import Table
 from apps.inquiries.models import Inquiry
-from apps.deals.models import Deal
+from apps.deals.models import Deal, LIVE_STATUSES
 
 
 class DashboardStatsView(APIView):
     """
     Comprehensive dashboard statistics for admin panel
     GET /api/admin/stats/
+    
+    Branch managers get reservation, branch and table stats for their branch only.
     """
-    permission_classes = [permissions.IsAdminUser]
+    permission_classes = [IsBranchStaff]
     
     def get(self, request):
         today = timezone.now().date()
@@ -31,7 +34,7 @@ class DashboardStatsView(APIView):
         month_ago = today - timedelta(days=30)
         
         # Reservation Stats
-        reservations = Reservation.objects.all()
+        reservations = scope_queryset(Reservation.objects.all(), request.user)
         today_reservations = reservations.filter(date=today)
         
         reservation_stats = {
@@ -62,7 +65,7 @@ class DashboardStatsView(APIView):
         }
         
         # Branch Stats
-        branches = Branch.objects.all()
+        branches = scope_queryset(Branch.objects.all(), request.user, 'pk')
         branch_stats = {
             'total': branches.count(),
             'active': branches.filter(status='active').count(),
@@ -70,7 +73,7 @@ class DashboardStatsView(APIView):
         }
         
         # Table Stats
-        tables = Table.objects.all()
+        tables = scope_queryset(Table.objects.all(), request.user)
         table_stats = {
             'total': tables.count(),
             'active': tables.filter(status='active').count(),
@@ -92,11 +95,15 @@ class DashboardStatsView(APIView):
         }
         
         # Deal Stats
+        # Same rules as Deal.currently_valid and the deal_lifecycle scheduler
         deals = Deal.objects.all()
+        deal_today = timezone.localdate()
         deal_stats = {
             'total': deals.count(),
-            'active': deals.filter(status='active').count(),
-            'expired': deals.filter(valid_until__lt=today).count(),
+            'active': deals.valid_on(deal_today).count(),
+            'scheduled': deals.filter(status__in=LIVE_STATUSES, valid_from__gt=deal_today).count(),
+            'paused': deals.filter(status='paused').count(),
+            'expired': deals.expired_on(deal_today).count(),
         }
         
         return Response({
@@ -115,15 +122,16 @@ class ReservationTrendsView(APIView):
     Reservation trends for charts
     GET /api/dashboard/stats/reservation-trends/
     """
-    permission_classes = [permissions.IsAdminUser]
+    permission_classes = [IsBranchStaff]
     
     def get(self, request):
         days = int(request.query_params.get('days', 30))
         start_date = timezone.now().date() - timedelta(days=days)
+        reservations = scope_queryset(Reservation.objects.all(), request.user)
         
         # Daily reservation counts by date
         daily_data = (
-            Reservation.objects
+            reservations
             .filter(date__gte=start_date)
             .values('date')
             .annotate(
@@ -137,7 +145,7 @@ class ReservationTrendsView(APIView):
         
         # By status breakdown
         status_breakdown = (
-            Reservation.objects
+            reservations
             .filter(date__gte=start_date)
             .values('status')
             .annotate(count=Count('id'))
@@ -145,7 +153,7 @@ class ReservationTrendsView(APIView):
         
         # By branch
         by_branch = (
-            Reservation.objects
+            reservations
             .filter(date__gte=start_date)
             .values('branch__name')
             .annotate(count=Count('id'))
@@ -154,13 +162,13 @@ class ReservationTrendsView(APIView):
         
         # Average guests
         avg_guests = (
-            Reservation.objects
+            reservations
             .filter(date__gte=start_date)
             .aggregate(avg=Avg('guests'))
         )
         
         # Total for period
-        total_for_period = Reservation.objects.filter(date__gte=start_date).count()
+        total_for_period = reservations.filter(date__gte=start_date).count()
         
         return Response({
             'daily': list(daily_data),
@@ -177,25 +185,41 @@ class BranchPerformanceView(APIView):
     Branch performance metrics
     GET /api/admin/stats/branch-performance/
     """
-    permission_classes = [permissions.IsAdminUser]
+    permission_classes = [IsBranchStaff]
     
     def get(self, request):
         today = timezone.now().date()
         month_ago = today - timedelta(days=30)
         
-        branches = Branch.objects.filter(status='active')
-        performance = []
+        branches = scope_queryset(Branch.objects.filter(status='active'), request.user, 'pk')
         
-        for branch in branches:
-            reservations = Reservation.objects.filter(
-                branch=branch,
-                date__gte=month_ago
+        # One grouped query per table instead of six queries per branch
+        recent = Q(date__gte=month_ago)
+        reservation_counts = {
+            row['branch_id']: row
+            for row in Reservation.objects.filter(branch__in=branches).filter(recent)
+            .values('branch_id')
+            .annotate(
+                total=Count('id'),
+                completed=Count('id', filter=Q(status='completed')),
+                cancelled=Count('id', filter=Q(status='cancelled')),
+                no_shows=Count('id', filter=Q(status='no_show')),
             )
-            
-            total = reservations.count()
-            completed = reservations.filter(status='completed').count()
-            cancelled = reservations.filter(status='cancelled').count()
-            no_shows = reservations.filter(status='no_show').count()
+        }
+        table_counts = {
+            row['branch_id']: row
+            for row in Table.objects.filter(branch__in=branches)
+            .values('branch_id')
+            .annotate(count=Count('id'), capacity=Sum('seats'))
+        }
+        
+        performance = []
+        for branch in branches:
+            counts = reservation_counts.get(branch.id, {})
+            tables = table_counts.get(branch.id, {})
+            total = counts.get('total', 0)
+            completed = counts.get('completed', 0)
+            cancelled = counts.get('cancelled', 0)
             
             performance.append({
                 'branch_id': branch.id,
@@ -203,11 +227,11 @@ class BranchPerformanceView(APIView):
                 'total_reservations': total,
                 'completed': completed,
                 'cancelled': cancelled,
-                'no_shows': no_shows,
+                'no_shows': counts.get('no_shows', 0),
                 'completion_rate': round((completed / total * 100), 1) if total > 0 else 0,
                 'cancellation_rate': round((cancelled / total * 100), 1) if total > 0 else 0,
-                'tables_count': branch.tables.count(),
-                'total_capacity': branch.tables.aggregate(total=Sum('seats'))['total'] or 0,
+                'tables_count': tables.get('count', 0),
+                'total_capacity': tables.get('capacity') or 0,
             })
         
         return Response({
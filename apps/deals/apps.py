@@ -1,7 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class DealsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.deals'
     verbose_name = 'Deals & Offers'
+
+    def ready(self):
+        from . import codes
+        deal = self.get_model('Deal')
+        post_save.connect(codes.deal_changed, sender=deal, dispatch_uid='deals_deal_saved')
+        post_delete.connect(codes.deal_changed, sender=deal, dispatch_uid='deals_deal_deleted')
@@ -0,0 +1,55 @@
+"""
+Promo code validation without a database query.
+
+Each process keeps an index of the deals valid today, keyed by normalized
+code (see normalize_code). It is stamped with:
+
+  * the deals version, a counter in the default cache bumped whenever a
+    Deal is saved or deleted;
+  * the date it was built for, so deals drop out (and start) at rollover.
+
+A lookup rebuilds the index when either stamp is out of date, and otherwise
+answers from memory. With the local-memory cache other worker processes
+don't see a bump, so the index is also rebuilt every DEAL_INDEX_MAX_AGE
+seconds.
+
+Validity is Deal.is_valid(), checked again on the indexed deal.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core import versions
+
+from .models import Deal, normalize_code
+
+VERSION_KEY = 'deals:version'
+deal_changed = versions.changed(VERSION_KEY)
+
+
+class CodeIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.deals = {}
+        self.stamp = None  # (version, day) the index was built for
+        self.built_at = 0
+
+    def rebuild(self, version, today):
+        self.deals = {normalize_code(deal.code): deal for deal in Deal.objects.valid_on(today)}
+        self.stamp, self.built_at = (version, today), time.monotonic()
+
+    def lookup(self, code):
+        """The deal `code` refers to if it is valid today, else None"""
+        today = timezone.localdate()
+        version = versions.current(VERSION_KEY)
+        with self.lock:
+            expired = time.monotonic() - self.built_at > settings.DEAL_INDEX_MAX_AGE
+            if self.stamp != (version, today) or expired:
+                self.rebuild(version, today)
+            deal = self.deals.get(normalize_code(code))
+        return deal if deal is not None and deal.is_valid() else None
+
+
+codes = CodeIndex()
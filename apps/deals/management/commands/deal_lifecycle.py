@@ -0,0 +1,53 @@
+"""
+Move deals between scheduled, active and expired as their windows open and
+close. Run it just after midnight (TIME_ZONE), e.g. from cron:
+
+    5 0 * * * python manage.py deal_lifecycle
+
+or keep it running with --loop, which wakes at each local midnight.
+
+Each run is one UPDATE (DealQuerySet.lifecycle_due); paused and expired
+deals are never touched. Public listings and code checks go by the dates
+(Deal.currently_valid), so a late run only delays the status shown to
+admins, never which deals customers get.
+"""
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.core import versions
+from apps.deals.codes import VERSION_KEY
+from apps.deals.models import Deal
+
+
+def apply_lifecycle(day=None):
+    """Update deal statuses for `day` (default today); returns the number changed"""
+    changed = Deal.objects.lifecycle_due(day or timezone.localdate())
+    if changed:
+        # Cached deals (the code index) carry the old status
+        versions.bump(VERSION_KEY)
+    return changed
+
+
+def seconds_until_tomorrow():
+    now = timezone.localtime()
+    midnight = timezone.make_aware(datetime.combine(now.date() + timedelta(days=1), datetime.min.time()))
+    return (midnight - now).total_seconds()
+
+
+class Command(BaseCommand):
+    help = 'Flip deals to scheduled/active/expired by their validity dates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running, once after each local midnight')
+
+    def handle(self, *args, **options):
+        while True:
+            changed = apply_lifecycle()
+            self.stdout.write(self.style.SUCCESS(f'Updated {changed} deal(s) for {timezone.localdate()}'))
+            if not options['loop']:
+                return
+            # A few seconds past midnight, so localdate() has moved on
+            time.sleep(seconds_until_tomorrow() + 5)
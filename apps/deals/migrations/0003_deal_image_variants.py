@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0002_deal_discounted_price_deal_original_price_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deal',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
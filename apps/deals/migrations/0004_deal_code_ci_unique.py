@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:45
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Upper
+
+
+def report_duplicate_codes(apps, schema_editor):
+    """Refuse to add the constraint over duplicates, listing them so they can be fixed"""
+    Deal = apps.get_model('deals', 'Deal')
+    deals = Deal.objects.using(schema_editor.connection.alias).annotate(code_key=Upper('code'))
+    duplicates = deals.values('code_key').annotate(count=Count('id')).filter(count__gt=1).values_list('code_key', flat=True)
+    if not duplicates:
+        return
+    lines = []
+    for code_key in duplicates:
+        matches = deals.filter(code_key=code_key).order_by('id').values_list('id', 'code')
+        lines.append(f'  {code_key}: ' + ', '.join(f'{code} (id {pk})' for pk, code in matches))
+    raise RuntimeError(
+        'Deal codes must be unique (ignoring case) before this migration can run. '
+        'Rename all but one of these deals:\n' + '\n'.join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0003_deal_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(report_duplicate_codes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='deal',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Upper('code'), name='deals_code_ci_unique', violation_error_message='A deal with this code already exists.'),
+        ),
+    ]
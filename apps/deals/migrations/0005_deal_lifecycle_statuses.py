@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:10
+
+from django.db import migrations, models
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
+
+
+def apply_lifecycle(apps, schema_editor):
+    """Same update as DealQuerySet.lifecycle_due(), for deals already in the table"""
+    Deal = apps.get_model('deals', 'Deal')
+    day = timezone.localdate()
+    Deal.objects.using(schema_editor.connection.alias).filter(
+        Q(valid_until__lt=day) | Q(status='active', valid_from__gt=day),
+        status__in=['scheduled', 'active'],
+    ).update(status=Case(
+        When(valid_until__lt=day, then=Value('expired')),
+        When(valid_from__gt=day, then=Value('scheduled')),
+        default=Value('active'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0004_deal_code_ci_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='deal',
+            name='status',
+            field=models.CharField(choices=[('scheduled', 'Scheduled'), ('active', 'Active'), ('paused', 'Paused'), ('expired', 'Expired')], default='active', max_length=10),
+        ),
+        migrations.RunPython(apply_lifecycle, migrations.RunPython.noop),
+    ]
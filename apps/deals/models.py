@@ -1,13 +1,65 @@
 from django.db import models
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import Upper
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
+from apps.core.images import ResponsiveImagesMixin
 
-class Deal(models.Model):
+def normalize_code(code) -> str:
+    """Promo codes match ignoring case and surrounding spaces (JSON may send a number)"""
+    return str(code or '').strip().upper()
+
+
+# Statuses the lifecycle scheduler moves between by date; paused and expired are left alone
+LIVE_STATUSES = ('scheduled', 'active')
+
+
+class DealQuerySet(models.QuerySet):
+    def valid_on(self, day):
+        """Deals for which is_valid() holds on `day`"""
+        # Dates decide, so a deal is valid from its first day even before the scheduler runs
+        return self.filter(status__in=LIVE_STATUSES, valid_from__lte=day, valid_until__gte=day)
+    
+    def expired_on(self, day):
+        """Deals marked expired, or whose window ended before `day`"""
+        return self.filter(Q(status='expired') | Q(status__in=LIVE_STATUSES, valid_until__lt=day))
+    
+    def lifecycle_due(self, day):
+        """
+        Set-based version of Deal.lifecycle_status(): one UPDATE moving every
+        live deal to scheduled/active/expired by date. Returns the rows changed.
+        """
+        status = Case(
+            When(valid_until__lt=day, then=Value('expired')),
+            When(valid_from__gt=day, then=Value('scheduled')),
+            default=Value('active'),
+        )
+        stale = (
+            Q(valid_until__lt=day)
+            | Q(status='active', valid_from__gt=day)
+            | Q(status='scheduled', valid_from__lte=day)
+        )
+        return self.filter(stale, status__in=LIVE_STATUSES).update(status=status, updated_at=timezone.now())
+    
+    def with_code(self, code):
+        """Deals whose code matches ignoring case (uses deals_code_ci_unique)"""
+        return self.alias(code_key=Upper('code')).filter(code_key=Upper(Value(normalize_code(code))))
+
+
+class CurrentlyValidManager(models.Manager.from_queryset(DealQuerySet)):
+    """Deal.currently_valid: deals valid today, whatever the scheduler has got to"""
+    
+    def get_queryset(self):
+        return super().get_queryset().valid_on(timezone.localdate())
+
+
+class Deal(ResponsiveImagesMixin, models.Model):
     """
     Promotional Deal model
     """
     STATUS_CHOICES = [
+        ('scheduled', 'Scheduled'),
         ('active', 'Active'),
         ('paused', 'Paused'),
         ('expired', 'Expired'),
@@ -40,11 +92,16 @@ class Deal(models.Model):
     valid_until = models.DateField()
     
     image = models.ImageField(upload_to='deals/', null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     tag = models.CharField(max_length=50)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    responsive_images = {'image': 'image_variants'}
+    
+    objects = DealQuerySet.as_manager()
+    currently_valid = CurrentlyValidManager()
     
     def clean(self):
         """Validate deal dates"""
@@ -54,14 +111,27 @@ class Deal(models.Model):
                 raise ValidationError({'valid_until': 'End date must be after start date'})
     
     def is_valid(self):
-        """Check if deal is currently valid"""
-        today = timezone.now().date()
+        """Check if deal is currently valid (same rule as Deal.currently_valid)"""
+        today = timezone.localdate()
         return (
-            self.status == 'active' and 
+            self.status in LIVE_STATUSES and 
             self.valid_from <= today <= self.valid_until
         )
+    
+    def lifecycle_status(self, day):
+        """The status the scheduler gives this deal on `day`"""
+        if self.status not in LIVE_STATUSES:
+            return self.status
+        if self.valid_until < day:
+            return 'expired'
+        if self.valid_from > day:
+            return 'scheduled'
+        return 'active'
 
     def save(self, *args, **kwargs):
+        # Apply the lifecycle straight away instead of waiting for the scheduler
+        if self.valid_from and self.valid_until:
+            self.status = self.lifecycle_status(timezone.localdate())
         # Auto-calculate discount value if prices are set
         if self.original_price and self.discounted_price:
             self.discount_value = self.original_price - self.discounted_price
@@ -84,6 +154,14 @@ class Deal(models.Model):
         indexes = [
             models.Index(fields=['valid_from', 'valid_until', 'status']),
         ]
+        constraints = [
+            # Codes are entered in any case, so they must be unique ignoring it
+            models.UniqueConstraint(
+                Upper('code'),
+                name='deals_code_ci_unique',
+                violation_error_message='A deal with this code already exists.',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.code}) - {self.discount_display}"
@@ -1,6 +1,7 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from .codes import codes
 from .models import Deal
 from .serializers import DealSerializer
 
@@ -14,19 +15,24 @@ class DealViewSet(viewsets.ModelViewSet):
             return [permissions.AllowAny()]
         return [permissions.IsAdminUser()]
     
+    def get_queryset(self):
+        # Admins manage every deal; everyone else only sees deals valid today
+        if self.request.user.is_staff:
+            return Deal.objects.all()
+        return Deal.currently_valid.all()
+    
     @action(detail=False, methods=['post'])
     def validate(self, request):
-        """Validate a promo code"""
+        """Validate a promo code (any case); answered from the in-memory code index"""
         code = request.data.get('code')
         if not code:
             return Response({'error': 'Code required'}, status=400)
         
-        try:
-            deal = Deal.objects.get(code=code, status='active')
-            serializer = self.get_serializer(deal)
-            return Response({
-                'valid': True,
-                'deal': serializer.data
-            })
-        except Deal.DoesNotExist:
+        deal = codes.lookup(code)
+        if deal is None:
             return Response({'valid': False, 'error': 'Invalid or expired code'}, status=404)
+        serializer = self.get_serializer(deal)
+        return Response({
+            'valid': True,
+            'deal': serializer.data
+        })
@@ -1,6 +1,7 @@
 from django.db import models
+from apps.core.images import ResponsiveImagesMixin
 
-class GalleryImage(models.Model):
+class GalleryImage(ResponsiveImagesMixin, models.Model):
     """
     Gallery Image model
     """
@@ -11,10 +12,13 @@ class GalleryImage(models.Model):
     ]
     
     image = models.ImageField(upload_to='gallery/', null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     category = models.CharField(max_length=15, choices=CATEGORY_CHOICES)
     caption = models.CharField(max_length=200)
     date_added = models.DateField(auto_now_add=True)
     
+    responsive_images = {'image': 'image_variants'}
+    
     class Meta:
         db_table = 'gallery_images'
         ordering = ['-date_added']
@@ -1,25 +1,10 @@
-import base64
-import uuid
-from django.core.files.base import ContentFile
 from rest_framework import serializers
+from apps.core.serializers import ImageVariantsField, UploadedImageField
 from .models import GalleryImage
 
-class Base64ImageField(serializers.ImageField):
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            # format: "data:image/png;base64,....."
-            try:
-                header, imgstr = data.split(';base64,')
-                ext = header.split('/')[-1] 
-                id = str(uuid.uuid4())
-                data = ContentFile(base64.b64decode(imgstr), name=id + '.' + ext)
-            except Exception:
-                pass # let super handle validation error if format is bad
-
-        return super().to_internal_value(data)
-
 class GalleryImageSerializer(serializers.ModelSerializer):
-    image = Base64ImageField(max_length=None, use_url=True)
+    image = UploadedImageField(max_length=None, use_url=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = GalleryImage
@@ -1,6 +1,7 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from apps.core.throttling import IPThrottle, ContactThrottle
 from .models import Inquiry
 from .serializers import InquirySerializer
 
@@ -15,6 +16,11 @@ class InquiryViewSet(viewsets.ModelViewSet):
             return [permissions.AllowAny()]
         return [permissions.IsAdminUser()]
     
+    def get_throttles(self):
+        if self.action == 'create':
+            return [IPThrottle('inquiry'), ContactThrottle('inquiry_contact')]
+        return super().get_throttles()
+    
     @action(detail=True, methods=['patch'])
     def update_status(self, request, pk=None):
         """Update inquiry status"""
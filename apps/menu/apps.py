@@ -1,7 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save, pre_delete
 
 
 class MenuConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.menu'
     verbose_name = 'Menu'
+
+    def ready(self):
+        from . import catalog, pricing
+        item = self.get_model('MenuItem')
+        category = self.get_model('Category')
+        post_save.connect(pricing.menu_changed, sender=item, dispatch_uid='menu_item_saved')
+        post_delete.connect(pricing.menu_changed, sender=item, dispatch_uid='menu_item_deleted')
+        post_delete.connect(catalog.item_deleted, sender=item, dispatch_uid='menu_item_tombstone')
+        pre_delete.connect(catalog.category_deleting, sender=category, dispatch_uid='menu_category_deleting')
+        post_delete.connect(catalog.category_deleted, sender=category, dispatch_uid='menu_category_tombstone')
@@ -0,0 +1,79 @@
+"""
+Async menu list, served when ASYNC_VIEWS is enabled under ASGI.
+
+Filtering, search and ordering reuse MenuItemViewSet's filter backends so the
+query string behaves exactly like the DRF endpoint; only the COUNT and page
+fetch go through the async ORM. Non-GET requests (admin create) are handed to
+the regular viewset.
+"""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .serializers import MenuItemSerializer
+from .views import MenuItemViewSet
+
+menu_item_list_create = MenuItemViewSet.as_view({'get': 'list', 'post': 'create'})
+
+
+@sync_to_async
+def _filtered_queryset(request):
+    # django-filter validates choice filters (e.g. ?category=) against the DB
+    view = MenuItemViewSet(request=Request(request), action='list', format_kwarg=None, kwargs={})
+    return view.filter_queryset(view.get_queryset())
+
+
+async def _paginate(request, queryset):
+    """Same page shape and links as rest_framework's PageNumberPagination"""
+    page_size = api_settings.PAGE_SIZE
+    count = await queryset.acount()
+    num_pages = max(1, -(-count // page_size))
+    page_param = request.GET.get('page', 1)
+    try:
+        page = num_pages if page_param == 'last' else int(page_param)
+    except (TypeError, ValueError):
+        page = 0
+    if not 1 <= page <= num_pages:
+        return None
+
+    offset = (page - 1) * page_size
+    items = [item async for item in queryset[offset:offset + page_size]]
+
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, 'page', page + 1) if page < num_pages else None
+    if page <= 1:
+        previous_url = None
+    elif page == 2:
+        previous_url = remove_query_param(url, 'page')
+    else:
+        previous_url = replace_query_param(url, 'page', page - 1)
+    return {'count': count, 'next': next_url, 'previous': previous_url, 'items': items}
+
+
+def _error_response(exc, request):
+    """`exc` answered by DRF's exception handler, as the sync viewset would"""
+    response = api_settings.EXCEPTION_HANDLER(exc, {'request': request, 'view': None})
+    return JsonResponse(response.data, status=response.status_code, safe=False)
+
+
+@csrf_exempt
+async def menu_item_list(request):
+    if request.method != 'GET':
+        return await sync_to_async(menu_item_list_create)(request)
+
+    try:
+        queryset = await _filtered_queryset(request)
+        page = await _paginate(request, queryset)
+        if page is None:
+            raise NotFound(PageNumberPagination.invalid_page_message)
+    except APIException as e:
+        return _error_response(e, request)
+
+    items = page.pop('items')
+    page['results'] = MenuItemSerializer(items, many=True, context={'request': request}).data
+    return JsonResponse(page)
@@ -0,0 +1,56 @@
+"""
+Incremental menu sync.
+
+Every MenuItem and Category carries the catalog version of its last change
+(CatalogVersion, counted up in the saving transaction), and deleting one
+leaves a CatalogTombstone with a version of its own. A client keeps the
+version it last synced to and asks for changes_since(version): the items
+and categories changed after it, plus the ids deleted after it. Version 0
+means everything.
+
+Queryset update()s skip save() and so don't bump versions; code that
+changes menu rows in bulk must set version=CatalogVersion.next() itself.
+"""
+from .models import CatalogTombstone, CatalogVersion, Category, MenuItem
+
+
+def category_deleting(sender, instance, **kwargs):
+    # Deleting a category sets its items' category to NULL without saving them
+    instance.items.update(version=CatalogVersion.next())
+
+
+def item_deleted(sender, instance, **kwargs):
+    CatalogTombstone.objects.create(kind='item', object_id=instance.pk, version=CatalogVersion.next())
+
+
+def category_deleted(sender, instance, **kwargs):
+    CatalogTombstone.objects.create(kind='category', object_id=instance.pk, version=CatalogVersion.next())
+
+
+def changes_since(since):
+    """
+    {'version', 'items', 'categories', 'deleted'} for changes after `since`.
+    The version is read first, so anything committed meanwhile is sent again
+    next time rather than missed.
+    """
+    version = CatalogVersion.current()
+    if since > version:
+        # The client synced against another database: start over
+        since = 0
+    items = MenuItem.objects.select_related('category')
+    categories = Category.objects.all()
+    tombstones = CatalogTombstone.objects.none()
+    if since:
+        items = items.filter(version__gt=since)
+        categories = categories.filter(version__gt=since)
+        tombstones = CatalogTombstone.objects.filter(version__gt=since)
+    deleted = {'items': [], 'categories': []}
+    for kind, object_id in tombstones.values_list('kind', 'object_id'):
+        deleted['items' if kind == 'item' else 'categories'].append(object_id)
+    return {
+        'version': version,
+        'full': not since,
+        'items': items,
+        'categories': categories,
+        'deleted': deleted,
+    }
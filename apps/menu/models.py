@@ -1,13 +1,64 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.core.validators import MinValueValidator
 
 from django.utils.text import slugify
+from apps.core.images import ResponsiveImagesMixin
+
+
+class CatalogVersion(models.Model):
+    """
+    The menu catalog version: a single row, counted up on every change to a
+    MenuItem or Category. Callers allocate a number inside the transaction
+    that writes the change, so the row stays locked until it commits and
+    changes become visible in version order.
+    """
+    value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list('value', flat=True).first() or 0
+
+    @classmethod
+    def next(cls):
+        with transaction.atomic(savepoint=False):
+            if not cls.objects.filter(pk=1).update(value=F('value') + 1):
+                cls.objects.create(pk=1, value=1)
+            return cls.objects.filter(pk=1).values_list('value', flat=True).get()
+
+
+class CatalogTombstone(models.Model):
+    """A deleted MenuItem or Category, so delta syncs can drop it"""
+    KINDS = [
+        ('item', 'Menu item'),
+        ('category', 'Category'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.BigIntegerField()
+    version = models.BigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['version']
+
+
+def save_with_version(instance, save, args, kwargs):
+    """Run save() with a fresh catalog version, also on update_fields saves"""
+    if kwargs.get('update_fields') is not None:
+        kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+    with transaction.atomic(savepoint=False):
+        instance.version = CatalogVersion.next()
+        save(*args, **kwargs)
+
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     icon = models.CharField(max_length=50, default="Utensils")
     slug = models.SlugField(unique=True, blank=True)
+    # Catalog version of the last change, see CatalogVersion
+    version = models.BigIntegerField(default=0, db_index=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -17,12 +68,17 @@ class Category(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        with transaction.atomic(savepoint=False):
+            save_with_version(self, super().save, args, kwargs)
+            if not adding:
+                # Items embed their category, so they change with it
+                self.items.update(version=self.version)
 
     def __str__(self):
         return self.name
 
-class MenuItem(models.Model):
+class MenuItem(ResponsiveImagesMixin, models.Model):
     """
     Menu Item model
     """
@@ -45,10 +101,13 @@ class MenuItem(models.Model):
     )
     currency = models.CharField(max_length=3, default='INR')
     image = models.ImageField(upload_to='menu/', null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_veg = models.BooleanField(default=False)
     is_spicy = models.BooleanField(default=False)
     status = models.CharField(max_length=15, choices=STOCK_STATUS, default='in_stock')
-    
+    # Catalog version of the last change, see CatalogVersion
+    version = models.BigIntegerField(default=0, db_index=True, editable=False)
+
     # Featured on landing page
     is_featured = models.BooleanField(
         default=False, 
@@ -62,6 +121,8 @@ class MenuItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    responsive_images = {'image': 'image_variants'}
+    
     class Meta:
         db_table = 'menu_items'
         ordering = ['category_text', 'name']
@@ -71,7 +132,11 @@ class MenuItem(models.Model):
     def save(self, *args, **kwargs):
         if self.category and not self.category_text:
             self.category_text = self.category.name
-        super().save(*args, **kwargs)
+        save_with_version(self, super().save, args, kwargs)
+
+    @classmethod
+    def variants_update_fields(cls):
+        return {'version': CatalogVersion.next()}
 
     def __str__(self):
         return f"{self.name} ({self.category})"
@@ -0,0 +1,140 @@
+"""
+Server-side cart pricing.
+
+quote() prices a list of (menu item id, quantity) lines and applies an
+optional promo code, all in Decimal. Item prices come from a per-process
+cache stamped with the menu version (bumped when a MenuItem is saved or
+deleted, see apps.core.versions); items not cached yet are fetched with a
+single in_bulk() query, and the promo code from the deals code index, so a
+quote on a warm process runs no queries at all. The cache is also cleared
+every MENU_PRICE_CACHE_SECONDS, for processes that don't share the cache.
+
+Discounts:
+  * percentage: discount_value percent of the subtotal (at most 100%);
+  * fixed: discount_value off, never more than the subtotal.
+Amounts are rounded half-up to the paisa.
+"""
+import threading
+import time
+from decimal import ROUND_HALF_UP, Decimal
+from typing import NamedTuple
+
+from django.conf import settings
+
+from apps.core import versions
+from apps.deals.codes import codes
+
+from .models import MenuItem
+
+VERSION_KEY = 'menu:version'
+menu_changed = versions.changed(VERSION_KEY)
+
+CENT = Decimal('0.01')
+HUNDRED = Decimal(100)
+
+
+class QuoteError(Exception):
+    def __init__(self, field, message):
+        super().__init__(message)
+        self.field, self.message = field, message
+
+
+class Price(NamedTuple):
+    name: str
+    price: Decimal
+    currency: str
+    status: str
+
+
+class PriceCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.prices = {}  # item id -> Price
+        self.version = None
+        self.built_at = 0
+
+    def get_many(self, ids):
+        """{id: Price} for the ids that exist"""
+        version = versions.current(VERSION_KEY)
+        with self.lock:
+            if version != self.version or time.monotonic() - self.built_at > settings.MENU_PRICE_CACHE_SECONDS:
+                self.prices, self.version, self.built_at = {}, version, time.monotonic()
+            prices = self.prices
+            missing = [pk for pk in ids if pk not in prices]
+        if missing:
+            fetched = MenuItem.objects.only('name', 'price', 'currency', 'status').in_bulk(missing)
+            loaded = {pk: Price(item.name, item.price, item.currency, item.status) for pk, item in fetched.items()}
+            with self.lock:
+                # Only keep them if no newer version cleared the cache meanwhile
+                if self.prices is prices:
+                    prices.update(loaded)
+            prices = {**prices, **loaded}
+        return {pk: prices[pk] for pk in ids if pk in prices}
+
+
+prices = PriceCache()
+
+
+def money(amount):
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def discount_for(deal, subtotal):
+    value = deal.discount_value or Decimal(0)
+    if deal.discount_type == 'percentage':
+        return money(subtotal * min(value, HUNDRED) / HUNDRED)
+    return min(money(value), subtotal)
+
+
+def quote(lines, code=None):
+    """
+    Price `lines`, a list of (item id, quantity), with an optional promo code.
+    Raises QuoteError for unknown or unavailable items and invalid codes.
+    """
+    found = prices.get_many({pk for pk, _ in lines})
+    unknown = sorted({pk for pk, _ in lines} - found.keys())
+    if unknown:
+        raise QuoteError('items', f'Unknown menu item(s): {", ".join(map(str, unknown))}')
+    unavailable = sorted({pk for pk, _ in lines if found[pk].status == 'out_of_stock'})
+    if unavailable:
+        raise QuoteError('items', f'Out of stock: {", ".join(found[pk].name for pk in unavailable)}')
+    currencies = {found[pk].currency for pk, _ in lines}
+    if len(currencies) > 1:
+        raise QuoteError('items', 'Items are priced in different currencies')
+
+    priced = []
+    subtotal = Decimal(0)
+    for pk, quantity in lines:
+        item = found[pk]
+        line_total = money(item.price * quantity)
+        subtotal += line_total
+        priced.append({
+            'id': pk,
+            'name': item.name,
+            'unit_price': item.price,
+            'quantity': quantity,
+            'line_total': line_total,
+        })
+
+    deal = None
+    discount = Decimal('0.00')
+    if code:
+        deal = codes.lookup(code)
+        if deal is None:
+            raise QuoteError('code', 'Invalid or expired code')
+        discount = discount_for(deal, subtotal)
+
+    return {
+        'currency': currencies.pop(),
+        'lines': priced,
+        'subtotal': money(subtotal),
+        'discount': discount,
+        'total': money(subtotal - discount),
+        'deal': deal and {
+            'id': deal.id,
+            'code': deal.code,
+            'title': deal.title,
+            'discount_type': deal.discount_type,
+            'discount_value': deal.discount_value,
+        },
+    }
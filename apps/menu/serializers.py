@@ -1,32 +1,67 @@
-import base64
-import uuid
-from django.core.files.base import ContentFile
 from rest_framework import serializers
+from apps.core.serializers import ImageVariantsField, UploadedImageField
 from .models import MenuItem, Category
 
-class Base64ImageField(serializers.ImageField):
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            # format: "data:image/png;base64,....."
-            try:
-                header, imgstr = data.split(';base64,')
-                ext = header.split('/')[-1] 
-                id = str(uuid.uuid4())
-                data = ContentFile(base64.b64decode(imgstr), name=id + '.' + ext)
-            except Exception:
-                pass # let super handle validation error if format is bad
-
-        return super().to_internal_value(data)
-
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = '__all__'
 
 class MenuItemSerializer(serializers.ModelSerializer):
-    image = Base64ImageField(required=False, allow_null=True)
+    image = UploadedImageField(required=False, allow_null=True)
+    image_variants = ImageVariantsField()
     category_details = CategorySerializer(source='category', read_only=True)
 
     class Meta:
         model = MenuItem
         fields = '__all__'
+
+
+class QuoteLineSerializer(serializers.Serializer):
+    id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, max_value=99)
+
+
+class QuoteRequestSerializer(serializers.Serializer):
+    items = QuoteLineSerializer(many=True, allow_empty=False, max_length=100)
+    code = serializers.CharField(required=False, allow_blank=True, max_length=20)
+
+
+class QuotedLineSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    quantity = serializers.IntegerField()
+    line_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class QuotedDealSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    code = serializers.CharField()
+    title = serializers.CharField()
+    discount_type = serializers.CharField()
+    discount_value = serializers.DecimalField(max_digits=5, decimal_places=2, allow_null=True)
+
+
+class QuoteSerializer(serializers.Serializer):
+    """Output of apps.menu.pricing.quote()"""
+    currency = serializers.CharField()
+    lines = QuotedLineSerializer(many=True)
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    discount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    deal = QuotedDealSerializer(allow_null=True)
+
+
+class CatalogDeletedSerializer(serializers.Serializer):
+    items = serializers.ListField(child=serializers.IntegerField())
+    categories = serializers.ListField(child=serializers.IntegerField())
+
+
+class CatalogChangesSerializer(serializers.Serializer):
+    """Output of apps.menu.catalog.changes_since()"""
+    version = serializers.IntegerField()
+    full = serializers.BooleanField()
+    items = MenuItemSerializer(many=True)
+    categories = CategorySerializer(many=True)
+    deleted = CatalogDeletedSerializer()
@@ -1,5 +1,7 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import MenuItemViewSet, CategoryViewSet
 
 router = DefaultRouter()
@@ -7,3 +9,9 @@ router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'', MenuItemViewSet, basename='menuitem')
 
 urlpatterns = router.urls
+
+if settings.ASYNC_VIEWS:
+    # Async versions take precedence over the router's sync routes
+    urlpatterns = [
+        path('', async_views.menu_item_list, name='menuitem-list'),
+    ] + urlpatterns
@@ -1,8 +1,12 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from . import catalog, pricing
 from .models import MenuItem, Category
-from .serializers import MenuItemSerializer, CategorySerializer
+from .serializers import (
+    CatalogChangesSerializer, CategorySerializer, MenuItemSerializer, QuoteRequestSerializer, QuoteSerializer,
+)
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -18,16 +22,48 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
 
 class MenuItemViewSet(viewsets.ModelViewSet):
-    queryset = MenuItem.objects.all()
+    queryset = MenuItem.objects.select_related('category')
     serializer_class = MenuItemSerializer
     filterset_fields = ['category', 'category_text', 'status', 'is_veg', 'is_spicy', 'is_featured']
     search_fields = ['name', 'description']
     
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'featured']:
+        if self.action in ['list', 'retrieve', 'featured', 'quote', 'changes']:
             return [permissions.AllowAny()]
         return [permissions.IsAdminUser()]
     
+    @action(detail=False, methods=['post'])
+    def quote(self, request):
+        """
+        Price a cart: {"items": [{"id": 1, "quantity": 2}, ...], "code": "SAVE10"}.
+        Returns line totals, subtotal, discount and total (see apps/menu/pricing.py).
+        """
+        cart = QuoteRequestSerializer(data=request.data)
+        cart.is_valid(raise_exception=True)
+        lines = [(line['id'], line['quantity']) for line in cart.validated_data['items']]
+        try:
+            quote = pricing.quote(lines, cart.validated_data.get('code'))
+        except pricing.QuoteError as e:
+            raise ValidationError({e.field: [e.message]})
+        return Response(QuoteSerializer(quote).data)
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Items and categories changed after ?changes_since=<version>, plus the ids
+        deleted since, and the version to send next time (see apps/menu/catalog.py).
+        Omit changes_since (or send 0) for the whole menu.
+        """
+        since = request.query_params.get('changes_since', '0')
+        try:
+            since = int(since)
+        except ValueError:
+            raise ValidationError({'changes_since': ['Must be a catalog version number.']})
+        if since < 0:
+            raise ValidationError({'changes_since': ['Must be a catalog version number.']})
+        changes = catalog.changes_since(since)
+        return Response(CatalogChangesSerializer(changes, context=self.get_serializer_context()).data)
+    
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """
@@ -40,7 +76,7 @@ class MenuItemViewSet(viewsets.ModelViewSet):
         except ValueError:
             limit = 6
         
-        featured_items = MenuItem.objects.filter(
+        featured_items = MenuItem.objects.select_related('category').filter(
             is_featured=True,
             status='in_stock'
         ).order_by('featured_order', '-created_at')[:limit]
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Reservation
+from .models import Customer, Reservation
 
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
@@ -8,3 +8,12 @@ class ReservationAdmin(admin.ModelAdmin):
     search_fields = ('confirmation_id', 'customer_name', 'phone', 'email')
     readonly_fields = ('confirmation_id', 'created_at', 'updated_at')
     date_hierarchy = 'date'
+    raw_id_fields = ('customer',)
+    list_select_related = ('branch', 'table__branch')  # Table.__str__ reads branch.name
+
+
+@admin.register(Customer)
+class CustomerAdmin(admin.ModelAdmin):
+    list_display = ('name', 'phone', 'email', 'visit_count', 'last_visit')
+    search_fields = ('name', 'phone_key', 'email_key')
+    readonly_fields = ('phone_key', 'email_key', 'visit_count', 'last_visit', 'created_at', 'updated_at')
@@ -0,0 +1,38 @@
+"""
+Async confirmation lookup, served when ASYNC_VIEWS is enabled under ASGI.
+Same response as ReservationViewSet.by_confirmation.
+"""
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from apps.core.throttling import IPThrottle, athrottle
+from .models import Reservation
+
+
+@require_GET
+async def by_confirmation(request):
+    """Look up reservation by confirmation ID - returns limited public info"""
+    throttled = await athrottle(request, [IPThrottle('lookup')])
+    if throttled:
+        return throttled
+
+    conf_id = request.GET.get('confirmation_id')
+    if not conf_id:
+        return JsonResponse({'error': 'confirmation_id required'}, status=400)
+
+    try:
+        reservation = await Reservation.objects.select_related('branch', 'table').aget(confirmation_id=conf_id)
+    except Reservation.DoesNotExist:
+        return JsonResponse({'error': 'Reservation not found'}, status=404)
+
+    # Return limited info for public lookup (no phone/email exposed)
+    return JsonResponse({
+        'confirmation_id': reservation.confirmation_id,
+        'branch_name': reservation.branch.name if reservation.branch else None,
+        'table_name': reservation.table.name if reservation.table else None,
+        'date': reservation.date,
+        'time': reservation.time,
+        'guests': reservation.guests,
+        'status': reservation.status,
+        'customer_name': reservation.customer_name,
+    })
@@ -0,0 +1,105 @@
+"""
+Link existing reservations to deduplicated Customer profiles.
+
+Usage: python manage.py backfill_customers [--batch-size 2000]
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max
+
+from apps.reservations.models import Customer, Reservation
+
+
+class Command(BaseCommand):
+    help = 'Create Customer profiles from reservation contact data and recompute visit counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        touched = set()
+        linked = 0
+        last_pk = 0
+
+        while True:
+            batch = list(
+                Reservation.objects
+                .filter(customer__isnull=True, pk__gt=last_pk)
+                .order_by('pk')
+                .values('pk', 'customer_name', 'phone', 'email')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]['pk']
+
+            # Group the batch by normalized phone
+            groups = {}
+            for row in batch:
+                key = Customer.normalize_phone(row['phone'])
+                if key:
+                    groups.setdefault(key, []).append(row)
+
+            with transaction.atomic():
+                customer_ids = self._resolve_customers(groups)
+                updates = [
+                    Reservation(pk=row['pk'], customer_id=customer_ids[key])
+                    for key, rows in groups.items()
+                    for row in rows
+                ]
+                Reservation.objects.bulk_update(updates, ['customer'], batch_size=batch_size)
+
+            linked += len(updates)
+            touched.update(customer_ids.values())
+            self.stdout.write(f'Linked {linked} reservations...')
+
+        self._recompute_counters(touched, batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {linked} reservations linked to {len(touched)} customers'
+        ))
+
+    def _resolve_customers(self, groups):
+        """Map phone_key -> customer id, bulk-creating profiles that don't exist yet"""
+        existing = dict(
+            Customer.objects.filter(phone_key__in=groups).values_list('phone_key', 'id')
+        )
+        missing = []
+        for key, rows in groups.items():
+            if key in existing:
+                continue
+            email = next((r['email'] for r in rows if r['email']), None)
+            missing.append(Customer(
+                name=rows[-1]['customer_name'],
+                phone=rows[-1]['phone'],
+                email=email,
+                phone_key=key,
+                email_key=Customer.normalize_email(email),
+            ))
+        if missing:
+            # Another process may have created some keys meanwhile; re-read afterwards
+            Customer.objects.bulk_create(missing, ignore_conflicts=True)
+            existing.update(
+                Customer.objects.filter(
+                    phone_key__in=[c.phone_key for c in missing]
+                ).values_list('phone_key', 'id')
+            )
+        return existing
+
+    def _recompute_counters(self, customer_ids, batch_size):
+        """Set visit_count/last_visit from linked reservations with one grouped query per chunk"""
+        customer_ids = sorted(customer_ids)
+        for start in range(0, len(customer_ids), batch_size):
+            chunk = customer_ids[start:start + batch_size]
+            totals = (
+                Reservation.objects
+                .filter(customer_id__in=chunk)
+                .values('customer_id')
+                .annotate(visits=Count('id'), last=Max('date'))
+            )
+            Customer.objects.bulk_update(
+                [
+                    Customer(pk=row['customer_id'], visit_count=row['visits'], last_visit=row['last'])
+                    for row in totals
+                ],
+                ['visit_count', 'last_visit'],
+            )
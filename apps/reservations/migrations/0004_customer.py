@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0003_alter_reservation_email_alter_reservation_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Customer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('phone', models.CharField(max_length=15)),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('phone_key', models.CharField(max_length=20, unique=True)),
+                ('email_key', models.CharField(blank=True, db_index=True, max_length=254)),
+                ('visit_count', models.PositiveIntegerField(default=0)),
+                ('last_visit', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Customer',
+                'verbose_name_plural': 'Customers',
+                'db_table': 'customers',
+                'ordering': ['-last_visit'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='customer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservations', to='reservations.customer'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branches', '0005_branch_floor_plan_variants'),
+        ('reservations', '0004_customer'),
+        ('tables', '0002_alter_table_location'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['branch', '-created_at'], name='reservation_branch_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['branch', 'status', 'date'], name='reservation_branch_status_idx'),
+        ),
+    ]
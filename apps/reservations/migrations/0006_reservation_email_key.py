@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-19 20:30
+
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def fill_email_keys(apps, schema_editor):
+    Reservation = apps.get_model('reservations', 'Reservation')
+    Reservation.objects.using(schema_editor.connection.alias).exclude(email__isnull=True).exclude(email='').update(
+        email_key=Lower(Trim('email'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0005_reservation_branch_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='email_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=254),
+        ),
+        migrations.RunPython(fill_email_keys, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,88 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Value, DateField
+from django.db.models.functions import Coalesce, Greatest
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import datetime, timedelta
+import re
 import uuid
 
 
+class Customer(models.Model):
+    """
+    Guest profile shared by all reservations made with the same contact details.
+    Keyed by normalized phone number; visit counters are maintained on booking
+    so guest history does not require scanning reservations.
+    """
+    name = models.CharField(max_length=100)
+    phone = models.CharField(max_length=15)
+    email = models.EmailField(blank=True, null=True)
+    
+    # Normalized lookup keys (digits-only phone, lower-cased email)
+    phone_key = models.CharField(max_length=20, unique=True)
+    email_key = models.CharField(max_length=254, blank=True, db_index=True)
+    
+    visit_count = models.PositiveIntegerField(default=0)
+    last_visit = models.DateField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    @staticmethod
+    def normalize_phone(phone) -> str:
+        """Strip everything except digits (e.g. '+91 98765-43210' -> '919876543210')"""
+        return re.sub(r'\D', '', phone or '')
+    
+    @staticmethod
+    def normalize_email(email) -> str:
+        return (email or '').strip().lower()
+    
+    @classmethod
+    def get_or_create_for_contact(cls, name, phone, email=None):
+        """
+        Return the customer for the given contact details, creating it if needed.
+        Relies on the unique phone_key so concurrent bookings with the same phone
+        resolve to a single row (get_or_create retries the get on IntegrityError).
+        """
+        phone_key = cls.normalize_phone(phone)
+        if not phone_key:
+            return None
+        
+        email_key = cls.normalize_email(email)
+        customer, created = cls.objects.get_or_create(
+            phone_key=phone_key,
+            defaults={
+                'name': name,
+                'phone': phone,
+                'email': email or None,
+                'email_key': email_key,
+            }
+        )
+        # Fill in an email for guests who first booked without one
+        if not created and email_key and not customer.email_key:
+            cls.objects.filter(pk=customer.pk, email_key='').update(email=email, email_key=email_key)
+            customer.email, customer.email_key = email, email_key
+        return customer
+    
+    def record_visit(self, visit_date):
+        """Atomically bump the visit counter and advance last_visit"""
+        date_value = Value(visit_date, output_field=DateField())
+        Customer.objects.filter(pk=self.pk).update(
+            visit_count=F('visit_count') + 1,
+            last_visit=Greatest(Coalesce('last_visit', date_value), date_value),
+        )
+    
+    class Meta:
+        db_table = 'customers'
+        ordering = ['-last_visit']
+        verbose_name = 'Customer'
+        verbose_name_plural = 'Customers'
+    
+    def __str__(self):
+        return f"{self.name} ({self.phone})"
+
+
 class Reservation(models.Model):
     """
     Table Reservation model with smart duration calculation
@@ -31,11 +108,20 @@ class Reservation(models.Model):
         blank=True,
         related_name='reservations'
     )
+    customer = models.ForeignKey(
+        Customer,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reservations'
+    )
     
     # Customer information
     customer_name = models.CharField(max_length=100)
     phone = models.CharField(max_length=15)
     email = models.EmailField(blank=True, null=True)
+    # Normalized email of this booking: a customer (keyed by phone) keeps only its first email
+    email_key = models.CharField(max_length=254, blank=True, db_index=True, editable=False)
     
     # Reservation timing
     date = models.DateField()
@@ -149,9 +235,22 @@ class Reservation(models.Model):
                     self.confirmation_id = conf_id
                     break
         
-        # Validate before saving
+        self.email_key = Customer.normalize_email(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'email_key'}
+        
+        # Validate before saving (and before creating a customer for a rejected booking)
         self.full_clean()
-        super().save(*args, **kwargs)
+        
+        with transaction.atomic():
+            # Link to (or create) the shared customer profile
+            if is_new and not self.customer_id:
+                self.customer = Customer.get_or_create_for_contact(self.customer_name, self.phone, self.email)
+            super().save(*args, **kwargs)
+            
+            if is_new and self.customer_id:
+                self.customer.record_visit(self.date)
     
     class Meta:
         db_table = 'reservations'
@@ -162,6 +261,9 @@ class Reservation(models.Model):
             models.Index(fields=['date', 'status']),
             models.Index(fields=['branch', 'date']),
             models.Index(fields=['table', 'date', 'time', 'end_time']),
+            # Branch-scoped admin lists (default ordering) and status counts
+            models.Index(fields=['branch', '-created_at'], name='reservation_branch_created_idx'),
+            models.Index(fields=['branch', 'status', 'date'], name='reservation_branch_status_idx'),
         ]
     
     def __str__(self):
@@ -7,7 +7,8 @@ class ReservationSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Reservation
-        fields = '__all__'
+        # The customer profile link is internal
+        exclude = ('customer', 'email_key')
         read_only_fields = ('confirmation_id', 'created_at', 'updated_at')
 
 class ReservationCreateSerializer(serializers.ModelSerializer):
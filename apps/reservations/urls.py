@@ -1,8 +1,16 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import ReservationViewSet
 
 router = DefaultRouter()
 router.register(r'', ReservationViewSet, basename='reservation')
 
 urlpatterns = router.urls
+
+if settings.ASYNC_VIEWS:
+    # Async versions take precedence over the router's sync routes
+    urlpatterns = [
+        path('by_confirmation/', async_views.by_confirmation, name='reservation-by-confirmation'),
+    ] + urlpatterns
@@ -1,23 +1,28 @@
-from rest_framework import viewsets, permissions, status
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.core.mail import send_mail
 from django.conf import settings
 from django.db.models import Q
-from .models import Reservation
+from apps.accounts.permissions import BranchScopedMixin
+from apps.core.throttling import IPThrottle, ContactThrottle
+from .models import Customer, Reservation
 from .serializers import ReservationSerializer, ReservationCreateSerializer
 
 
-class ReservationViewSet(viewsets.ModelViewSet):
-    queryset = Reservation.objects.all()
+class ReservationViewSet(BranchScopedMixin, viewsets.ModelViewSet):
+    queryset = Reservation.objects.select_related('branch', 'table')
     serializer_class = ReservationSerializer
     filterset_fields = ['branch', 'status', 'date']
     search_fields = ['confirmation_id', 'customer_name', 'phone', 'email']
+    public_actions = ['create', 'by_confirmation', 'my_reservations']
     
-    def get_permissions(self):
-        if self.action in ['create', 'by_confirmation', 'my_reservations']:
-            return [permissions.AllowAny()]
-        return [permissions.IsAdminUser()]
+    def get_throttles(self):
+        if self.action == 'create':
+            return [IPThrottle('booking'), ContactThrottle('booking_contact')]
+        if self.action in ['by_confirmation', 'my_reservations']:
+            return [IPThrottle('lookup')]
+        return super().get_throttles()
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -158,14 +163,22 @@ class ReservationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Build query
+        # Both indexed: the booking's own normalized email (not the customer's,
+        # which is only the first email used with that phone), and the customer
+        # profile for the normalized phone
         query = Q()
-        if email:
-            query |= Q(email__iexact=email)
-        if phone:
-            query |= Q(phone=phone)
-        
-        reservations = Reservation.objects.filter(query).order_by('-date', '-time')[:20]
+        email_key = Customer.normalize_email(email)
+        if email_key:
+            query |= Q(email_key=email_key)
+        phone_key = Customer.normalize_phone(phone)
+        if phone_key:
+            query |= Q(customer__in=Customer.objects.filter(phone_key=phone_key).values('pk'))
+        if not query:
+            return Response([])
+        
+        reservations = Reservation.objects.filter(query).select_related(
+            'branch', 'table'
+        ).order_by('-date', '-time')[:20]
         serializer = self.get_serializer(reservations, many=True)
         return Response(serializer.data)
     
@@ -174,11 +187,12 @@ class ReservationViewSet(viewsets.ModelViewSet):
         """Get today's reservations for a branch (admin dashboard)"""
         from datetime import date
         
-        branch_id = request.query_params.get('branch')
+        # Branch managers default to their own branch
+        branch_id = request.query_params.get('branch') or request.user.branch_id
         if not branch_id:
             return Response({'error': 'branch is required'}, status=400)
         
-        reservations = Reservation.objects.filter(
+        reservations = self.get_queryset().filter(
             branch_id=branch_id,
             date=date.today()
         ).exclude(status='cancelled').order_by('time')
@@ -199,8 +213,8 @@ class ReservationViewSet(viewsets.ModelViewSet):
         
         branch_id = request.query_params.get('branch')
         
-        # Base queryset
-        qs = Reservation.objects.all()
+        # Base queryset (limited to the caller's branch for branch managers)
+        qs = self.get_queryset()
         if branch_id:
             qs = qs.filter(branch_id=branch_id)
         
@@ -6,3 +6,4 @@ class TableAdmin(admin.ModelAdmin):
     list_display = ('table_id', 'name', 'branch', 'seats', 'status', 'location')
     list_filter = ('status', 'branch')
     search_fields = ('table_id', 'name', 'location')
+    list_select_related = ('branch',)
@@ -0,0 +1,114 @@
+"""
+Async versions of the public availability endpoints, served when
+ASYNC_VIEWS is enabled and the app runs under ASGI (uvicorn workers).
+
+Responses match TableViewSet.availability / available_slots exactly; the
+shared logic lives in availability.py.
+"""
+from datetime import datetime, timedelta
+
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from apps.core.throttling import IPThrottle, athrottle
+from . import availability
+from .models import Table
+from .serializers import TableSerializer
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+@require_GET
+async def table_availability(request):
+    """Check available tables for a specific date, time, and guest count"""
+    from apps.reservations.models import Reservation
+    from apps.branches.models import Branch
+
+    throttled = await athrottle(request, [IPThrottle('availability')])
+    if throttled:
+        return throttled
+
+    try:
+        branch_id, booking_date, booking_time, guests = availability.parse_availability_params(request.GET)
+    except availability.ParamError as e:
+        return _error(e.message, e.status)
+
+    try:
+        await Branch.objects.aget(id=branch_id)
+    except Branch.DoesNotExist:
+        return _error('Branch not found', 404)
+
+    duration = Reservation.calculate_duration_from_guests(guests)
+    end_dt = datetime.combine(booking_date, booking_time) + timedelta(minutes=duration)
+
+    existing_reservations = [res async for res in Reservation.objects.filter(
+        branch_id=branch_id,
+        date=booking_date,
+        status__in=availability.ACTIVE_STATUSES
+    ).values(*availability.RESERVATION_FIELDS)]
+    reserved_table_ids = availability.reserved_table_ids(
+        existing_reservations, booking_date, booking_time, end_dt.time()
+    )
+
+    tables = [table async for table in Table.objects.select_related('branch').filter(
+        branch_id=branch_id,
+        status='active',
+        seats__gte=guests
+    ).exclude(id__in=reserved_table_ids)]
+
+    return JsonResponse({
+        'available': bool(tables),
+        'tables': TableSerializer(tables, many=True, context={'request': request}).data,
+        'total_available': len(tables),
+        'requested_time': request.GET.get('time'),
+        'reservation_duration_minutes': duration
+    })
+
+
+@require_GET
+async def available_slots(request):
+    """Available time slots for a date, branch and party size, grouped by meal period"""
+    from apps.reservations.models import Reservation
+    from apps.branches.models import Branch
+
+    throttled = await athrottle(request, [IPThrottle('availability')])
+    if throttled:
+        return throttled
+
+    try:
+        branch_id, target_date, guests = availability.parse_slot_params(request.GET)
+    except availability.ParamError as e:
+        return _error(e.message, e.status)
+    date_str = request.GET.get('date')
+
+    try:
+        branch = await Branch.objects.aget(id=branch_id)
+    except Branch.DoesNotExist:
+        return _error('Branch not found', 404)
+
+    hours_info = await branch.aget_hours_for_date(target_date)
+    if not hours_info['is_open']:
+        return JsonResponse(availability.closed_response(date_str, branch_id, guests, hours_info))
+
+    duration = Reservation.calculate_duration_from_guests(guests)
+
+    suitable_tables = await Table.objects.filter(
+        branch=branch,
+        status='active',
+        seats__gte=guests
+    ).acount()
+    if suitable_tables == 0:
+        return _error('No suitable tables found for this party size', 404)
+
+    existing_reservations = [res async for res in Reservation.objects.filter(
+        branch=branch,
+        date=target_date,
+        status__in=availability.ACTIVE_STATUSES
+    ).values(*availability.RESERVATION_FIELDS)]
+
+    slots = availability.build_slots(
+        target_date, hours_info, duration, branch.slot_duration, suitable_tables, existing_reservations
+    )
+    return JsonResponse(availability.slots_response(date_str, branch_id, guests, duration, hours_info, slots))
@@ -0,0 +1,170 @@
+"""
+Availability calculations shared by the DRF views and their async versions.
+
+Callers fetch the branch, tables and reservations (sync or async ORM); the
+functions here only parse parameters and do the overlap arithmetic.
+"""
+from datetime import datetime, timedelta
+
+# Reservation statuses that hold a table
+ACTIVE_STATUSES = ['pending', 'confirmed']
+RESERVATION_FIELDS = ('table_id', 'time', 'end_time', 'duration_minutes')
+
+
+class ParamError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def parse_guests(value):
+    try:
+        guests = int(value)
+    except (ValueError, TypeError):
+        raise ParamError('guests must be a valid number')
+    if guests < 1 or guests > 20:
+        raise ParamError('guests must be between 1 and 20')
+    return guests
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ParamError('Invalid date format. Use YYYY-MM-DD')
+
+
+def parse_availability_params(params):
+    """Validate ?branch&date&time&guests for the availability endpoint"""
+    from django.utils import timezone
+
+    branch_id = params.get('branch')
+    date_str = params.get('date')
+    time_str = params.get('time')
+    if not all([branch_id, date_str, time_str]):
+        raise ParamError('branch, date, and time are required')
+
+    guests = parse_guests(params.get('guests', '1'))
+    try:
+        booking_time = datetime.strptime(time_str, '%H:%M').time()
+    except ValueError:
+        raise ParamError('Invalid time format. Use HH:MM')
+    booking_date = parse_date(date_str)
+
+    # Prevent booking past times on same day
+    now = timezone.now()
+    if booking_date == now.date() and booking_time <= now.time():
+        raise ParamError('Cannot book for past times')
+    return branch_id, booking_date, booking_time, guests
+
+
+def parse_slot_params(params):
+    """Validate ?branch&date&guests for the available_slots endpoint"""
+    branch_id = params.get('branch')
+    date_str = params.get('date')
+    if not all([branch_id, date_str]):
+        raise ParamError('branch and date are required')
+    target_date = parse_date(date_str)
+    guests = parse_guests(params.get('guests', '2'))
+    return branch_id, target_date, guests
+
+
+def reservation_window(res, on_date):
+    """(start, end) of a reservation row, computing end_time if it is NULL"""
+    res_start = res['time']
+    res_end = res['end_time']
+    if res_end is None and res_start and res['duration_minutes']:
+        res_start_dt = datetime.combine(on_date, res_start)
+        res_end = (res_start_dt + timedelta(minutes=res['duration_minutes'])).time()
+    return res_start, res_end
+
+
+def overlaps(start, end, res, on_date):
+    """start < res_end AND res_start < end"""
+    res_start, res_end = reservation_window(res, on_date)
+    return bool(res_start and res_end and start < res_end and res_start < end)
+
+
+def reserved_table_ids(reservations, on_date, start, end):
+    return {res['table_id'] for res in reservations if overlaps(start, end, res, on_date)}
+
+
+def format_time_display(t):
+    """Format time as 12-hour display (e.g., '11:30 AM')"""
+    hour = t.hour
+    minute = t.minute
+    period = 'AM' if hour < 12 else 'PM'
+    if hour == 0:
+        hour = 12
+    elif hour > 12:
+        hour -= 12
+    return f"{hour}:{minute:02d} {period}"
+
+
+def build_slots(target_date, hours_info, duration, slot_interval, suitable_tables, reservations):
+    """Available start times from opening to closing, grouped by meal period"""
+    opening = datetime.combine(datetime.today(), hours_info['opening_time'])
+    closing = datetime.combine(datetime.today(), hours_info['closing_time'])
+
+    available_slots = {
+        'lunch': [],      # Before 2:30 PM
+        'afternoon': [],  # 2:30 PM - 5:00 PM
+        'dinner': []      # 5:00 PM onwards
+    }
+
+    current = opening
+    while current + timedelta(minutes=duration) <= closing:
+        slot_time = current.time()
+        slot_end = (current + timedelta(minutes=duration)).time()
+
+        # Count available tables for this slot
+        available_count = suitable_tables - sum(
+            1 for res in reservations if overlaps(slot_time, slot_end, res, target_date)
+        )
+
+        if available_count > 0:
+            slot_data = {
+                'time': slot_time.strftime('%H:%M'),
+                'display': format_time_display(slot_time),
+                'available_tables': available_count,
+                'duration_minutes': duration
+            }
+
+            # Categorize by meal period
+            hour = slot_time.hour
+            if hour < 14 or (hour == 14 and slot_time.minute < 30):
+                available_slots['lunch'].append(slot_data)
+            elif hour < 17:
+                available_slots['afternoon'].append(slot_data)
+            else:
+                available_slots['dinner'].append(slot_data)
+
+        current += timedelta(minutes=slot_interval)
+
+    return available_slots
+
+
+def closed_response(date_str, branch_id, guests, hours_info):
+    return {
+        'date': date_str,
+        'branch_id': int(branch_id),
+        'guests': guests,
+        'is_closed': True,
+        'note': hours_info.get('note', 'Closed'),
+        'slots': {'lunch': [], 'afternoon': [], 'dinner': []}
+    }
+
+
+def slots_response(date_str, branch_id, guests, duration, hours_info, slots):
+    return {
+        'date': date_str,
+        'branch_id': int(branch_id),
+        'guests': guests,
+        'duration_minutes': duration,
+        'is_closed': False,
+        'note': hours_info.get('note'),
+        'opening_time': hours_info['opening_time'].strftime('%H:%M') if hours_info['opening_time'] else None,
+        'closing_time': hours_info['closing_time'].strftime('%H:%M') if hours_info['closing_time'] else None,
+        'slots': slots
+    }
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branches', '0005_branch_floor_plan_variants'),
+        ('tables', '0002_alter_table_location'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='table',
+            index=models.Index(fields=['branch', 'table_id'], name='table_branch_order_idx'),
+        ),
+    ]
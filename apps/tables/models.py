@@ -29,6 +29,10 @@ class Table(models.Model):
         db_table = 'tables'
         unique_together = ['table_id', 'branch']
         ordering = ['table_id']
+        indexes = [
+            # Branch-scoped lists in table_id order
+            models.Index(fields=['branch', 'table_id'], name='table_branch_order_idx'),
+        ]
         verbose_name = 'Table'
         verbose_name_plural = 'Tables'
     
@@ -1,8 +1,17 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import TableViewSet
 
 router = DefaultRouter()
 router.register(r'', TableViewSet, basename='table')
 
 urlpatterns = router.urls
+
+if settings.ASYNC_VIEWS:
+    # Async versions take precedence over the router's sync routes
+    urlpatterns = [
+        path('availability/', async_views.table_availability, name='table-availability'),
+        path('available_slots/', async_views.available_slots, name='table-available-slots'),
+    ] + urlpatterns
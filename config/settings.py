@@ -2,6 +2,7 @@
 Django settings for Cafe Iftar backend project.
 """
 
+import sys
 from pathlib import Path
 from decouple import config
 from datetime import timedelta
@@ -30,10 +31,12 @@ INSTALLED_APPS = [
     # Third party apps
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',  # Rotated/logged-out refresh tokens
     'corsheaders',
     'django_filters',
     
     # Local apps
+    'apps.core',
     'apps.accounts',
     'apps.branches',
     'apps.tables',
@@ -45,6 +48,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.middleware.RequestMetricsMiddleware',  # Server-Timing + /api/metrics/
+    'apps.core.middleware.NPlusOneMiddleware',  # Repeated-query detection (NPLUSONE_MODE)
+    'apps.core.middleware.ReplicaRoutingMiddleware',  # Safe public reads -> read replica
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
     'corsheaders.middleware.CorsMiddleware',  # Add CORS middleware
@@ -56,6 +62,15 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# N+1 query detection: 'raise' under tests, 'log' in DEBUG, 'off' in production
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+NPLUSONE_MODE = config('NPLUSONE_MODE', default='raise' if TESTING else ('log' if DEBUG else 'off'))
+NPLUSONE_THRESHOLD = config('NPLUSONE_THRESHOLD', default=5, cast=int)  # Max repeats of one query template
+
+# Serve the hot public reads (slots, availability, menu list, confirmation lookup)
+# from native async views. Only worth enabling under ASGI (uvicorn workers).
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -88,16 +103,81 @@ WSGI_APPLICATION = 'config.wsgi.application'
 #     }
 # }
 # Database configuration - Uses DATABASE_URL for Railway, SQLite for local dev
+# Connections are kept open for DB_CONN_MAX_AGE seconds instead of reconnecting
+# (TLS handshake included) on every request, and pinged before reuse. Under ASGI
+# connections aren't reused across requests, so use DB_POOL there instead.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=0 if ASYNC_VIEWS else 60, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
 DATABASE_URL = config('DATABASE_URL', default=None)
 if DATABASE_URL:
     DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL)
+        'default': dj_database_url.parse(
+            DATABASE_URL, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=DB_CONN_HEALTH_CHECKS
+        )
     }
 else:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+        }
+    }
+
+# Optional read replica for safe public reads (see apps/core/routers.py).
+# Tests get a separate SQLite stand-in so they can tell which database answered.
+DATABASE_REPLICA_URL = config('DATABASE_REPLICA_URL', default=None)
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        DATABASE_REPLICA_URL, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        test_options={'MIRROR': 'default'},
+    )
+elif TESTING:
+    DATABASES['replica'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'replica.sqlite3'}
+DATABASE_ROUTERS = ['apps.core.routers.ReplicaRouter']
+REPLICA_ROUTING = bool(DATABASE_REPLICA_URL)
+REPLICA_READ_PREFIXES = ['/api/menu/', '/api/branches/', '/api/gallery/', '/api/deals/', '/api/dashboard/']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)  # Covers replication lag after a write
+
+# SQLite connections: WAL, synchronous=NORMAL, busy timeout, mmap and BEGIN IMMEDIATE
+# for atomic() blocks, so booking bursts wait for the lock instead of failing
+# (see apps/core/sqlite.py). No effect on Postgres.
+SQLITE_TUNING = config('SQLITE_TUNING', default=True, cast=bool)
+SQLITE_BUSY_TIMEOUT = config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int)  # Milliseconds
+SQLITE_MMAP_SIZE = config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int)  # Bytes
+if SQLITE_TUNING:
+    for database in DATABASES.values():
+        if database['ENGINE'] == 'django.db.backends.sqlite3':
+            # atomic() runs BEGIN IMMEDIATE, unless OPTIONS already chose a mode
+            database.setdefault('OPTIONS', {}).setdefault('transaction_mode', 'IMMEDIATE')
+
+# Postgres only: Django's native psycopg 3 connection pool, one pool per worker
+# process. Size max_size to the worker's threads (GUNICORN_THREADS).
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+for database in DATABASES.values():
+    if DB_POOL and database['ENGINE'] == 'django.db.backends.postgresql':
+        database['CONN_MAX_AGE'] = 0  # The pool replaces persistent connections
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=4, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),  # Seconds to wait for a free connection
+        }
+
+# Cache - shared Redis when REDIS_URL is set (requires the redis package),
+# per-process memory otherwise. Throttle buckets are stored here.
+REDIS_URL = config('REDIS_URL', default=None)
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         }
     }
 
@@ -120,6 +200,30 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing (apps/accounts/hashers.py). PASSWORD_HASHER hashes new passwords;
+# hashes from the others (and older parameters) still verify and are upgraded at next login.
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='argon2')  # argon2 or scrypt
+_PASSWORD_HASHERS = {
+    'argon2': 'apps.accounts.hashers.Argon2PasswordHasher',
+    'scrypt': 'apps.accounts.hashers.ScryptPasswordHasher',
+}
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[PASSWORD_HASHER],
+    *(path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER),
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+# Argon2id at the OWASP minimum (19 MiB, 2 passes): ~40ms vs ~400ms for PBKDF2
+ARGON2_TIME_COST = config('ARGON2_TIME_COST', default=2, cast=int)
+ARGON2_MEMORY_COST = config('ARGON2_MEMORY_COST', default=19456, cast=int)  # KiB
+ARGON2_PARALLELISM = config('ARGON2_PARALLELISM', default=1, cast=int)
+SCRYPT_WORK_FACTOR = config('SCRYPT_WORK_FACTOR', default=2 ** 14, cast=int)  # 16 MiB with block size 8
+SCRYPT_BLOCK_SIZE = config('SCRYPT_BLOCK_SIZE', default=8, cast=int)
+SCRYPT_PARALLELISM = config('SCRYPT_PARALLELISM', default=1, cast=int)
+# Concurrent password hashes per worker process (0 = unlimited) and how long a login waits for one
+LOGIN_HASH_CONCURRENCY = config('LOGIN_HASH_CONCURRENCY', default=1, cast=int)
+LOGIN_HASH_WAIT_SECONDS = config('LOGIN_HASH_WAIT_SECONDS', default=5, cast=float)
+
 # Authentication Backends - Email-based login for admin
 AUTHENTICATION_BACKENDS = [
     'apps.accounts.backends.EmailBackend',  # Email auth (primary)
@@ -139,6 +243,43 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # Media files
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+SERVE_MEDIA = config('SERVE_MEDIA', default=DEBUG, cast=bool)
+# Cache lifetime for media without a content hash in the name (hashed files are immutable)
+MEDIA_CACHE_SECONDS = config('MEDIA_CACHE_SECONDS', default=3600, cast=int)
+
+STORAGES = {
+    # Uploads are stored once per distinct content (apps/core/storage.py)
+    'default': {'BACKEND': config('MEDIA_STORAGE', default='apps.core.storage.ContentAddressedStorage')},
+    # collectstatic writes content-hashed names plus .gz/.br copies; WhiteNoise serves the
+    # smallest one the client accepts, with immutable caching for hashed names
+    'staticfiles': {'BACKEND': config(
+        'STATICFILES_BACKEND',
+        default='django.contrib.staticfiles.storage.StaticFilesStorage' if TESTING
+        else 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    )},
+}
+# Only the hashed copies are referenced, so don't ship the originals
+WHITENOISE_KEEP_ONLY_HASHED_FILES = True
+
+# Uploads (apps/core/uploads.py): files over FILE_UPLOAD_MAX_MEMORY_SIZE are
+# spooled to disk while the request is read instead of buffered in memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = config('FILE_UPLOAD_MAX_MEMORY_SIZE', default=256 * 1024, cast=int)
+FILE_UPLOAD_HANDLERS = [
+    'apps.core.uploads.UploadSizeLimitHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+IMAGE_UPLOAD_MAX_BYTES = config('IMAGE_UPLOAD_MAX_BYTES', default=15 * 1024 * 1024, cast=int)
+IMAGE_UPLOAD_MAX_PIXELS = config('IMAGE_UPLOAD_MAX_PIXELS', default=50_000_000, cast=int)
+
+# Responsive variants (WebP + JPEG) generated for uploaded images (apps/core/images.py)
+IMAGE_VARIANT_WIDTHS = [320, 640, 960, 1280, 1920]
+# Variants are built by `manage.py image_worker`; set True to build them during save() instead
+IMAGE_VARIANTS_INLINE = config('IMAGE_VARIANTS_INLINE', default=False, cast=bool)
+IMAGE_JOB_MAX_ATTEMPTS = config('IMAGE_JOB_MAX_ATTEMPTS', default=5, cast=int)
+IMAGE_JOB_RETRY_SECONDS = config('IMAGE_JOB_RETRY_SECONDS', default=30, cast=int)
+# A running job whose worker hasn't finished within this many seconds is picked up again
+IMAGE_JOB_LOCK_SECONDS = config('IMAGE_JOB_LOCK_SECONDS', default=600, cast=int)
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -146,7 +287,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT with role/branch claims; no user query per request
+        'apps.accounts.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -159,6 +301,19 @@ REST_FRAMEWORK = {
     # Pagination enabled for better performance with large datasets
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Token bucket budgets for public endpoints (see apps/core/throttling.py)
+    'DEFAULT_THROTTLE_RATES': {
+        'booking': '20/hour',          # Reservation create, per IP
+        'booking_contact': '5/hour',   # Reservation create, per phone/email
+        'lookup': '60/min',            # by_confirmation, my_reservations
+        'availability': '120/min',     # availability, available_slots
+        'inquiry': '10/hour',
+        'inquiry_contact': '3/hour',
+    },
+    # Proxies in front of the app that append to X-Forwarded-For (1 on Railway).
+    # Client IPs for throttling come from REMOTE_ADDR when 0, never from the
+    # client-supplied header.
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
     'DATETIME_FORMAT': '%Y-%m-%d %H:%M:%S',
     'DATE_FORMAT': '%Y-%m-%d',
 }
@@ -170,7 +325,22 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # Refuses refresh tokens from before a password change, re-reads role/branch claims
+    'TOKEN_REFRESH_SERIALIZER': 'apps.accounts.serializers.ClaimsTokenRefreshSerializer',
 }
+# How long a user's auth stamp and row stay cached (apps/accounts/authentication.py)
+USER_CACHE_SECONDS = config('USER_CACHE_SECONDS', default=60, cast=int)
+# Bloom filter in front of the token blacklist (apps/accounts/revocation.py); needs a shared cache
+TOKEN_REVOCATION_FILTER = config('TOKEN_REVOCATION_FILTER', default=bool(REDIS_URL), cast=bool)
+TOKEN_REVOCATION_CAPACITY = config('TOKEN_REVOCATION_CAPACITY', default=10000, cast=int)
+TOKEN_REVOCATION_REBUILD_SECONDS = config('TOKEN_REVOCATION_REBUILD_SECONDS', default=3600, cast=int)
+
+# Longest a process answers promo code checks from its code index without a rebuild
+# (apps/deals/codes.py); saves elsewhere are seen at once through a shared cache
+DEAL_INDEX_MAX_AGE = config('DEAL_INDEX_MAX_AGE', default=60, cast=int)
+
+# Longest a process prices carts from its cached menu prices (apps/menu/pricing.py)
+MENU_PRICE_CACHE_SECONDS = config('MENU_PRICE_CACHE_SECONDS', default=60, cast=int)
 
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = config(
@@ -188,7 +358,7 @@ CSRF_TRUSTED_ORIGINS = config(
 ).split(',')
 
 # Email Configuration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
 EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
 EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
@@ -2,10 +2,10 @@
 URL Configuration for Cafe Iftar backend
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from django.http import JsonResponse
+from apps.core.views import MetricsView, serve_media
 
 def health_check(request):
     return JsonResponse({'status': 'ok'})
@@ -22,8 +22,11 @@ urlpatterns = [
     path('api/inquiries/', include('apps.inquiries.urls')),
     path('api/gallery/', include('apps.gallery.urls')),
     path('api/dashboard/', include('apps.dashboard.urls')),  # Admin dashboard stats
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),  # Prometheus scrape (admin)
 ]
 
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Serve media files in development, or in production without a separate media host
+if settings.SERVE_MEDIA:
+    urlpatterns += [
+        re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.*)$', serve_media, name='media'),
+    ]
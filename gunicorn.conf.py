@@ -0,0 +1,105 @@
+"""
+Gunicorn configuration (picked up automatically from the working directory).
+
+Workers are sized from the CPUs and memory actually available to the
+container (cgroup limits, not the host's), and every value can be pinned
+from the environment:
+
+    WEB_CONCURRENCY          number of worker processes
+    GUNICORN_THREADS         threads per worker (>1 switches sync workers to gthread)
+    GUNICORN_WORKER_MEMORY   expected RSS per worker in MB (default 160)
+    GUNICORN_MAX_REQUESTS    recycle a worker after N requests (default 1000, 0 disables)
+    GUNICORN_TIMEOUT         worker timeout in seconds (default 30)
+    ASYNC_VIEWS              serve config.asgi with uvicorn workers instead of config.wsgi
+
+Migrations and collectstatic are not run here; see the release step in
+Procfile / railway.json.
+"""
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _cpu_count():
+    """CPUs this process may use, honouring a cgroup v2 CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = multiprocessing.cpu_count()
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def _memory_mb():
+    """Container memory limit (cgroup v2, then v1), falling back to physical RAM"""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # cgroup v1 reports "unlimited" as a huge number
+        if value != 'max' and int(value) < 1 << 50:
+            return int(value) // 2**20
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // 2**20
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def _workers(cpus, memory_mb, worker_mb):
+    """(2 x CPUs) + 1, capped so the workers fit in ~80% of memory"""
+    workers = cpus * 2 + 1
+    if memory_mb:
+        workers = min(workers, int(memory_mb * 0.8) // worker_mb)
+    return max(workers, 1)
+
+
+_async = os.environ.get('ASYNC_VIEWS', '').lower() in ('1', 'true', 'yes', 'on')
+
+wsgi_app = 'config.asgi:application' if _async else 'config.wsgi:application'
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+workers = _env_int('WEB_CONCURRENCY', _workers(
+    _cpu_count(), _memory_mb(), _env_int('GUNICORN_WORKER_MEMORY', 160)
+))
+threads = _env_int('GUNICORN_THREADS', 1 if _async else 4)
+if _async:
+    worker_class = 'uvicorn_worker.UvicornWorker'
+elif threads > 1:
+    worker_class = 'gthread'
+
+# Import Django and the URLconf once in the master; workers share those pages copy-on-write
+preload_app = True
+
+# Recycle workers periodically to contain slow leaks; jitter avoids all restarting at once
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = max_requests // 10
+
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = 20
+keepalive = 5  # Behind Railway's proxy, which reuses connections
+
+# Worker heartbeat files on tmpfs; a slow container disk can otherwise stall workers
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Never share a database socket opened in the preloaded master with the workers
+    if server.cfg.preload_app:
+        from django.db import connections
+        connections.close_all()
@@ -2,13 +2,15 @@
 Comprehensive test suite for Cafe Iftar Backend
 Tests all API endpoints and finds bugs
 """
-from django.test import TestCase
+from contextlib import contextmanager
+from django.test import TestCase, TransactionTestCase
 from rest_framework.test import APIClient
 from rest_framework import status
+from apps.core.querycheck import NPlusOneTestMixin, normalize_sql
 from django.contrib.auth import get_user_model
 from apps.branches.models import Branch
 from apps.tables.models import Table
-from apps.reservations.models import Reservation
+from apps.reservations.models import Customer, Reservation
 from apps.menu.models import MenuItem
 from apps.deals.models import Deal
 from apps.inquiries.models import Inquiry
@@ -303,6 +305,1231 @@ class ReservationTests(TestCase):
         self.assertEqual(reservation.status, 'confirmed')
 
 
+class CustomerTests(TestCase):
+    """Test customer profile deduplication"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.branch = Branch.objects.create(
+            name='Test Branch',
+            address='123 St',
+            phone='1234567890',
+            hours='9-10'
+        )
+        self.table = Table.objects.create(
+            table_id='T1',
+            name='Table 1',
+            seats=4,
+            status='active',
+            branch=self.branch
+        )
+    
+    def _book(self, phone, email, hour):
+        return Reservation.objects.create(
+            branch=self.branch,
+            table=self.table,
+            customer_name='Repeat Guest',
+            phone=phone,
+            email=email,
+            date=date.today() + timedelta(days=1),
+            time=time(hour, 0),
+            guests=2
+        )
+    
+    def test_bookings_share_customer_by_normalized_phone(self):
+        """Test same phone in different formats maps to one customer"""
+        first = self._book('+91 98765 43210', 'Guest@Example.com', 12)
+        second = self._book('+919876543210', None, 15)
+        self.assertEqual(first.customer_id, second.customer_id)
+        customer = Customer.objects.get(pk=first.customer_id)
+        self.assertEqual(customer.visit_count, 2)
+        self.assertEqual(customer.email_key, 'guest@example.com')
+    
+    def test_my_reservations_by_email(self):
+        """Test customer lookup uses normalized email"""
+        self._book('9876543210', 'guest@example.com', 12)
+        response = self.client.get('/api/reservations/my_reservations/?email=GUEST@example.com')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 1)
+    
+    def test_my_reservations_by_second_email(self):
+        """Test a repeat booking with a new email is found by that email"""
+        self._book('9876543210', 'first@example.com', 12)
+        second = self._book('9876543210', 'second@example.com', 15)
+        self.assertEqual(second.customer.email_key, 'first@example.com')
+        response = self.client.get('/api/reservations/my_reservations/?email=Second@example.com')
+        self.assertEqual([r['id'] for r in response.json()], [second.id])
+    
+    def test_my_reservations_email_does_not_widen_to_shared_phone(self):
+        """Test an email only finds its own bookings, and a phone finds the customer's"""
+        first = self._book('9876543210', 'parent@example.com', 12)
+        second = self._book('98765 43210', 'teen@example.com', 15)
+        response = self.client.get('/api/reservations/my_reservations/?email=parent@example.com')
+        self.assertEqual([r['id'] for r in response.json()], [first.id])
+        self.assertNotIn('customer', response.json()[0])
+        response = self.client.get('/api/reservations/my_reservations/?phone=9876543210')
+        self.assertEqual({r['id'] for r in response.json()}, {first.id, second.id})
+    
+    def test_my_reservations_without_customer(self):
+        """Test bookings with no customer link are still found"""
+        booking = self._book('9876543210', 'guest@example.com', 12)
+        Reservation.objects.update(customer=None)
+        response = self.client.get('/api/reservations/my_reservations/?email=guest@example.com')
+        self.assertEqual([r['id'] for r in response.json()], [booking.id])
+    
+    def test_rejected_booking_creates_no_customer(self):
+        """Test a booking that fails validation leaves no customer behind"""
+        from django.core.exceptions import ValidationError
+        with self.assertRaises(ValidationError):
+            Reservation.objects.create(
+                branch=self.branch, table=self.table, customer_name='Late Guest', phone='9876543210',
+                date=date.today() - timedelta(days=1), time=time(12, 0), guests=2
+            )
+        self.assertFalse(Customer.objects.exists())
+    
+    def test_backfill_links_existing_reservations(self):
+        """Test backfill command deduplicates unlinked reservations"""
+        from io import StringIO
+        from django.core.management import call_command
+        first = self._book('9876543210', None, 12)
+        second = self._book('98765 43210', None, 15)
+        Reservation.objects.update(customer=None)
+        Customer.objects.all().delete()
+        
+        call_command('backfill_customers', batch_size=1, stdout=StringIO())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertIsNotNone(first.customer_id)
+        self.assertEqual(first.customer_id, second.customer_id)
+        self.assertEqual(first.customer.visit_count, 2)
+
+
+class ThrottleTests(TestCase):
+    """Test token bucket throttling of public endpoints"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        self.client = APIClient()
+        self.branch = Branch.objects.create(
+            name='Test Branch',
+            address='123 St',
+            phone='1234567890',
+            hours='9-10'
+        )
+        cache.clear()
+        self.addCleanup(cache.clear)
+    
+    def _rates(self, **rates):
+        from django.conf import settings
+        return {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}
+    
+    def test_available_slots_throttled_per_ip(self):
+        """Test requests beyond the bucket get 429 with Retry-After"""
+        url = f'/api/tables/available_slots/?branch={self.branch.id}&date=2030-01-01'
+        with self.settings(REST_FRAMEWORK=self._rates(availability='2/min')):
+            self.client.get(url)
+            self.client.get(url)
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+    
+    def test_forwarded_for_does_not_pick_the_bucket(self):
+        """Test a client can't get a fresh bucket by changing X-Forwarded-For"""
+        url = f'/api/tables/available_slots/?branch={self.branch.id}&date=2030-01-01'
+        with self.settings(REST_FRAMEWORK=self._rates(availability='1/min')):
+            first = self.client.get(url, HTTP_X_FORWARDED_FOR='203.0.113.1')
+            second = self.client.get(url, HTTP_X_FORWARDED_FOR='203.0.113.2')
+        self.assertNotEqual(first.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(second.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    def test_non_string_contact_details_get_a_400(self):
+        """Test numeric phones and non-object bodies reach the serializer"""
+        response = self.client.post('/api/reservations/', {'phone': 5551234, 'email': 42}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post('/api/inquiries/', [{'email': 'a@example.com'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_inquiry_throttled_per_email(self):
+        """Test the same email is throttled across different IPs"""
+        data = {'name': 'Spam', 'email': 'Spam@Example.com', 'subject': 'Hi', 'message': 'Hello'}
+        with self.settings(REST_FRAMEWORK=self._rates(inquiry='100/hour', inquiry_contact='1/hour')):
+            first = self.client.post('/api/inquiries/', data, REMOTE_ADDR='10.0.0.1')
+            data['email'] = 'spam@example.com'
+            second = self.client.post('/api/inquiries/', data, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+class RequestMetricsTests(TestCase):
+    """Test request instrumentation middleware and metrics endpoint"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser('admin', password='pass')
+    
+    def test_server_timing_header(self):
+        """Test responses carry DB and render timings"""
+        response = self.client.get('/api/branches/')
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('render;dur=', timing)
+    
+    def test_serialization_is_timed(self):
+        """Test serializer .data time (including the lazy queryset) is measured"""
+        from apps.branches.serializers import BranchSerializer
+        from apps.core import serialization
+        Branch.objects.create(name='Test Branch', address='123 St', phone='1234567890', hours='9-10')
+        with serialization.timing() as timer:
+            with self.assertNumQueries(1):
+                BranchSerializer(Branch.objects.all(), many=True).data
+        self.assertGreater(timer.duration, 0)
+        self.assertEqual(timer.depth, 0)
+        response = self.client.get('/api/branches/')
+        self.assertRegex(response['Server-Timing'], r'serialize;dur=\d+\.\d')
+    
+    def test_metrics_endpoint_admin_only(self):
+        """Test Prometheus metrics require admin and include observed routes"""
+        self.client.get('/api/branches/')
+        self.assertEqual(self.client.get('/api/metrics/').status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('cafe_request_db_queries_bucket{route="branch-list",method="GET"', response.content.decode())
+
+
+class NPlusOneTests(NPlusOneTestMixin, TestCase):
+    """Test list endpoints don't issue per-row queries"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser('admin', password='pass')
+        self.client.force_authenticate(user=self.admin)
+        tomorrow = date.today() + timedelta(days=1)
+        for i in range(7):
+            branch = Branch.objects.create(name=f'Branch {i}', address='St', phone='1234567890')
+            table = Table.objects.create(table_id='T1', name='Table 1', seats=4, branch=branch)
+            Reservation.objects.create(
+                branch=branch, table=table, customer_name='Guest', phone=f'98765432{i:02d}',
+                date=tomorrow, time=time(19, 0), guests=2
+            )
+    
+    def test_normalize_sql(self):
+        """Test literals and IN-lists collapse to one template"""
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE id IN (%s, %s) AND x = 'a' LIMIT 21"),
+            normalize_sql("SELECT * FROM t WHERE id IN (%s) AND x = 'b' LIMIT 5"),
+        )
+    
+    def test_reservation_list(self):
+        self.assertNoNPlusOne(lambda: self.client.get('/api/reservations/'))
+    
+    def test_table_list(self):
+        self.assertNoNPlusOne(lambda: self.client.get('/api/tables/'))
+    
+    def test_branch_performance(self):
+        response = self.assertNoNPlusOne(lambda: self.client.get('/api/dashboard/stats/branch-performance/'))
+        self.assertEqual(len(response.json()['branches']), 7)
+        self.assertEqual(response.json()['branches'][0]['total_reservations'], 1)
+
+
+class BenchmarkTests(TestCase):
+    """Test the benchmark seeding and measurement helpers"""
+    
+    def test_seed_and_measure(self):
+        from apps.core.benchmark import run_benchmarks, seed_dataset
+        context = seed_dataset(branches=2, tables_per_branch=3, reservations=50, menu_items=10)
+        self.assertEqual(Reservation.objects.count(), 50)
+        
+        results = run_benchmarks(context, iterations=2, warmup=0, only=['branches.list', 'reservations.list'])
+        self.assertEqual(set(results), {'branches.list', 'reservations.list'})
+        self.assertEqual(results['reservations.list']['status'], 200)
+        self.assertIn('p95', results['reservations.list']['latency_ms'])
+    
+    def test_connection_benchmark_restores_settings(self):
+        from django.db import connection
+        from apps.core.benchmark import run_connection_benchmarks, seed_dataset
+        context = seed_dataset(branches=1, tables_per_branch=2, reservations=5, menu_items=2)
+        max_age = connection.settings_dict['CONN_MAX_AGE']
+        
+        results = run_connection_benchmarks(context, ['persistent', 'pool'], iterations=2, warmup=0, only=['branches.list'])
+        self.assertEqual(results['persistent']['branches.list']['connects_per_request'], 0)
+        self.assertNotIn('pool', results)  # SQLite has no pool
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], max_age)
+
+
+class LoadTestHelperTests(TestCase):
+    """Test load-test report helpers"""
+    
+    def test_count_double_bookings(self):
+        from apps.core.loadtest import count_double_bookings
+        bookings = [
+            (1, '2030-01-01', '18:00', 2),  # 60 minutes
+            (1, '2030-01-01', '18:30', 2),  # Overlaps the first
+            (1, '2030-01-01', '19:00', 2),  # Starts after first ends, overlaps second
+            (2, '2030-01-01', '18:00', 2),  # Different table
+        ]
+        self.assertEqual(count_double_bookings(bookings), 2)
+
+
+class AsyncViewTests(TestCase):
+    """Test the ASGI async views return the same payloads as the DRF views"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.branch = Branch.objects.create(
+            name='Test Branch',
+            address='123 St',
+            phone='1234567890',
+            hours='9-10'
+        )
+        self.table = Table.objects.create(
+            table_id='T1', name='Table 1', seats=4, status='active', location='Main', branch=self.branch
+        )
+        Table.objects.create(
+            table_id='T2', name='Table 2', seats=6, status='active', location='Main', branch=self.branch
+        )
+        self.tomorrow = (date.today() + timedelta(days=1)).isoformat()
+        self.reservation = Reservation.objects.create(
+            branch=self.branch, table=self.table, customer_name='Jane', phone='9876543210',
+            date=self.tomorrow, time=time(19, 0), guests=2
+        )
+    
+    def call_async(self, view, path):
+        from asgiref.sync import async_to_sync
+        from django.contrib.auth.models import AnonymousUser
+        from django.test import AsyncRequestFactory
+        request = AsyncRequestFactory().get(path)
+        request.user = AnonymousUser()
+        return async_to_sync(view)(request)
+    
+    def assertSameResponse(self, view, path):
+        import json
+        expected = self.client.get(path)
+        response = self.call_async(view, path)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(json.loads(response.content), expected.json())
+    
+    def test_available_slots_matches_sync(self):
+        from apps.tables.async_views import available_slots
+        base = f'/api/tables/available_slots/?branch={self.branch.id}'
+        self.assertSameResponse(available_slots, f'{base}&date={self.tomorrow}&guests=2')
+        self.assertSameResponse(available_slots, f'{base}&date={self.tomorrow}&guests=30')
+        self.assertSameResponse(available_slots, f'{base}&date=tomorrow')
+    
+    def test_availability_matches_sync(self):
+        from apps.tables.async_views import table_availability
+        base = f'/api/tables/availability/?branch={self.branch.id}&date={self.tomorrow}'
+        self.assertSameResponse(table_availability, f'{base}&time=19:00&guests=2')
+        self.assertSameResponse(table_availability, f'{base}&time=13:00&guests=5')
+        self.assertSameResponse(table_availability, f'/api/tables/availability/?branch=999&date={self.tomorrow}&time=19:00')
+    
+    def test_menu_list_matches_sync(self):
+        from apps.menu.async_views import menu_item_list
+        for n in range(25):
+            MenuItem.objects.create(name=f'Dish {n}', description='Test', price=Decimal('100.00'), is_veg=n % 2 == 0)
+        self.assertSameResponse(menu_item_list, '/api/menu/?ordering=name')
+        self.assertSameResponse(menu_item_list, '/api/menu/?ordering=name&page=2')
+        self.assertSameResponse(menu_item_list, '/api/menu/?is_veg=true&ordering=-price')
+        self.assertSameResponse(menu_item_list, '/api/menu/?page=9')
+        self.assertSameResponse(menu_item_list, '/api/menu/?is_veg=maybe')
+    
+    def test_menu_list_errors_match_sync(self):
+        import json
+        from apps.menu.async_views import menu_item_list
+        for path in ('/api/menu/?page=abc', '/api/menu/?page=0', '/api/menu/?category=999'):
+            self.assertSameResponse(menu_item_list, path)
+        response = self.call_async(menu_item_list, '/api/menu/?page=abc')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(json.loads(response.content), {'detail': 'Invalid page.'})
+        response = self.call_async(menu_item_list, '/api/menu/?category=999')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('category', json.loads(response.content))
+    
+    def test_by_confirmation_matches_sync(self):
+        from apps.reservations.async_views import by_confirmation
+        path = f'/api/reservations/by_confirmation/?confirmation_id={self.reservation.confirmation_id}'
+        self.assertSameResponse(by_confirmation, path)
+        self.assertSameResponse(by_confirmation, '/api/reservations/by_confirmation/?confirmation_id=CI000')
+
+
+class GunicornConfigTests(TestCase):
+    """Test worker sizing in gunicorn.conf.py"""
+    
+    def load_config(self, **env):
+        import runpy
+        from unittest import mock
+        from django.conf import settings
+        with mock.patch.dict('os.environ', env):
+            return runpy.run_path(str(settings.BASE_DIR / 'gunicorn.conf.py'))
+    
+    def test_workers_fit_in_memory(self):
+        workers = self.load_config()['_workers']
+        self.assertEqual(workers(4, None, 160), 9)
+        self.assertEqual(workers(4, 512, 160), 2)
+        self.assertEqual(workers(8, 100, 160), 1)
+    
+    def test_environment_overrides(self):
+        config = self.load_config(WEB_CONCURRENCY='3', GUNICORN_THREADS='1', ASYNC_VIEWS='')
+        self.assertEqual(config['workers'], 3)
+        self.assertNotIn('worker_class', config)
+        self.assertTrue(config['preload_app'])
+        
+        config = self.load_config(ASYNC_VIEWS='true')
+        self.assertEqual(config['worker_class'], 'uvicorn_worker.UvicornWorker')
+        self.assertEqual(config['wsgi_app'], 'config.asgi:application')
+
+
+class ReplicaRoutingTests(TestCase):
+    """Test safe reads go to the replica and writes pin the client to the primary"""
+    databases = {'default', 'replica'}
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        MenuItem.objects.create(name='Primary Dish', description='Test', price=Decimal('100.00'))
+        MenuItem.objects.using('replica').create(name='Replica Dish', description='Test', price=Decimal('100.00'))
+    
+    def menu_names(self):
+        return [item['name'] for item in self.client.get('/api/menu/').json()['results']]
+    
+    def test_routing_disabled_by_default(self):
+        self.assertEqual(self.menu_names(), ['Primary Dish'])
+    
+    def test_safe_reads_use_replica_until_client_writes(self):
+        with self.settings(REPLICA_ROUTING=True):
+            self.assertEqual(self.menu_names(), ['Replica Dish'])
+            response = self.client.post('/api/inquiries/', {
+                'name': 'Test User', 'email': 'test@example.com', 'subject': 'Hi', 'message': 'Hello'
+            })
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            # Read-your-writes: this client stays on the primary for REPLICA_PIN_SECONDS
+            self.assertEqual(self.menu_names(), ['Primary Dish'])
+    
+    def test_write_pins_rest_of_request(self):
+        from django.db import router
+        from apps.core.routers import routing
+        with routing(use_replica=True):
+            self.assertEqual(router.db_for_read(MenuItem), 'replica')
+            self.assertEqual(router.db_for_write(MenuItem), 'default')
+            self.assertEqual(router.db_for_read(MenuItem), 'default')
+
+
+class SQLiteTuningTests(TestCase):
+    """Test the SQLite connection tuning"""
+    
+    def test_connection_is_tuned(self):
+        from django.db import connection
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+        self.assertEqual(connection.settings_dict['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+class SQLiteConcurrencyTests(TransactionTestCase):
+    """Test booking under parallel writers on a file database"""
+    
+    @contextmanager
+    def file_database(self):
+        """Point the default connection (and new ones) at a file copy of the test database"""
+        import sqlite3
+        import tempfile
+        from django.db import connection
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f'{tmp}/bookings.sqlite3'
+            connection.ensure_connection()
+            copy = sqlite3.connect(path)
+            connection.connection.backup(copy)
+            copy.close()
+            memory, name = connection.connection, connection.settings_dict['NAME']
+            connection.connection, connection.settings_dict['NAME'] = None, path
+            try:
+                yield
+            finally:
+                connection.close()
+                connection.connection, connection.settings_dict['NAME'] = memory, name
+    
+    def test_parallel_bookings_do_not_hit_locks(self):
+        from apps.core.benchmark import run_parallel_bookings, seed_dataset
+        with self.file_database():
+            context = seed_dataset(branches=1, tables_per_branch=20, reservations=50, menu_items=1)
+            # Check-then-insert in transaction.atomic(), from Django connections in 8 threads
+            report = run_parallel_bookings(context['branch_id'], writers=8, bookings_per_writer=10)
+            booked = Reservation.objects.filter(customer_name__startswith='Writer ').count()
+        self.assertEqual(report['errors'], {}, report)
+        self.assertEqual((report['booked'], booked), (80, 80), report)
+        self.assertGreater(report['bookings_per_s'], 0, report)
+
+class ImageVariantTests(TestCase):
+    """Test responsive WebP/JPEG variants for uploaded images"""
+    
+    def setUp(self):
+        import tempfile
+        self.media = tempfile.TemporaryDirectory()
+        self.override = self.settings(MEDIA_ROOT=self.media.name, IMAGE_VARIANT_WIDTHS=[320, 640])
+        self.override.enable()
+        self.client = APIClient()
+    
+    def tearDown(self):
+        self.override.disable()
+        self.media.cleanup()
+    
+    def photo(self, name='photo.jpg', size=(1000, 500), color='orange'):
+        """JPEG with EXIF camera and rotation tags, like a phone upload"""
+        from io import BytesIO
+        from PIL import Image
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'  # Make
+        exif[0x0112] = 6  # Rotated 90 degrees
+        out = BytesIO()
+        Image.new('RGB', size, color).save(out, 'JPEG', exif=exif)
+        return SimpleUploadedFile(name, out.getvalue(), content_type='image/jpeg')
+    
+    def test_variants_generated_without_exif(self):
+        from PIL import Image
+        from django.core.files.storage import default_storage
+        from apps.core.jobs import run_pending
+        item = GalleryImage.objects.create(image=self.photo(), category='culinary', caption='Biryani')
+        # Queued, not built during the request
+        self.assertEqual(item.image_variants, {})
+        self.assertIsNone(self.client.get('/api/gallery/').json()['results'][0]['image_variants'])
+        
+        self.assertEqual(run_pending(), 1)
+        item.refresh_from_db()
+        variants = item.image_variants
+        
+        # Rotated: 500 wide once orientation is applied, so 320 plus the original width
+        self.assertEqual((variants['width'], variants['height']), (500, 1000))
+        self.assertEqual(set(variants['webp']), {'320', '500'})
+        with default_storage.open(variants['jpeg']['320']) as f:
+            image = Image.open(f)
+            self.assertEqual(image.size, (320, 640))
+            self.assertEqual(dict(image.getexif()), {})
+        with default_storage.open(variants['webp']['500']) as f:
+            self.assertEqual(Image.open(f).format, 'WEBP')
+        
+        data = self.client.get('/api/gallery/').json()['results'][0]['image_variants']
+        self.assertTrue(data['webp']['320'].startswith('http://testserver/'))
+        self.assertIn(' 320w, ', data['srcset']['jpeg'])
+    
+    def test_replacing_image_replaces_variants(self):
+        from django.core.files.storage import default_storage
+        from apps.core.jobs import run_pending
+        item = GalleryImage.objects.create(image=self.photo(), category='culinary', caption='Biryani')
+        run_pending()
+        item.refresh_from_db()
+        old = item.image_variants['webp']['320']
+        
+        item.image = self.photo('other.jpg', color='green')
+        item.save()
+        # Old variants aren't served for the new image while the job waits
+        self.assertIsNone(self.client.get('/api/gallery/').json()['results'][0]['image_variants'])
+        run_pending()
+        item.refresh_from_db()
+        self.assertTrue(default_storage.exists(item.image_variants['webp']['320']))
+        self.assertEqual(item.image_variants['source'], item.image.name)
+        
+        # Files can be shared, so replaced ones are left for gc_media
+        from io import StringIO
+        from django.core.management import call_command
+        self.assertTrue(default_storage.exists(old))
+        call_command('gc_media', grace_hours=0, stdout=StringIO())
+        self.assertFalse(default_storage.exists(old))
+        self.assertTrue(default_storage.exists(item.image.name))
+        self.assertTrue(default_storage.exists(item.image_variants['webp']['320']))
+    
+    def test_enqueue_is_idempotent(self):
+        from apps.core.models import ImageJob
+        item = GalleryImage.objects.create(image=self.photo(), category='culinary', caption='Biryani')
+        item.caption = 'Mutton Biryani'
+        item.save()
+        self.assertEqual(ImageJob.objects.count(), 1)
+        
+        # A newer upload supersedes the unprocessed one
+        item.image = self.photo('other.jpg', color='green')
+        item.save()
+        jobs = dict(ImageJob.objects.values_list('source', 'status'))
+        self.assertEqual(jobs[item.image.name], ImageJob.PENDING)
+        self.assertEqual(list(jobs.values()).count(ImageJob.DONE), 1)
+    
+    def test_missing_file_retried_with_backoff(self):
+        from django.core.files.storage import default_storage
+        from django.utils import timezone
+        from apps.core.jobs import run_pending
+        from apps.core.models import ImageJob
+        item = GalleryImage.objects.create(image=self.photo(), category='culinary', caption='Biryani')
+        default_storage.delete(item.image.name)
+        
+        with self.settings(IMAGE_JOB_MAX_ATTEMPTS=2, IMAGE_JOB_RETRY_SECONDS=60), self.assertLogs('apps.core.jobs'):
+            run_pending()
+            job = ImageJob.objects.get()
+            self.assertEqual((job.status, job.attempts), (ImageJob.PENDING, 1))
+            self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=50))
+            self.assertEqual(run_pending(), 0)  # Not due yet
+            
+            ImageJob.objects.update(run_after=timezone.now())
+            run_pending()
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (ImageJob.FAILED, 2))
+    
+    def test_undecodable_image_fails_once(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from apps.core.jobs import run_pending
+        from apps.core.models import ImageJob
+        item = GalleryImage(category='culinary', caption='Broken')
+        item.image.save('broken.jpg', SimpleUploadedFile('broken.jpg', b'not an image'), save=False)
+        item.save()
+        run_pending()
+        item.refresh_from_db()
+        self.assertEqual(ImageJob.objects.get().status, ImageJob.FAILED)
+        self.assertIn('error', item.image_variants)
+        # The stored error stops later saves from requeueing the same file
+        item.save()
+        self.assertEqual(ImageJob.objects.get().status, ImageJob.FAILED)
+    
+    def test_backfill_queues_stale_images(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from apps.core.jobs import run_pending
+        from apps.core.models import ImageJob
+        with self.settings(IMAGE_VARIANTS_INLINE=True):
+            built = GalleryImage.objects.create(image=self.photo(), category='culinary', caption='Built')
+        missing = GalleryImage.objects.create(image=self.photo('old.jpg'), category='culinary', caption='Old')
+        ImageJob.objects.all().delete()
+        
+        call_command('backfill_image_variants', '--model', 'gallery.GalleryImage', stdout=StringIO())
+        self.assertEqual(list(ImageJob.objects.values_list('object_id', flat=True)), [missing.pk])
+        run_pending()
+        call_command('backfill_image_variants', stdout=StringIO())
+        self.assertEqual(ImageJob.objects.filter(status=ImageJob.PENDING).count(), 0)
+        
+        call_command('backfill_image_variants', '--force', stdout=StringIO())
+        self.assertEqual(set(ImageJob.objects.filter(status=ImageJob.PENDING).values_list('object_id', flat=True)),
+                         {built.pk, missing.pk})
+
+
+class StaticFilesTests(TestCase):
+    """Test fingerprinted, precompressed static files"""
+    
+    def test_collectstatic_output_served_compressed_and_immutable(self):
+        import json
+        from django.conf import settings
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        from django.test import Client
+        with tempfile.TemporaryDirectory() as root, self.settings(
+            STATIC_ROOT=root,
+            STORAGES={**settings.STORAGES, 'staticfiles': {
+                'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'}},
+        ):
+            call_command('collectstatic', interactive=False, ignore_patterns=['rest_framework', 'admin/js', 'admin/img'],
+                         stdout=StringIO())
+            with open(f'{root}/staticfiles.json') as f:
+                hashed = json.load(f)['paths']['admin/css/base.css']
+            self.assertNotEqual(hashed, 'admin/css/base.css')
+            
+            client = Client()
+            response = client.get(f'/static/{hashed}', HTTP_ACCEPT_ENCODING='br, gzip')
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertIn('immutable', response['Cache-Control'])
+            response = client.get(f'/static/{hashed}', HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            # Unhashed originals aren't kept
+            self.assertEqual(client.get('/static/admin/css/base.css').status_code, 404)
+
+
+class MediaStorageTests(TestCase):
+    """Test content-addressed media storage and garbage collection"""
+    
+    def setUp(self):
+        import tempfile
+        self.media = tempfile.TemporaryDirectory()
+        self.override = self.settings(MEDIA_ROOT=self.media.name, IMAGE_VARIANT_WIDTHS=[320])
+        self.override.enable()
+    
+    def tearDown(self):
+        self.override.disable()
+        self.media.cleanup()
+    
+    def photo(self, name):
+        from io import BytesIO
+        from PIL import Image
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        out = BytesIO()
+        Image.new('RGB', (400, 300), 'orange').save(out, 'JPEG')
+        return SimpleUploadedFile(name, out.getvalue(), content_type='image/jpeg')
+    
+    def test_identical_uploads_share_one_file(self):
+        from unittest import mock
+        from apps.core.jobs import run_pending
+        first = GalleryImage.objects.create(image=self.photo('a.jpg'), category='culinary', caption='A')
+        run_pending()
+        second = GalleryImage.objects.create(image=self.photo('B.JPG'), category='moments', caption='B')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^content/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        
+        # The second object reuses the first one's variants instead of re-encoding
+        with mock.patch('apps.core.images.render_variants', side_effect=AssertionError):
+            run_pending()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(second.image_variants, first.image_variants)
+    
+    def test_hashed_media_is_immutable(self):
+        item = GalleryImage.objects.create(image=self.photo('a.jpg'), category='culinary', caption='A')
+        response = self.client.get('/media/' + item.image.name)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+    
+    def test_gc_keeps_shared_and_recent_files(self):
+        from io import StringIO
+        from django.core.files.storage import default_storage
+        from django.core.management import call_command
+        from apps.core.jobs import run_pending
+        first = GalleryImage.objects.create(image=self.photo('a.jpg'), category='culinary', caption='A')
+        GalleryImage.objects.create(image=self.photo('b.jpg'), category='culinary', caption='B')
+        run_pending()
+        first.delete()
+        
+        call_command('gc_media', grace_hours=0, stdout=StringIO())
+        self.assertTrue(default_storage.exists(first.image.name))  # Still used by B
+        
+        GalleryImage.objects.all().delete()
+        call_command('gc_media', stdout=StringIO())
+        self.assertTrue(default_storage.exists(first.image.name))  # Within the grace period
+        call_command('gc_media', grace_hours=0, stdout=StringIO())
+        self.assertFalse(default_storage.exists(first.image.name))
+        self.assertEqual(default_storage.listdir('content/')[1], [])
+    
+    def test_reupload_refreshes_mtime(self):
+        import os, time
+        from django.core.files.storage import default_storage
+        name = default_storage.save('a.jpg', self.photo('a.jpg'))
+        old = time.time() - 7 * 86400
+        os.utime(default_storage.path(name), (old, old))
+        # gc_media would otherwise see a week-old file and delete it under the new row
+        self.assertEqual(default_storage.save('b.jpg', self.photo('b.jpg')), name)
+        self.assertGreater(os.path.getmtime(default_storage.path(name)), old + 86400)
+    
+    def test_concurrent_first_uploads_keep_the_hashed_name(self):
+        import posixpath
+        from unittest import mock
+        from django.core.files.storage import default_storage
+        name = default_storage.save('a.jpg', self.photo('a.jpg'))
+        # As if another upload of the same bytes landed after this one looked
+        with mock.patch('apps.core.storage.os.utime', side_effect=FileNotFoundError):
+            self.assertEqual(default_storage.save('b.jpg', self.photo('b.jpg')), name)
+        self.assertEqual(default_storage.listdir(posixpath.dirname(name))[1], [posixpath.basename(name)])
+
+
+class ImageUploadTests(TestCase):
+    """Test multipart image uploads and the base64 fallback"""
+    
+    def setUp(self):
+        import tempfile
+        self.media = tempfile.TemporaryDirectory()
+        self.override = self.settings(MEDIA_ROOT=self.media.name)
+        self.override.enable()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', password='pass'))
+    
+    def tearDown(self):
+        self.override.disable()
+        self.media.cleanup()
+    
+    def png(self, size=(600, 400)):
+        """Noise PNG, so it doesn't compress below the in-memory upload limit"""
+        import os
+        from io import BytesIO
+        from PIL import Image
+        out = BytesIO()
+        Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3)).save(out, 'PNG')
+        return out.getvalue()
+    
+    def upload(self, content, name='dish.png', **extra):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        image = SimpleUploadedFile(name, content, content_type='image/png')
+        return self.client.post('/api/gallery/', {'image': image, 'category': 'culinary', 'caption': 'Dish', **extra},
+                                format='multipart')
+    
+    def test_multipart_upload_streams_to_storage(self):
+        from django.core.files.storage import default_storage
+        content = self.png()
+        self.assertGreater(len(content), 256 * 1024)  # Spooled to a temp file
+        response = self.upload(content)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with default_storage.open(GalleryImage.objects.get().image.name) as f:
+            self.assertEqual(f.read(), content)
+    
+    def test_base64_fallback(self):
+        import base64
+        content = self.png()
+        for size in ('small', 'large'):
+            data = content if size == 'large' else self.png((10, 10))
+            response = self.client.post('/api/gallery/', {
+                'image': 'data:image/png;base64,' + base64.b64encode(data).decode(),
+                'category': 'culinary', 'caption': size,
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED, size)
+            with GalleryImage.objects.get(caption=size).image.open('rb') as f:
+                self.assertEqual(f.read(), data)
+    
+    def test_stored_extension_follows_detected_format(self):
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        for name in ('dish.html', 'dish.svg'):
+            self.assertEqual(self.upload(self.png((10, 10)), name=name).status_code, status.HTTP_201_CREATED)
+        self.assertEqual({item.image.name[-4:] for item in GalleryImage.objects.all()}, {'.png'})
+        response = self.client.get('/media/' + GalleryImage.objects.first().image.name)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        # Saved directly (e.g. Django admin): unknown extensions are dropped
+        self.assertRegex(default_storage.save('x.html', ContentFile(b'<html>')), r'/[0-9a-f]{64}$')
+    
+    def test_rejects_invalid_and_oversized_images(self):
+        self.assertEqual(self.upload(b'not an image').status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(IMAGE_UPLOAD_MAX_PIXELS=1000):
+            response = self.upload(self.png((100, 100)))
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('100x100', response.json()['image'][0])
+        with self.settings(IMAGE_UPLOAD_MAX_BYTES=1024):
+            # Stopped by the upload handler while streaming
+            self.assertEqual(self.upload(self.png()).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(GalleryImage.objects.exists())
+
+
+class ClaimsAuthenticationTests(TestCase):
+    """Test stateless JWT authentication from token claims"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.branch = Branch.objects.create(name='Main', address='Addr', phone='+919876543210', hours='12-11')
+        self.manager = User.objects.create_user(
+            'manager', email='manager@test.com', password='secret-pass', role='branch_manager',
+            branch=self.branch, is_staff=True,
+        )
+    
+    def login(self, password='secret-pass'):
+        response = self.client.post('/api/auth/login/', {'email': 'manager@test.com', 'password': password})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+    
+    def get(self, path, access):
+        return self.client.get(path, HTTP_AUTHORIZATION=f'Bearer {access}')
+    
+    def test_admin_request_authorized_from_claims(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from rest_framework_simplejwt.tokens import AccessToken
+        access = self.login()['access']
+        token = AccessToken(access)
+        self.assertEqual((token['role'], token['branch'], token['is_staff']), ('branch_manager', self.branch.pk, True))
+        
+        self.assertEqual(self.get('/api/inquiries/', access).status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get('/api/inquiries/', access).status_code, 200)
+        self.assertFalse([q for q in queries.captured_queries if '"users"' in q['sql']])
+        
+        # Endpoints that need the model still get it
+        self.assertEqual(self.get('/api/auth/me/', access).json()['email'], 'manager@test.com')
+    
+    def test_role_change_requires_refreshed_claims(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        tokens = self.login()
+        self.manager.is_staff = False
+        self.manager.role = 'staff'
+        self.manager.save()
+        self.assertEqual(self.get('/api/inquiries/', tokens['access']).status_code, 401)
+        
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+        access = response.json()['access']
+        self.assertEqual(AccessToken(access)['role'], 'staff')
+        self.assertEqual(self.get('/api/inquiries/', access).status_code, 403)
+    
+    def test_password_change_revokes_tokens(self):
+        tokens = self.login()
+        response = self.client.post('/api/auth/password-change/', {
+            'current_password': 'secret-pass', 'new_password': 'another-pass', 'confirm_password': 'another-pass',
+        }, HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        self.assertEqual(response.status_code, 200)
+        
+        self.assertEqual(self.get('/api/auth/me/', tokens['access']).status_code, 401)
+        refresh = self.client.post('/api/auth/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(refresh.status_code, 401)
+        # The client that changed it carries on with the tokens it got back
+        self.assertEqual(self.get('/api/auth/me/', response.json()['access']).status_code, 200)
+
+
+class TokenRevocationTests(TestCase):
+    """Test the refresh token blacklist, its Bloom filter and compaction"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from apps.accounts.revocation import revocations
+        cache.clear()
+        revocations.__init__()
+        self.client = APIClient()
+        User.objects.create_user('staff', email='staff@test.com', password='secret-pass', is_staff=True)
+        self.tokens = self.client.post('/api/auth/login/', {'email': 'staff@test.com', 'password': 'secret-pass'}).json()
+    
+    def refresh(self, token):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': token})
+    
+    def test_rotated_and_logged_out_tokens_rejected(self):
+        rotated = self.refresh(self.tokens['refresh'])
+        self.assertEqual(rotated.status_code, 200)
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 401)
+        
+        new = rotated.json()
+        response = self.client.post('/api/auth/logout/', {'refresh': new['refresh']},
+                                    HTTP_AUTHORIZATION=f'Bearer {new["access"]}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(new['refresh']).status_code, 401)
+    
+    def test_filter_skips_blacklist_query_for_unrevoked_tokens(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from apps.accounts.revocation import RevocableRefreshToken
+        with self.settings(TOKEN_REVOCATION_FILTER=True):
+            rotated = self.refresh(self.tokens['refresh']).json()
+            RevocableRefreshToken(rotated['refresh'])  # Syncs the revocation above
+            with CaptureQueriesContext(connection) as queries:
+                RevocableRefreshToken(rotated['refresh'])
+            self.assertEqual(len(queries), 0)
+            # Revoked: the filter hit is confirmed against the table
+            self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 401)
+    
+    def test_filter_picks_up_revocations_from_other_workers(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        from apps.accounts.revocation import bump_generation
+        with self.settings(TOKEN_REVOCATION_FILTER=True):
+            self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 200)
+            second = self.client.post('/api/auth/login/', {'email': 'staff@test.com', 'password': 'secret-pass'}).json()
+            self.refresh(second['refresh'])  # Warms this worker's filter
+            # Another process blacklists directly and bumps the shared generation
+            from rest_framework_simplejwt.tokens import RefreshToken
+            jti = RefreshToken(second['refresh'], verify=False)['jti']
+            BlacklistedToken.objects.filter(token__jti=jti).delete()
+            self.assertEqual(self.refresh(second['refresh']).status_code, 200)
+            third = self.client.post('/api/auth/login/', {'email': 'staff@test.com', 'password': 'secret-pass'}).json()
+            jti = RefreshToken(third['refresh'], verify=False)['jti']
+            BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=jti))
+            bump_generation()
+            self.assertEqual(self.refresh(third['refresh']).status_code, 401)
+    
+    def test_bloom_filter_has_no_false_negatives(self):
+        from apps.accounts.revocation import BloomFilter
+        bloom = BloomFilter(1000)
+        for n in range(1000):
+            bloom.add(f'jti-{n}')
+        self.assertTrue(all(f'jti-{n}' in bloom for n in range(1000)))
+        false_positives = sum(f'other-{n}' in bloom for n in range(10000))
+        self.assertLess(false_positives, 300)
+    
+    def test_compact_tokens_deletes_only_expired(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from django.utils import timezone
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        self.refresh(self.tokens['refresh'])
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+        OutstandingToken.objects.filter(blacklistedtoken__isnull=False).update(expires_at=timezone.now())
+        call_command('compact_tokens', batch_size=1, stdout=StringIO())
+        self.assertEqual(BlacklistedToken.objects.count(), 0)
+        self.assertEqual(OutstandingToken.objects.count(), 1)  # The rotated replacement
+
+
+class EmailLoginTests(TestCase):
+    """Test case-insensitive email uniqueness and login"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user('mixed', email='Mixed.Case@Test.com', password='secret-pass')
+    
+    def test_login_ignores_email_case_with_one_lookup(self):
+        from django.contrib.auth import authenticate
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            user = authenticate(None, username='mixed.case@TEST.com', password='secret-pass')
+        self.assertEqual(user, self.user)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('LOWER', queries[0]['sql'])
+        
+        response = self.client.post('/api/auth/login/', {'email': 'MIXED.case@test.com', 'password': 'secret-pass'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_lookup_uses_unique_index(self):
+        from django.db import connection
+        if connection.vendor != 'sqlite':
+            self.skipTest('Checks the SQLite query plan')
+        sql, params = User.objects.with_email('x@test.com').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('users_email_ci_unique', plan)
+    
+    def test_duplicate_email_rejected(self):
+        from django.core.exceptions import ValidationError
+        from django.db import IntegrityError, transaction
+        duplicate = User(username='other', email='mixed.case@test.com')
+        with self.assertRaises(ValidationError):
+            duplicate.validate_constraints()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            duplicate.save()
+        # Users without an email don't conflict
+        User.objects.create_user('blank1')
+        User.objects.create_user('blank2')
+    
+    def test_profile_update_rejects_taken_email(self):
+        other = User.objects.create_user('other', email='other@test.com', password='secret-pass')
+        self.client.force_authenticate(other)
+        response = self.client.patch('/api/auth/me/', {'email': 'MIXED.CASE@test.com'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch('/api/auth/me/', {'email': 'OTHER@test.com'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class PasswordHashingTests(TestCase):
+    """Test hasher selection, rehash on login and the hashing slot limit"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user('hasher', email='hasher@test.com', password='secret-pass')
+    
+    def login(self):
+        return self.client.post('/api/auth/login/', {'email': 'hasher@test.com', 'password': 'secret-pass'})
+    
+    def test_new_passwords_use_tuned_argon2(self):
+        self.assertTrue(self.user.password.startswith('argon2$argon2id$v=19$m=19456,t=2,p=1$'))
+    
+    def test_old_hashes_upgraded_at_login(self):
+        from django.contrib.auth.hashers import make_password
+        User.objects.filter(pk=self.user.pk).update(password=make_password('secret-pass', hasher='pbkdf2_sha256'))
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('argon2$'))
+        
+        with self.settings(ARGON2_TIME_COST=3):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertIn(',t=3,', self.user.password)
+    
+    def test_login_busy_when_no_hashing_slot_frees_up(self):
+        from apps.accounts.hashers import hashing_slot
+        with self.settings(LOGIN_HASH_CONCURRENCY=1, LOGIN_HASH_WAIT_SECONDS=0):
+            with hashing_slot():
+                response = self.login()
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(response['Retry-After'], '1')
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+
+class BranchScopeTests(TestCase):
+    """Test that branch managers only see and manage their own branch"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.branches = [
+            Branch.objects.create(name=f'Branch {n}', address='123 St', phone='+919876543210', hours='12-11')
+            for n in range(2)
+        ]
+        self.reservations = []
+        for n, branch in enumerate(self.branches):
+            table = Table.objects.create(table_id=f'T{n}', name=f'Table {n}', seats=4, status='active', branch=branch)
+            self.reservations.append(Reservation.objects.create(
+                branch=branch, table=table, customer_name='Guest', phone='1234567890',
+                date=date.today() + timedelta(days=1), time=time(19, 0), guests=2, status='pending'
+            ))
+        self.manager = User.objects.create_user(
+            'manager', email='manager@test.com', password='secret-pass', role='branch_manager', branch=self.branches[0]
+        )
+        tokens = self.client.post('/api/auth/login/', {'email': 'manager@test.com', 'password': 'secret-pass'}).json()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+    
+    def test_manager_lists_only_own_branch(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/reservations/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in response.json()['results']], [self.reservations[0].id])
+        listing = [q['sql'] for q in queries if 'FROM "reservations"' in q['sql']]
+        self.assertTrue(listing and all('"branch_id" = ' in sql for sql in listing))
+        
+        other = self.reservations[1].id
+        self.assertEqual(self.client.get(f'/api/reservations/{other}/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.patch(f'/api/reservations/{other}/confirm/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/reservations/today/').status_code, status.HTTP_200_OK)
+    
+    def test_manager_cannot_write_to_other_branch(self):
+        new_table = {'table_id': 'T9', 'name': 'Table 9', 'seats': 2, 'status': 'active'}
+        response = self.client.post('/api/tables/', {**new_table, 'branch': self.branches[1].id})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.post('/api/tables/', {**new_table, 'branch': self.branches[0].id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+    
+    def test_dashboard_scoped_for_manager(self):
+        response = self.client.get('/api/dashboard/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['reservations']['total'], 1)
+        self.assertEqual(data['branches']['total'], 1)
+        self.assertEqual(data['tables']['total'], 1)
+        
+        self.client.credentials()
+        self.client.force_authenticate(User.objects.create_superuser('root', password='pass'))
+        self.assertEqual(self.client.get('/api/dashboard/stats/').json()['reservations']['total'], 2)
+    
+    def test_manager_without_branch_denied(self):
+        self.client.credentials()
+        self.client.force_authenticate(User.objects.create_user('loose', role='branch_manager'))
+        self.assertEqual(self.client.get('/api/reservations/').status_code, status.HTTP_403_FORBIDDEN)
+
+
+class CartQuoteTests(TestCase):
+    """Test server-side cart pricing"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.biryani = MenuItem.objects.create(name='Biryani', description='Test', price=Decimal('249.50'))
+        self.tea = MenuItem.objects.create(name='Tea', description='Test', price=Decimal('19.99'))
+        from django.utils import timezone
+        today = timezone.localdate()
+        for code, kind, value in [('PCT15', 'percentage', '15.00'), ('FLAT999', 'fixed', '999.00')]:
+            Deal.objects.create(
+                title=code, description='Test', code=code, discount_type=kind, discount_value=Decimal(value),
+                valid_from=today, valid_until=today, tag='Test'
+            )
+    
+    def quote(self, items, **extra):
+        return self.client.post('/api/menu/quote/', {'items': items, **extra}, format='json')
+    
+    def test_quote_with_percentage_deal(self):
+        response = self.quote([{'id': self.biryani.id, 'quantity': 2}, {'id': self.tea.id, 'quantity': 3}], code='pct15')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual([line['line_total'] for line in data['lines']], ['499.00', '59.97'])
+        self.assertEqual(data['subtotal'], '558.97')
+        self.assertEqual(data['discount'], '83.85')  # 83.8455 rounded half-up
+        self.assertEqual(data['total'], '475.12')
+        self.assertEqual(data['deal']['code'], 'PCT15')
+    
+    def test_fixed_discount_capped_at_subtotal(self):
+        data = self.quote([{'id': self.tea.id, 'quantity': 1}], code='FLAT999').json()
+        self.assertEqual((data['discount'], data['total']), ('19.99', '0.00'))
+        data = self.quote([{'id': self.tea.id, 'quantity': 1}]).json()
+        self.assertEqual((data['discount'], data['total'], data['deal']), ('0.00', '19.99', None))
+    
+    def test_rejects_unknown_items_stock_and_codes(self):
+        response = self.quote([{'id': 999999, 'quantity': 1}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('items', response.json())
+        self.tea.status = 'out_of_stock'
+        self.tea.save()
+        self.assertEqual(self.quote([{'id': self.tea.id, 'quantity': 1}]).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.quote([{'id': self.biryani.id, 'quantity': 1}], code='NOPE')
+        self.assertIn('code', response.json())
+        self.assertEqual(self.quote([{'id': self.biryani.id, 'quantity': 0}]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.quote([]).status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_warm_quote_runs_no_queries(self):
+        items = [{'id': self.biryani.id, 'quantity': 1}, {'id': self.tea.id, 'quantity': 1}]
+        self.quote(items, code='PCT15')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.quote(items, code='PCT15').status_code, status.HTTP_200_OK)
+        
+        self.tea.price = Decimal('25.00')
+        self.tea.save()
+        with self.assertNumQueries(1):
+            data = self.quote(items).json()
+        self.assertEqual(data['subtotal'], '274.50')
+
+
+class CatalogSyncTests(TestCase):
+    """Test menu catalog versions and delta sync"""
+    
+    def setUp(self):
+        from apps.menu.models import Category
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser('admin', password='pass')
+        self.mains = Category.objects.create(name='Mains')
+        self.biryani = MenuItem.objects.create(name='Biryani', description='Test', price=Decimal('249.50'), category=self.mains)
+        self.tea = MenuItem.objects.create(name='Tea', description='Test', price=Decimal('19.99'))
+    
+    def changes(self, since=None):
+        url = '/api/menu/changes/' if since is None else f'/api/menu/changes/?changes_since={since}'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+    
+    def test_full_sync_then_nothing_new(self):
+        data = self.changes()
+        self.assertTrue(data['full'])
+        self.assertEqual({item['name'] for item in data['items']}, {'Biryani', 'Tea'})
+        self.assertEqual([c['name'] for c in data['categories']], ['Mains'])
+        again = self.changes(data['version'])
+        self.assertFalse(again['full'])
+        self.assertEqual((again['version'], again['items'], again['categories']), (data['version'], [], []))
+    
+    def test_versions_only_go_up(self):
+        before = self.tea.version
+        self.tea.price = Decimal('25.00')
+        self.tea.save()
+        self.assertGreater(self.tea.version, before)
+        version = self.tea.version
+        self.client.force_authenticate(self.admin)
+        self.client.patch(f'/api/menu/{self.biryani.id}/toggle_featured/')
+        self.biryani.refresh_from_db()
+        self.assertGreater(self.biryani.version, version)
+    
+    def test_delta_has_only_changed_rows(self):
+        since = self.changes()['version']
+        self.tea.status = 'out_of_stock'
+        self.tea.save()
+        data = self.changes(since)
+        self.assertEqual([(item['id'], item['status']) for item in data['items']], [(self.tea.id, 'out_of_stock')])
+        self.assertEqual(data['categories'], [])
+        self.assertGreater(data['version'], since)
+    
+    def test_renamed_category_resends_its_items(self):
+        since = self.changes()['version']
+        self.mains.name = 'Main Course'
+        self.mains.save()
+        data = self.changes(since)
+        self.assertEqual([c['name'] for c in data['categories']], ['Main Course'])
+        self.assertEqual([item['category_details']['name'] for item in data['items']], ['Main Course'])
+    
+    def test_deletes_leave_tombstones(self):
+        since = self.changes()['version']
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.delete(f'/api/menu/{self.tea.id}/').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.delete(f'/api/menu/categories/{self.mains.slug}/').status_code, status.HTTP_204_NO_CONTENT)
+        data = self.changes(since)
+        self.assertEqual(data['deleted'], {'items': [self.tea.id], 'categories': [self.mains.id]})
+        # The orphaned item comes back without its category
+        self.assertEqual([(item['id'], item['category']) for item in data['items']], [(self.biryani.id, None)])
+        self.assertEqual(self.changes(data['version'])['deleted'], {'items': [], 'categories': []})
+    
+    def test_unknown_version_restarts_sync(self):
+        data = self.changes(10 ** 9)
+        self.assertTrue(data['full'])
+        self.assertEqual(len(data['items']), 2)
+        self.assertEqual(self.client.get('/api/menu/changes/?changes_since=abc').status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_delta_query_count(self):
+        since = self.changes()['version']
+        self.tea.save()
+        # Version, tombstones, items (with categories), categories
+        with self.assertNumQueries(4):
+            self.changes(since)
+
+
 class MenuTests(TestCase):
     """Test menu item management"""
     
@@ -365,12 +1592,102 @@ class DealTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertFalse(response.json()['valid'])
     
+    def test_validate_numeric_code(self):
+        """Test a JSON number is treated as a code, not a server error"""
+        response = self.client.post('/api/deals/validate/', {'code': 2024}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
     def test_validate_expired_code(self):
         """Test validating expired code"""
         self.deal.status = 'expired'
         self.deal.save()
         response = self.client.post('/api/deals/validate/', {'code': 'TEST15'})
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_validate_past_end_date(self):
+        """Active deals past valid_until no longer validate"""
+        Deal.objects.create(
+            title='Old', description='Old', code='OLD10', discount_value=Decimal('10.00'),
+            valid_from=date.today() - timedelta(days=10), valid_until=date.today() - timedelta(days=1),
+            tag='Old', status='active'
+        )
+        response = self.client.post('/api/deals/validate/', {'code': 'OLD10'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_validate_ignores_case_without_queries(self):
+        self.client.post('/api/deals/validate/', {'code': 'TEST15'})  # Builds the index
+        with self.assertNumQueries(0):
+            response = self.client.post('/api/deals/validate/', {'code': ' test15 '})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['deal']['code'], 'TEST15')
+        
+        self.deal.delete()
+        response = self.client.post('/api/deals/validate/', {'code': 'TEST15'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_validate_follows_date_rollover(self):
+        from datetime import datetime
+        from unittest import mock
+        from django.utils import timezone
+        self.deal.valid_from = timezone.localdate() + timedelta(days=1)
+        self.deal.save()
+        response = self.client.post('/api/deals/validate/', {'code': 'TEST15'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        tomorrow = timezone.make_aware(datetime.combine(self.deal.valid_from, time(0, 5)))
+        with mock.patch('django.utils.timezone.now', return_value=tomorrow):
+            response = self.client.post('/api/deals/validate/', {'code': 'TEST15'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_lifecycle_flips_statuses_in_one_update(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from django.utils import timezone
+        today = timezone.localdate()
+        Deal.objects.filter(pk=self.deal.pk).update(valid_from=today - timedelta(days=5), valid_until=today - timedelta(days=1))
+        later = Deal.objects.create(
+            title='Later', description='Later', code='LATER', discount_value=Decimal('5.00'),
+            valid_from=today + timedelta(days=3), valid_until=today + timedelta(days=9), tag='Later'
+        )
+        self.assertEqual(later.status, 'scheduled')  # Set on save
+        paused = Deal.objects.create(
+            title='Paused', description='Paused', code='PAUSED', discount_value=Decimal('5.00'),
+            valid_from=today - timedelta(days=30), valid_until=today - timedelta(days=20), tag='Paused', status='paused'
+        )
+        # Public listing goes by the dates before the scheduler has run
+        response = self.client.get('/api/deals/')
+        self.assertEqual(response.json()['count'], 0)
+        
+        with self.assertNumQueries(1):
+            call_command('deal_lifecycle', stdout=StringIO())
+        statuses = dict(Deal.objects.values_list('code', 'status'))
+        self.assertEqual(statuses, {'TEST15': 'expired', 'LATER': 'scheduled', 'PAUSED': 'paused'})
+        
+        from apps.deals.management.commands.deal_lifecycle import apply_lifecycle
+        self.assertEqual(apply_lifecycle(today + timedelta(days=3)), 1)
+        later.refresh_from_db()
+        self.assertEqual(later.status, 'active')
+        self.assertEqual(apply_lifecycle(today + timedelta(days=3)), 0)
+    
+    def test_dashboard_counts_match_lifecycle(self):
+        from django.utils import timezone
+        today = timezone.localdate()
+        # Ended yesterday but the scheduler hasn't run yet
+        Deal.objects.filter(pk=self.deal.pk).update(valid_until=today - timedelta(days=1))
+        self.client.force_authenticate(User.objects.create_superuser('admin', password='pass'))
+        deals = self.client.get('/api/dashboard/stats/').json()['deals']
+        self.assertEqual((deals['active'], deals['expired']), (0, 1))
+        self.assertEqual(deals['active'], Deal.currently_valid.count())
+        # Admins still list every deal
+        self.assertEqual(self.client.get('/api/deals/').json()['count'], 1)
+    
+    def test_codes_unique_ignoring_case(self):
+        self.client.force_authenticate(User.objects.create_superuser('admin', password='pass'))
+        response = self.client.post('/api/deals/', {
+            'title': 'Copy', 'description': 'Copy', 'code': 'test15', 'discount_value': '5.00',
+            'valid_from': date.today(), 'valid_until': date.today(), 'tag': 'Copy',
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('code', response.json())
 
 
 class InquiryTests(TestCase):